@@ -0,0 +1,48 @@
+import asyncio
+import random
+
+class AdaptiveInterval:
+    """
+    Intervalo de una tarea periódica de mantenimiento: se multiplica por factor en cada ronda sin cambios
+    hasta max_interval, y vuelve a min_interval en cuanto una ronda ve un cambio o una falla (o alguien llama
+    a reset). Un anillo estable casi no genera tráfico y uno con altas y bajas se estabiliza rápido.
+    Cada espera lleva un jitter aleatorio para que los nodos no sincronicen sus rondas, pero nunca es menor
+    que min_interval: por más cambios que se vean, una ronda no empieza antes de min_interval desde la anterior.
+    La espera es una corrutina del motor de mantenimiento; reset se puede llamar desde cualquier hilo.
+    Un reset durante una espera más larga que min_interval la acorta para que termine a min_interval de su comienzo.
+    """
+    def __init__(self, min_interval: float, max_interval: float, factor: float = 2.0, jitter: float = 0.2) -> None:
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.factor = factor  #crecimiento del intervalo por ronda sin cambios
+        self.jitter = jitter  #variación aleatoria de cada espera, ±jitter
+        self.current = min_interval
+        self.wakeup = asyncio.Event()  #avisa a la espera en curso que current se acortó
+        self.loop = None  #event loop de la tarea que espera, conocido desde su primera espera
+
+    def update(self, changed: bool) -> None:
+        #ajusta el intervalo según el resultado de la última ronda
+        self.current = self.min_interval if changed else min(self.current * self.factor, self.max_interval)
+
+    def reset(self) -> None:
+        #vuelve al intervalo mínimo; si la tarea está en una espera más larga, la acorta sin bajar de min_interval
+        shortened = self.current > self.min_interval
+        self.current = self.min_interval
+        if shortened and self.loop:
+            self.loop.call_soon_threadsafe(self.wakeup.set)  #asyncio.Event no es thread-safe
+
+    async def sleep(self) -> None:
+        #cada aviso solo hace recalcular el fin de la espera con el current vigente, así un aviso que quedó
+        #encolado de antes de empezar a esperar no la corta
+        self.loop = asyncio.get_running_loop()
+        started = self.loop.time()
+        factor = random.uniform(1 - self.jitter, 1 + self.jitter)
+        while True:
+            self.wakeup.clear()
+            remaining = started + max(self.min_interval, self.current * factor) - self.loop.time()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
@@ -0,0 +1,459 @@
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import requests
+from node import Node, hash_key
+from storage import iter_blocks, open_storage
+from merkle import MerkleTree
+from http_pool import HttpPool
+from grpc_channels import ChannelCache
+from control_plane import RestControlPlane, GrpcControlPlane, open_control_plane, open_async_control_plane
+from maintenance import MaintenanceEngine
+from adaptive_interval import AdaptiveInterval
+from logs import silenced
+from metrics import Histogram
+
+def percentile(samples: list, p: float) -> float:
+    #percentil p (0-100) de una lista de latencias ya ordenada
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+def report(name: str, latencies: list, errors: int, elapsed: float) -> None:
+    latencies.sort()
+    print(f"{name}: {len(latencies)} peticiones en {elapsed:.2f}s -> {len(latencies) / elapsed:.0f} req/s, "
+          f"p50 {percentile(latencies, 50) * 1000:.1f} ms, p99 {percentile(latencies, 99) * 1000:.1f} ms, "
+          f"errores {errors}")
+
+def run_concurrent(request_fn, concurrency: int, duration: float) -> tuple:
+    #ejecuta request_fn(session) desde concurrency hilos durante duration segundos; cada hilo con su propia sesión keep-alive
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker():
+        session = requests.Session()
+        local = []
+        failed = 0
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                request_fn(session).raise_for_status()
+                local.append(time.perf_counter() - start)
+            except requests.RequestException:
+                failed += 1
+        session.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], time.monotonic() - start
+
+def bench_rest(args) -> None:
+    #mide req/s y latencia de las rutas de control REST de un nodo en marcha
+    base = f"http://{args.ip}:{args.port}"
+    id_bits = args.id_bits
+    routes = {
+        "/find_successor": lambda s: s.post(f"{base}/find_successor", json={'id': str(random.getrandbits(id_bits))}, timeout=10),
+        "/get_successor": lambda s: s.get(f"{base}/get_successor", timeout=10),
+    }
+    print(f"Nodo {base}, {args.concurrency} clientes concurrentes, {args.duration}s por ruta")
+    for name, request_fn in routes.items():
+        report(name, *run_concurrent(request_fn, args.concurrency, args.duration))
+
+def process_cpu(pid: int) -> float:
+    #segundos de cpu (usuario + sistema) consumidos por un proceso local, leídos de /proc
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+def bench_control(args) -> None:
+    #compara el plano de control por rest y por grpc contra el mismo nodo: cada ronda es lo que hace stabilize
+    #(get_neighbors + notify) más el ping de check_predecessor, o sea 3 mensajes
+    peer = {'ip': args.ip, 'port': args.port}
+    transports = {
+        "rest": RestControlPlane(HttpPool()),
+        "grpc": GrpcControlPlane(ChannelCache()),
+    }
+    print(f"Nodo {args.ip}:{args.port}, {args.rounds} rondas de estabilización por transporte")
+    for name, control in transports.items():
+        #notificamos con el predecesor actual del nodo, así la ronda no cambia el anillo
+        predecessor = control.get_predecessor(peer)
+        for _ in range(args.rounds // 10):
+            control.get_neighbors(peer)  #calentamiento: conexiones abiertas y caches llenas
+        latencies = []
+        cpu_start = time.process_time()
+        server_start = process_cpu(args.server_pid) if args.server_pid else 0
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            control.get_neighbors(peer)
+            if predecessor:
+                control.notify(peer, predecessor)
+            control.ping(peer)
+            latencies.append(time.perf_counter() - start)
+        elapsed = time.perf_counter() - started
+        messages = args.rounds * (3 if predecessor else 2)
+        client_cpu = (time.process_time() - cpu_start) / messages * 1e6
+        latencies.sort()
+        line = (f"{name}: ronda p50 {percentile(latencies, 50) * 1000:.2f} ms, p99 {percentile(latencies, 99) * 1000:.2f} ms, "
+                f"{messages / elapsed:.0f} mensajes/s, cpu cliente {client_cpu:.0f} us/mensaje")
+        if args.server_pid:
+            line += f", cpu servidor {(process_cpu(args.server_pid) - server_start) / messages * 1e6:.0f} us/mensaje"
+        print(line)
+
+def bench_lookup(args) -> None:
+    #compara la búsqueda recursiva con la iterativa pidiéndole a un nodo el sucesor de ids al azar
+    peer = {'ip': args.ip, 'port': args.port}
+    control = RestControlPlane(HttpPool()) if args.transport == "rest" else GrpcControlPlane(ChannelCache(), timeout=30)
+    ids = [random.getrandbits(args.id_bits) for _ in range(args.lookups)]
+    print(f"Nodo {args.ip}:{args.port}, {args.lookups} búsquedas por modo ({args.transport})")
+    for mode in ("recursive", "iterative"):
+        latencies = []
+        hops = []
+        errors = 0
+        for id_to_find in ids:
+            start = time.perf_counter()
+            try:
+                _, lookup_hops = control.find_successor(peer, id_to_find, mode=mode)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            hops.append(lookup_hops)
+        latencies.sort()
+        print(f"{mode}: saltos prom. {sum(hops) / max(len(hops), 1):.2f} (máx. {max(hops, default=0)}), "
+              f"p50 {percentile(latencies, 50) * 1000:.1f} ms, p99 {percentile(latencies, 99) * 1000:.1f} ms, "
+              f"máx. {max(latencies, default=0) * 1000:.1f} ms, errores {errors}")
+
+def bench_batch(args) -> None:
+    #compara resolver N archivos con una petición /search por archivo contra una sola /search_batch
+    base = f"http://{args.ip}:{args.port}"
+    session = requests.Session()
+    for round_number in range(args.rounds):
+        filenames = [f"batch-{round_number}-{i}" for i in range(args.files)]
+        start = time.perf_counter()
+        single = {filename: session.post(f"{base}/search", json={'filename': filename}, timeout=30).json() for filename in filenames}
+        single_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        batch = session.post(f"{base}/search_batch", json={'filenames': filenames}, timeout=60).json()['results']
+        batch_elapsed = time.perf_counter() - start
+        #los archivos no existen, así que ambas respuestas deben coincidir en la url o en el error de cada uno
+        mismatches = sum(1 for filename in filenames if ('url' in single[filename]) != ('url' in batch[filename]))
+        print(f"{args.files} archivos: /search x{args.files} {single_elapsed * 1000:.0f} ms, "
+              f"/search_batch {batch_elapsed * 1000:.0f} ms ({single_elapsed / batch_elapsed:.1f}x), diferencias {mismatches}")
+    session.close()
+
+def bench_coalescing(args) -> None:
+    #compara muchos clientes pidiendo a la vez el sucesor del mismo id (una clave popular) contra ids al azar:
+    #con el mismo id las búsquedas en curso se juntan en una y los mensajes de control por petición bajan
+    base = f"http://{args.ip}:{args.port}"
+    for _ in range(100):
+        #un id que el nodo no resuelve solo, así cada búsqueda tiene que reenviarse
+        hot_id = str(random.getrandbits(args.id_bits))
+        if requests.post(f"{base}/find_successor", json={'id': hot_id}, timeout=10).json().get('hops'):
+            break
+    workloads = {
+        "mismo id": lambda s: s.post(f"{base}/find_successor", json={'id': hot_id}, timeout=10),
+        "ids al azar": lambda s: s.post(f"{base}/find_successor", json={'id': str(random.getrandbits(args.id_bits))}, timeout=10),
+    }
+
+    def counters() -> tuple:
+        #(reenvíos de find_successor, cuántos se juntaron con otro, mensajes de control del proceso)
+        flights = [stats.get('find_successor', {}) for stats in requests.get(f"{base}/coalescing_stats", timeout=10).json().values()]
+        messages = requests.get(f"{base}/maintenance_stats", timeout=10).json()['messages_total']
+        return sum(f.get('calls', 0) for f in flights), sum(f.get('coalesced', 0) for f in flights), messages
+
+    print(f"Nodo {base}, {args.concurrency} clientes concurrentes, {args.duration}s por carga")
+    for name, request_fn in workloads.items():
+        calls, coalesced, messages = counters()
+        latencies, errors, elapsed = run_concurrent(request_fn, args.concurrency, args.duration)
+        report(name, latencies, errors, elapsed)
+        calls_after, coalesced_after, messages_after = counters()
+        forwarded = calls_after - calls
+        print(f"  reenvíos {forwarded}, compartidos {coalesced_after - coalesced} ({(coalesced_after - coalesced) / max(forwarded, 1):.0%}), "
+              f"mensajes de control por petición {(messages_after - messages) / max(len(latencies), 1):.2f}")
+
+def payload(filename: str, version: int) -> bytes:
+    #contenido que se describe a sí mismo, para detectar lecturas mezcladas entre dos versiones
+    return f"{filename}:{version};".encode() * random.randint(1, 2000)
+
+def bench_maintenance(args) -> None:
+    #cuántas tareas periódicas mantiene un solo motor de mantenimiento contra un nodo en marcha: cada tarea hace
+    #una ronda (get_neighbors + ping, como stabilize y check_predecessor) cada interval segundos
+    config = {"control_plane": args.transport}
+    engine = MaintenanceEngine(workers=args.workers)
+    control = open_async_control_plane(config, open_control_plane(config, HttpPool(), ChannelCache()), engine.executor)
+    peer = {'ip': args.ip, 'port': args.port}
+    latencies = []
+    errors = [0]
+    threads = []  #hilos del proceso a mitad de la prueba
+
+    async def task(deadline: float) -> None:
+        interval = AdaptiveInterval(args.interval, args.interval)
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                await control.get_neighbors(peer)
+                await control.ping(peer)
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                errors[0] += 1
+            await interval.sleep()
+
+    async def sample_threads() -> None:
+        await asyncio.sleep(args.duration / 2)
+        threads.append(threading.active_count())
+
+    async def run_all() -> None:
+        deadline = time.monotonic() + args.duration
+        await asyncio.gather(sample_threads(), *(task(deadline) for _ in range(args.tasks)))
+
+    print(f"Nodo {args.ip}:{args.port} ({args.transport}), {args.tasks} tareas cada {args.interval}s durante {args.duration}s")
+    started = time.monotonic()
+    engine.run(run_all())
+    elapsed = time.monotonic() - started
+    report("rondas", latencies, errors[0], elapsed)
+    expected = args.tasks * args.duration / args.interval
+    print(f"{len(latencies) + errors[0]} rondas de {expected:.0f} esperadas ({(len(latencies) + errors[0]) / expected * 100:.0f}%), "
+          f"{threads[0]} hilos en el proceso")
+    engine.close()
+
+def bench_metrics(args) -> None:
+    #costo de una observación de histograma desde varios hilos a la vez: por hilo sin locks (Histogram) contra el
+    #mismo histograma detrás de un lock compartido, y que la suma de todos los hilos dé la cantidad esperada
+    lock = threading.Lock()
+
+    def locked(histogram):
+        def observe(value, *labels):
+            with lock:
+                histogram.observe(value, *labels)
+        return observe
+
+    for name, wrap in (("sin locks", lambda histogram: histogram.observe), ("con lock", locked)):
+        histogram = Histogram("bench_seconds", "", ("route",))
+        observe = wrap(histogram)
+
+        def worker(worker_id: int) -> None:
+            for i in range(args.observations):
+                observe(i % 100 / 1000, f"/route{worker_id % 4}")
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        total = args.threads * args.observations
+        counted = sum(value for suffix, _, _, value in histogram.samples() if suffix == "_count")
+        print(f"{name}: {total} observaciones en {args.threads} hilos, {elapsed / total * 1e9:.0f} ns por observación, "
+              f"{counted} contadas ({'ok' if counted == total else 'FALTAN'})")
+
+def is_intact(filename: str, data: bytes) -> bool:
+    records = data.decode().split(";")
+    return records[-1] == "" and records[0].startswith(f"{filename}:") and len(set(records[:-1])) == 1
+
+def bench_stress(args) -> None:
+    #martilla un nodo local (sin servidores) con store, search y notify concurrentes más el mantenimiento,
+    #y verifica que ninguna lectura vea un estado a medias y que el almacenamiento quede igual a lo escrito
+    directory = tempfile.mkdtemp(prefix="chord-stress-")
+    config = {"storage_backend": args.backend, "storage_dir": directory, "id_bits": args.id_bits,
+              "segment_max_bytes": 256 * 1024, "compact_min_garbage": 0.3, "grpc_ready_timeout": 0.2}
+    node = Node("127.0.0.1", args.port, hash_key(f"127.0.0.1:{args.port}", args.id_bits), 1, config)
+    counts = {'store': 0, 'delete': 0, 'search': 0, 'read': 0, 'notify': 0, 'maintenance': 0}
+    failures = []
+    expected = {}  #último contenido escrito por archivo (None si se borró); cada escritor tiene sus propios archivos
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+
+    def count(kind: str) -> None:
+        with lock:
+            counts[kind] += 1
+
+    def fail(message: str) -> None:
+        with lock:
+            failures.append(message)
+
+    def writer(worker: int) -> None:
+        names = [f"w{worker}-{i}" for i in range(args.keys)]
+        version = 0
+        while time.monotonic() < deadline:
+            filename = random.choice(names)
+            version += 1
+            if random.random() < 0.1:
+                node.files.delete(filename)
+                expected[filename] = None
+                count('delete')
+            else:
+                content = payload(filename, version)
+                node.files.put(filename, iter_blocks(content, 4096))
+                expected[filename] = content
+                count('store')
+
+    def reader() -> None:
+        while time.monotonic() < deadline:
+            routing = node.routing
+            if not routing.successor or len(routing.finger_table) != node.m or not isinstance(routing.successor_list, tuple):
+                fail(f"Foto de enrutamiento inconsistente: {routing.successor}, {len(routing.finger_table)} fingers")
+            filename = f"w{random.randrange(args.writers)}-{random.randrange(args.keys)}"
+            if node.search(filename).get('error') == 'No se pudo encontrar el nodo responsable':
+                fail(f"search no resolvió el nodo responsable de {filename}")
+            count('search')
+            try:
+                if not is_intact(filename, node.files.get(filename)):
+                    fail(f"Lectura mezclada de {filename}")
+                count('read')
+            except KeyError:
+                pass  #se borró entre el search y la lectura
+
+    def notifier() -> None:
+        #predecesores falsos que no responden: el traspaso de claves falla y los archivos deben quedarse
+        while time.monotonic() < deadline:
+            fake_id = random.getrandbits(args.id_bits)
+            node.notify({'ip': "127.0.0.1", 'port': random.randint(40000, 40999), 'id': fake_id})
+            count('notify')
+            time.sleep(0.005)
+
+    def maintenance() -> None:
+        while time.monotonic() < deadline:
+            node.maintenance.run(node.update_fingers())
+            node.maintenance.run(node.check_predecessor())
+            node.remove_finger(node.id)
+            node.compact_storage()
+            count('maintenance')
+
+    with silenced():
+        node.bootstrap()
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+        threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+        threads += [threading.Thread(target=notifier), threading.Thread(target=maintenance)]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        time.sleep(config["grpc_ready_timeout"] * 2)  #esperamos a que terminen los traspasos fallidos
+
+    def verify(files, label: str) -> None:
+        for filename, content in expected.items():
+            if content is None and filename in files:
+                fail(f"{label}: {filename} debería estar borrado")
+            elif content is not None and (filename not in files or files.get(filename) != content):
+                fail(f"{label}: {filename} no coincide con la última escritura")
+
+    verify(node.files, "Al terminar")
+    #el árbol de Merkle actualizado en cada escritura debe dar la misma raíz que uno armado desde cero
+    rebuilt = MerkleTree(node.m, node.merkle.depth)
+    for filename in node.files:
+        rebuilt.update(filename, hash_key(filename, node.m), node.files.checksum(filename))
+    if rebuilt.hashes(0, [0]) != node.merkle.hashes(0, [0]):
+        fail("El árbol de Merkle no coincide con el almacenamiento")
+    node.files.close()
+    if args.backend == "segment":
+        #los segmentos releídos desde el disco deben dar el mismo estado
+        reopened = open_storage(config, node.id)
+        verify(reopened, "Tras reabrir")
+        replayed = MerkleTree(node.m, node.merkle.depth)
+        for filename in reopened:
+            replayed.update(filename, hash_key(filename, node.m), reopened.checksum(filename))
+        if replayed.hashes(0, [0]) != rebuilt.hashes(0, [0]):
+            fail("Tras reabrir: los crc del índice no coinciden con los de antes")
+        reopened.close()
+    node.channels.close()
+    node.maintenance.close()
+    shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"Stress ({args.backend}) {elapsed:.1f}s: " + ", ".join(f"{kind} {n} ({n / elapsed:.0f}/s)" for kind, n in counts.items()))
+    for message in failures[:20]:
+        print(f"  FALLO: {message}")
+    print(f"{len(failures)} fallos")
+    if failures:
+        sys.exit(1)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks de un nodo Chord en marcha")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rest = commands.add_parser("rest", help="Peticiones por segundo de /find_successor y /get_successor")
+    rest.add_argument("--ip", default="127.0.0.1")
+    rest.add_argument("--port", type=int, default=5000)
+    rest.add_argument("--concurrency", type=int, default=32)
+    rest.add_argument("--duration", type=float, default=10)
+    rest.add_argument("--id-bits", type=int, default=160)
+    rest.set_defaults(run=bench_rest)
+
+    control = commands.add_parser("control", help="Latencia de una ronda de estabilización y cpu por mensaje, rest contra grpc")
+    control.add_argument("--ip", default="127.0.0.1")
+    control.add_argument("--port", type=int, default=5000, help="puerto rest del nodo (el grpc es port + 1)")
+    control.add_argument("--rounds", type=int, default=2000)
+    control.add_argument("--server-pid", type=int, help="pid del nodo, si es local, para medir también su cpu")
+    control.set_defaults(run=bench_control)
+
+    lookup = commands.add_parser("lookup", help="Saltos y latencia de cola de la búsqueda recursiva contra la iterativa")
+    lookup.add_argument("--ip", default="127.0.0.1")
+    lookup.add_argument("--port", type=int, default=5000)
+    lookup.add_argument("--lookups", type=int, default=500)
+    lookup.add_argument("--transport", choices=["grpc", "rest"], default="grpc")
+    lookup.add_argument("--id-bits", type=int, default=160)
+    lookup.set_defaults(run=bench_lookup)
+
+    batch = commands.add_parser("batch", help="N peticiones /search contra una sola /search_batch")
+    batch.add_argument("--ip", default="127.0.0.1")
+    batch.add_argument("--port", type=int, default=5000)
+    batch.add_argument("--files", type=int, default=200)
+    batch.add_argument("--rounds", type=int, default=3)
+    batch.set_defaults(run=bench_batch)
+
+    coalescing = commands.add_parser("coalescing", help="Búsquedas concurrentes del mismo id (compartidas) contra ids al azar")
+    coalescing.add_argument("--ip", default="127.0.0.1")
+    coalescing.add_argument("--port", type=int, default=5000)
+    coalescing.add_argument("--concurrency", type=int, default=32)
+    coalescing.add_argument("--duration", type=float, default=10)
+    coalescing.add_argument("--id-bits", type=int, default=160)
+    coalescing.set_defaults(run=bench_coalescing)
+
+    maintenance = commands.add_parser("maintenance", help="Tareas periódicas que mantiene un solo motor asyncio, con cuántos hilos")
+    maintenance.add_argument("--ip", default="127.0.0.1")
+    maintenance.add_argument("--port", type=int, default=5000)
+    maintenance.add_argument("--tasks", type=int, default=500)
+    maintenance.add_argument("--interval", type=float, default=1)
+    maintenance.add_argument("--duration", type=float, default=10)
+    maintenance.add_argument("--workers", type=int, default=4, help="hilos del pool del motor (los usa el plano de control rest)")
+    maintenance.add_argument("--transport", choices=["grpc", "rest"], default="grpc")
+    maintenance.set_defaults(run=bench_maintenance)
+
+    metrics = commands.add_parser("metrics", help="Costo de registrar una métrica desde varios hilos, sin locks contra con lock")
+    metrics.add_argument("--threads", type=int, default=8)
+    metrics.add_argument("--observations", type=int, default=200000, help="observaciones por hilo")
+    metrics.set_defaults(run=bench_metrics)
+
+    stress = commands.add_parser("stress", help="store, search y notify concurrentes contra un nodo local, verificando consistencia")
+    stress.add_argument("--backend", choices=["memory", "segment"], default="segment")
+    stress.add_argument("--writers", type=int, default=4)
+    stress.add_argument("--readers", type=int, default=4)
+    stress.add_argument("--keys", type=int, default=50)
+    stress.add_argument("--duration", type=float, default=10)
+    stress.add_argument("--port", type=int, default=5000)
+    stress.add_argument("--id-bits", type=int, default=160)
+    stress.set_defaults(run=bench_stress)
+
+    args = parser.parse_args()
+    args.run(args)
+
+if __name__ == '__main__':
+    main()
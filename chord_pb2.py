@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0b\x63hord.proto\"0\n\x0b\x46ileRequest\x12\x10\n\x08\x66ilename\x18\x01 \x01(\t\x12\x0f\n\x07\x63ontent\x18\x02 \x01(\t\"0\n\x0c\x46ileResponse\x12\x0f\n\x07message\x18\x01 \x01(\t\x12\x0f\n\x07\x63ontent\x18\x02 \x01(\t2e\n\x0c\x43hordService\x12(\n\tStoreFile\x12\x0c.FileRequest\x1a\r.FileResponse\x12+\n\x0c\x44ownloadFile\x12\x0c.FileRequest\x1a\r.FileResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0b\x63hord.proto\"3\n\x0b\x46ileRequest\x12\x10\n\x08\x66ilename\x18\x01 \x01(\t\x12\x0c\n\x04\x65tag\x18\x03 \x01(\tJ\x04\x08\x02\x10\x03\"`\n\tFileChunk\x12\x10\n\x08\x66ilename\x18\x01 \x01(\t\x12\x0c\n\x04\x64\x61ta\x18\x02 \x01(\x0c\x12\x0f\n\x07missing\x18\x03 \x01(\x08\x12\x0c\n\x04\x65tag\x18\x04 \x01(\t\x12\x14\n\x0cnot_modified\x18\x05 \x01(\x08\"\x1d\n\x08\x46ileList\x12\x11\n\tfilenames\x18\x01 \x03(\t\"%\n\x0c\x46ileResponse\x12\x0f\n\x07message\x18\x01 \x01(\tJ\x04\x08\x02\x10\x03\"\x07\n\x05\x45mpty\"0\n\x08NodeInfo\x12\n\n\x02id\x18\x01 \x01(\t\x12\n\n\x02ip\x18\x02 \x01(\t\x12\x0c\n\x04port\x18\x03 \x01(\x05\">\n\x14\x46indSuccessorRequest\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0c\n\x04hops\x18\x02 \x01(\x05\x12\x0c\n\x04mode\x18\x03 \x01(\t\"C\n\x0bLookupReply\x12\x17\n\x04node\x18\x01 \x01(\x0b\x32\t.NodeInfo\x12\x0c\n\x04hops\x18\x02 \x01(\x05\x12\r\n\x05trace\x18\x03 \x01(\t\"4\n\x17\x43losestPrecedingRequest\x12\n\n\x02id\x18\x01 \x01(\t\x12\r\n\x05\x63ount\x18\x02 \x01(\x05\"O\n\x15\x43losestPrecedingReply\x12\x1c\n\tsuccessor\x18\x01 \x01(\x0b\x32\t.NodeInfo\x12\x18\n\x05nodes\x18\x02 \x03(\x0b\x32\t.NodeInfo\"J\n\tNeighbors\x12\x1e\n\x0bpredecessor\x18\x01 \x01(\x0b\x32\t.NodeInfo\x12\x1d\n\nsuccessors\x18\x02 \x03(\x0b\x32\t.NodeInfo\"\'\n\nVnodeStats\x12\n\n\x02id\x18\x01 \x01(\t\x12\r\n\x05\x66iles\x18\x02 \x01(\x03\"-\n\x0eHostStatsReply\x12\x1b\n\x06vnodes\x18\x01 \x03(\x0b\x32\x0b.VnodeStats\"\x1d\n\x0cTraceRequest\x12\r\n\x05trace\x18\x01 \x01(\t\"\xb7\x01\n\x08TraceHop\x12\x0c\n\x04node\x18\x01 \x01(\t\x12\x0f\n\x07\x61\x64\x64ress\x18\x02 \x01(\t\x12\x11\n\toperation\x18\x03 \x01(\t\x12\x0c\n\x04mode\x18\x04 \x01(\t\x12\n\n\x02id\x18\x05 \x01(\t\x12\x15\n\x02to\x18\x06 \x01(\x0b\x32\t.NodeInfo\x12\x0c\n\x04hops\x18\x07 \x01(\x05\x12\x0f\n\x07started\x18\x08 \x01(\x01\x12\n\n\x02ms\x18\t \x01(\x01\x12\x0e\n\x06result\x18\n \x01(\t\x12\r\n\x05\x65rror\x18\x0b \x01(\t\"%\n\nTraceReply\x12\x17\n\x04hops\x18\x01 \x03(\x0b\x32\t.TraceHop\"/\n\rMerkleRequest\x12\r\n\x05level\x18\x01 \x01(\x05\x12\x0f\n\x07indexes\x18\x02 \x03(\x03\",\n\x0bMerkleReply\x12\r\n\x05\x64\x65pth\x18\x01 \x01(\x05\x12\x0e\n\x06hashes\x18\x02 \x03(\x0c\"-\n\tKeyDigest\x12\x10\n\x08\x66ilename\x18\x01 \x01(\t\x12\x0e\n\x06\x64igest\x18\x02 \x01(\x0c\"+\n\x0fMerkleKeysReply\x12\x18\n\x04keys\x18\x01 \x03(\x0b\x32\n.KeyDigest2\xb0\x05\n\x0c\x43hordService\x12(\n\tStoreFile\x12\n.FileChunk\x1a\r.FileResponse(\x01\x12*\n\x0c\x44ownloadFile\x12\x0c.FileRequest\x1a\n.FileChunk0\x01\x12,\n\rTransferFiles\x12\n.FileChunk\x1a\r.FileResponse(\x01\x12)\n\nStoreFiles\x12\n.FileChunk\x1a\r.FileResponse(\x01\x12(\n\rDownloadFiles\x12\t.FileList\x1a\n.FileChunk0\x01\x12,\n\x0cMerkleHashes\x12\x0e.MerkleRequest\x1a\x0c.MerkleReply\x12.\n\nMerkleKeys\x12\x0e.MerkleRequest\x1a\x10.MerkleKeysReply\x12\x34\n\rFindSuccessor\x12\x15.FindSuccessorRequest\x1a\x0c.LookupReply\x12\x44\n\x10\x43losestPreceding\x12\x18.ClosestPrecedingRequest\x1a\x16.ClosestPrecedingReply\x12!\n\x0cGetSuccessor\x12\x06.Empty\x1a\t.NodeInfo\x12#\n\x0eGetPredecessor\x12\x06.Empty\x1a\t.NodeInfo\x12\"\n\x0cGetNeighbors\x12\x06.Empty\x1a\n.Neighbors\x12\x1b\n\x06Notify\x12\t.NodeInfo\x1a\x06.Empty\x12\x16\n\x04Ping\x12\x06.Empty\x1a\x06.Empty\x12$\n\tHostStats\x12\x06.Empty\x1a\x0f.HostStatsReply\x12&\n\x08GetTrace\x12\r.TraceRequest\x1a\x0b.TraceReplyb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -32,9 +32,45 @@ _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'chord_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
   _globals['_FILEREQUEST']._serialized_start=15
-  _globals['_FILEREQUEST']._serialized_end=63
-  _globals['_FILERESPONSE']._serialized_start=65
-  _globals['_FILERESPONSE']._serialized_end=113
-  _globals['_CHORDSERVICE']._serialized_start=115
-  _globals['_CHORDSERVICE']._serialized_end=216
+  _globals['_FILEREQUEST']._serialized_end=66
+  _globals['_FILECHUNK']._serialized_start=68
+  _globals['_FILECHUNK']._serialized_end=164
+  _globals['_FILELIST']._serialized_start=166
+  _globals['_FILELIST']._serialized_end=195
+  _globals['_FILERESPONSE']._serialized_start=197
+  _globals['_FILERESPONSE']._serialized_end=234
+  _globals['_EMPTY']._serialized_start=236
+  _globals['_EMPTY']._serialized_end=243
+  _globals['_NODEINFO']._serialized_start=245
+  _globals['_NODEINFO']._serialized_end=293
+  _globals['_FINDSUCCESSORREQUEST']._serialized_start=295
+  _globals['_FINDSUCCESSORREQUEST']._serialized_end=357
+  _globals['_LOOKUPREPLY']._serialized_start=359
+  _globals['_LOOKUPREPLY']._serialized_end=426
+  _globals['_CLOSESTPRECEDINGREQUEST']._serialized_start=428
+  _globals['_CLOSESTPRECEDINGREQUEST']._serialized_end=480
+  _globals['_CLOSESTPRECEDINGREPLY']._serialized_start=482
+  _globals['_CLOSESTPRECEDINGREPLY']._serialized_end=561
+  _globals['_NEIGHBORS']._serialized_start=563
+  _globals['_NEIGHBORS']._serialized_end=637
+  _globals['_VNODESTATS']._serialized_start=639
+  _globals['_VNODESTATS']._serialized_end=678
+  _globals['_HOSTSTATSREPLY']._serialized_start=680
+  _globals['_HOSTSTATSREPLY']._serialized_end=725
+  _globals['_TRACEREQUEST']._serialized_start=727
+  _globals['_TRACEREQUEST']._serialized_end=756
+  _globals['_TRACEHOP']._serialized_start=759
+  _globals['_TRACEHOP']._serialized_end=942
+  _globals['_TRACEREPLY']._serialized_start=944
+  _globals['_TRACEREPLY']._serialized_end=981
+  _globals['_MERKLEREQUEST']._serialized_start=983
+  _globals['_MERKLEREQUEST']._serialized_end=1030
+  _globals['_MERKLEREPLY']._serialized_start=1032
+  _globals['_MERKLEREPLY']._serialized_end=1076
+  _globals['_KEYDIGEST']._serialized_start=1078
+  _globals['_KEYDIGEST']._serialized_end=1123
+  _globals['_MERKLEKEYSREPLY']._serialized_start=1125
+  _globals['_MERKLEKEYSREPLY']._serialized_end=1168
+  _globals['_CHORDSERVICE']._serialized_start=1171
+  _globals['_CHORDSERVICE']._serialized_end=1859
 # @@protoc_insertion_point(module_scope)
@@ -34,46 +34,283 @@ class ChordServiceStub(object):
         Args:
             channel: A grpc.Channel.
         """
-        self.StoreFile = channel.unary_unary(
+        self.StoreFile = channel.stream_unary(
                 '/ChordService/StoreFile',
-                request_serializer=chord__pb2.FileRequest.SerializeToString,
+                request_serializer=chord__pb2.FileChunk.SerializeToString,
                 response_deserializer=chord__pb2.FileResponse.FromString,
                 _registered_method=True)
-        self.DownloadFile = channel.unary_unary(
+        self.DownloadFile = channel.unary_stream(
                 '/ChordService/DownloadFile',
                 request_serializer=chord__pb2.FileRequest.SerializeToString,
+                response_deserializer=chord__pb2.FileChunk.FromString,
+                _registered_method=True)
+        self.TransferFiles = channel.stream_unary(
+                '/ChordService/TransferFiles',
+                request_serializer=chord__pb2.FileChunk.SerializeToString,
+                response_deserializer=chord__pb2.FileResponse.FromString,
+                _registered_method=True)
+        self.StoreFiles = channel.stream_unary(
+                '/ChordService/StoreFiles',
+                request_serializer=chord__pb2.FileChunk.SerializeToString,
                 response_deserializer=chord__pb2.FileResponse.FromString,
                 _registered_method=True)
+        self.DownloadFiles = channel.unary_stream(
+                '/ChordService/DownloadFiles',
+                request_serializer=chord__pb2.FileList.SerializeToString,
+                response_deserializer=chord__pb2.FileChunk.FromString,
+                _registered_method=True)
+        self.MerkleHashes = channel.unary_unary(
+                '/ChordService/MerkleHashes',
+                request_serializer=chord__pb2.MerkleRequest.SerializeToString,
+                response_deserializer=chord__pb2.MerkleReply.FromString,
+                _registered_method=True)
+        self.MerkleKeys = channel.unary_unary(
+                '/ChordService/MerkleKeys',
+                request_serializer=chord__pb2.MerkleRequest.SerializeToString,
+                response_deserializer=chord__pb2.MerkleKeysReply.FromString,
+                _registered_method=True)
+        self.FindSuccessor = channel.unary_unary(
+                '/ChordService/FindSuccessor',
+                request_serializer=chord__pb2.FindSuccessorRequest.SerializeToString,
+                response_deserializer=chord__pb2.LookupReply.FromString,
+                _registered_method=True)
+        self.ClosestPreceding = channel.unary_unary(
+                '/ChordService/ClosestPreceding',
+                request_serializer=chord__pb2.ClosestPrecedingRequest.SerializeToString,
+                response_deserializer=chord__pb2.ClosestPrecedingReply.FromString,
+                _registered_method=True)
+        self.GetSuccessor = channel.unary_unary(
+                '/ChordService/GetSuccessor',
+                request_serializer=chord__pb2.Empty.SerializeToString,
+                response_deserializer=chord__pb2.NodeInfo.FromString,
+                _registered_method=True)
+        self.GetPredecessor = channel.unary_unary(
+                '/ChordService/GetPredecessor',
+                request_serializer=chord__pb2.Empty.SerializeToString,
+                response_deserializer=chord__pb2.NodeInfo.FromString,
+                _registered_method=True)
+        self.GetNeighbors = channel.unary_unary(
+                '/ChordService/GetNeighbors',
+                request_serializer=chord__pb2.Empty.SerializeToString,
+                response_deserializer=chord__pb2.Neighbors.FromString,
+                _registered_method=True)
+        self.Notify = channel.unary_unary(
+                '/ChordService/Notify',
+                request_serializer=chord__pb2.NodeInfo.SerializeToString,
+                response_deserializer=chord__pb2.Empty.FromString,
+                _registered_method=True)
+        self.Ping = channel.unary_unary(
+                '/ChordService/Ping',
+                request_serializer=chord__pb2.Empty.SerializeToString,
+                response_deserializer=chord__pb2.Empty.FromString,
+                _registered_method=True)
+        self.HostStats = channel.unary_unary(
+                '/ChordService/HostStats',
+                request_serializer=chord__pb2.Empty.SerializeToString,
+                response_deserializer=chord__pb2.HostStatsReply.FromString,
+                _registered_method=True)
+        self.GetTrace = channel.unary_unary(
+                '/ChordService/GetTrace',
+                request_serializer=chord__pb2.TraceRequest.SerializeToString,
+                response_deserializer=chord__pb2.TraceReply.FromString,
+                _registered_method=True)
 
 
 class ChordServiceServicer(object):
     """Missing associated documentation comment in .proto file."""
 
-    def StoreFile(self, request, context):
-        """Missing associated documentation comment in .proto file."""
+    def StoreFile(self, request_iterator, context):
+        """el cliente envía el archivo en fragmentos
+        """
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
     def DownloadFile(self, request, context):
+        """el servidor devuelve el archivo en fragmentos
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def TransferFiles(self, request_iterator, context):
+        """traspaso de varios archivos al unirse o salir un nodo
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def StoreFiles(self, request_iterator, context):
+        """varios archivos seguidos en un solo stream
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def DownloadFiles(self, request, context):
+        """varios archivos seguidos en un solo stream
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def MerkleHashes(self, request, context):
+        """anti-entropía entre un nodo y sus réplicas
+        hashes de algunos subárboles de un nivel del árbol de Merkle
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def MerkleKeys(self, request, context):
+        """claves y digests de algunas hojas
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def FindSuccessor(self, request, context):
+        """plano de control de chord, equivalente a las rutas rest
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ClosestPreceding(self, request, context):
+        """un paso de la búsqueda iterativa
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetSuccessor(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetPredecessor(self, request, context):
         """Missing associated documentation comment in .proto file."""
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def GetNeighbors(self, request, context):
+        """predecesor y lista de sucesores en un solo mensaje, usado por stabilize
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Notify(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Ping(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def HostStats(self, request, context):
+        """claves por nodo virtual del proceso, para el reporte de distribución
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetTrace(self, request, context):
+        """saltos que registró el proceso para una búsqueda con traza
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_ChordServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
-            'StoreFile': grpc.unary_unary_rpc_method_handler(
+            'StoreFile': grpc.stream_unary_rpc_method_handler(
                     servicer.StoreFile,
-                    request_deserializer=chord__pb2.FileRequest.FromString,
+                    request_deserializer=chord__pb2.FileChunk.FromString,
                     response_serializer=chord__pb2.FileResponse.SerializeToString,
             ),
-            'DownloadFile': grpc.unary_unary_rpc_method_handler(
+            'DownloadFile': grpc.unary_stream_rpc_method_handler(
                     servicer.DownloadFile,
                     request_deserializer=chord__pb2.FileRequest.FromString,
+                    response_serializer=chord__pb2.FileChunk.SerializeToString,
+            ),
+            'TransferFiles': grpc.stream_unary_rpc_method_handler(
+                    servicer.TransferFiles,
+                    request_deserializer=chord__pb2.FileChunk.FromString,
+                    response_serializer=chord__pb2.FileResponse.SerializeToString,
+            ),
+            'StoreFiles': grpc.stream_unary_rpc_method_handler(
+                    servicer.StoreFiles,
+                    request_deserializer=chord__pb2.FileChunk.FromString,
                     response_serializer=chord__pb2.FileResponse.SerializeToString,
             ),
+            'DownloadFiles': grpc.unary_stream_rpc_method_handler(
+                    servicer.DownloadFiles,
+                    request_deserializer=chord__pb2.FileList.FromString,
+                    response_serializer=chord__pb2.FileChunk.SerializeToString,
+            ),
+            'MerkleHashes': grpc.unary_unary_rpc_method_handler(
+                    servicer.MerkleHashes,
+                    request_deserializer=chord__pb2.MerkleRequest.FromString,
+                    response_serializer=chord__pb2.MerkleReply.SerializeToString,
+            ),
+            'MerkleKeys': grpc.unary_unary_rpc_method_handler(
+                    servicer.MerkleKeys,
+                    request_deserializer=chord__pb2.MerkleRequest.FromString,
+                    response_serializer=chord__pb2.MerkleKeysReply.SerializeToString,
+            ),
+            'FindSuccessor': grpc.unary_unary_rpc_method_handler(
+                    servicer.FindSuccessor,
+                    request_deserializer=chord__pb2.FindSuccessorRequest.FromString,
+                    response_serializer=chord__pb2.LookupReply.SerializeToString,
+            ),
+            'ClosestPreceding': grpc.unary_unary_rpc_method_handler(
+                    servicer.ClosestPreceding,
+                    request_deserializer=chord__pb2.ClosestPrecedingRequest.FromString,
+                    response_serializer=chord__pb2.ClosestPrecedingReply.SerializeToString,
+            ),
+            'GetSuccessor': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetSuccessor,
+                    request_deserializer=chord__pb2.Empty.FromString,
+                    response_serializer=chord__pb2.NodeInfo.SerializeToString,
+            ),
+            'GetPredecessor': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetPredecessor,
+                    request_deserializer=chord__pb2.Empty.FromString,
+                    response_serializer=chord__pb2.NodeInfo.SerializeToString,
+            ),
+            'GetNeighbors': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetNeighbors,
+                    request_deserializer=chord__pb2.Empty.FromString,
+                    response_serializer=chord__pb2.Neighbors.SerializeToString,
+            ),
+            'Notify': grpc.unary_unary_rpc_method_handler(
+                    servicer.Notify,
+                    request_deserializer=chord__pb2.NodeInfo.FromString,
+                    response_serializer=chord__pb2.Empty.SerializeToString,
+            ),
+            'Ping': grpc.unary_unary_rpc_method_handler(
+                    servicer.Ping,
+                    request_deserializer=chord__pb2.Empty.FromString,
+                    response_serializer=chord__pb2.Empty.SerializeToString,
+            ),
+            'HostStats': grpc.unary_unary_rpc_method_handler(
+                    servicer.HostStats,
+                    request_deserializer=chord__pb2.Empty.FromString,
+                    response_serializer=chord__pb2.HostStatsReply.SerializeToString,
+            ),
+            'GetTrace': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetTrace,
+                    request_deserializer=chord__pb2.TraceRequest.FromString,
+                    response_serializer=chord__pb2.TraceReply.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'ChordService', rpc_method_handlers)
@@ -86,7 +323,7 @@ class ChordService(object):
     """Missing associated documentation comment in .proto file."""
 
     @staticmethod
-    def StoreFile(request,
+    def StoreFile(request_iterator,
             target,
             options=(),
             channel_credentials=None,
@@ -96,11 +333,11 @@ class ChordService(object):
             wait_for_ready=None,
             timeout=None,
             metadata=None):
-        return grpc.experimental.unary_unary(
-            request,
+        return grpc.experimental.stream_unary(
+            request_iterator,
             target,
             '/ChordService/StoreFile',
-            chord__pb2.FileRequest.SerializeToString,
+            chord__pb2.FileChunk.SerializeToString,
             chord__pb2.FileResponse.FromString,
             options,
             channel_credentials,
@@ -123,11 +360,38 @@ class ChordService(object):
             wait_for_ready=None,
             timeout=None,
             metadata=None):
-        return grpc.experimental.unary_unary(
+        return grpc.experimental.unary_stream(
             request,
             target,
             '/ChordService/DownloadFile',
             chord__pb2.FileRequest.SerializeToString,
+            chord__pb2.FileChunk.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def TransferFiles(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            '/ChordService/TransferFiles',
+            chord__pb2.FileChunk.SerializeToString,
             chord__pb2.FileResponse.FromString,
             options,
             channel_credentials,
@@ -138,3 +402,354 @@ class ChordService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def StoreFiles(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            '/ChordService/StoreFiles',
+            chord__pb2.FileChunk.SerializeToString,
+            chord__pb2.FileResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def DownloadFiles(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/ChordService/DownloadFiles',
+            chord__pb2.FileList.SerializeToString,
+            chord__pb2.FileChunk.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def MerkleHashes(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ChordService/MerkleHashes',
+            chord__pb2.MerkleRequest.SerializeToString,
+            chord__pb2.MerkleReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def MerkleKeys(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ChordService/MerkleKeys',
+            chord__pb2.MerkleRequest.SerializeToString,
+            chord__pb2.MerkleKeysReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def FindSuccessor(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ChordService/FindSuccessor',
+            chord__pb2.FindSuccessorRequest.SerializeToString,
+            chord__pb2.LookupReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ClosestPreceding(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ChordService/ClosestPreceding',
+            chord__pb2.ClosestPrecedingRequest.SerializeToString,
+            chord__pb2.ClosestPrecedingReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetSuccessor(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ChordService/GetSuccessor',
+            chord__pb2.Empty.SerializeToString,
+            chord__pb2.NodeInfo.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetPredecessor(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ChordService/GetPredecessor',
+            chord__pb2.Empty.SerializeToString,
+            chord__pb2.NodeInfo.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetNeighbors(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ChordService/GetNeighbors',
+            chord__pb2.Empty.SerializeToString,
+            chord__pb2.Neighbors.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Notify(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ChordService/Notify',
+            chord__pb2.NodeInfo.SerializeToString,
+            chord__pb2.Empty.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Ping(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ChordService/Ping',
+            chord__pb2.Empty.SerializeToString,
+            chord__pb2.Empty.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def HostStats(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ChordService/HostStats',
+            chord__pb2.Empty.SerializeToString,
+            chord__pb2.HostStatsReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetTrace(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ChordService/GetTrace',
+            chord__pb2.TraceRequest.SerializeToString,
+            chord__pb2.TraceReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
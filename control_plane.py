@@ -0,0 +1,267 @@
+import asyncio
+import functools
+import threading
+import time
+from collections import deque
+import grpc
+import chord_pb2 as pb2
+from http_pool import HttpPool
+from grpc_channels import ChannelCache, AsyncChannelCache
+from tracing import current_trace, TRACE_HEADER, TRACE_METADATA
+
+def encode_node(node: dict) -> dict:
+    #los ids viajan como texto decimal: con m grande no caben en un número json de doble precisión sin perder dígitos
+    return {**node, 'id': str(node['id'])} if node else {}
+
+def decode_node(data: dict) -> dict:
+    #inverso de encode_node, acepta ids como texto o como número
+    return {**data, 'id': int(data['id'])} if data and 'id' in data else {}
+
+def node_to_pb(node: dict) -> pb2.NodeInfo:
+    #un nodo vacío ({}) viaja como NodeInfo sin id
+    return pb2.NodeInfo(id=str(node['id']), ip=node['ip'], port=node['port']) if node else pb2.NodeInfo()
+
+def node_from_pb(message: pb2.NodeInfo) -> dict:
+    return {'ip': message.ip, 'port': message.port, 'id': int(message.id)} if message.id else {}
+
+def hop_to_pb(hop: dict) -> pb2.TraceHop:
+    return pb2.TraceHop(**{**hop, 'to': node_to_pb(decode_node(hop['to']))})
+
+def hop_from_pb(message: pb2.TraceHop) -> dict:
+    #inverso de hop_to_pb, con el nodo destino como en las respuestas rest (id como texto)
+    hop = {field: getattr(message, field) for field in ('node', 'address', 'operation', 'mode', 'id', 'hops', 'started', 'ms', 'result', 'error')}
+    hop['to'] = encode_node(node_from_pb(message.to))
+    return hop
+
+def grpc_address(node: dict) -> str:
+    #dirección del servidor grpc de un nodo (puerto rest + 1)
+    return f"{node['ip']}:{node['port'] + 1}"
+
+def grpc_metadata(node: dict) -> tuple:
+    #metadata grpc con el id del nodo virtual destino dentro de su proceso (sin id responde el primero)
+    #y la traza de la búsqueda en curso, si hay una
+    metadata = (('chord-node', str(node['id'])),) if 'id' in node else ()
+    trace_id = current_trace.get()
+    return metadata + ((TRACE_METADATA, trace_id),) if trace_id else metadata
+
+class MessageRate:
+    """
+    Cuenta los mensajes de control que salen del proceso, para reportar cuántos por segundo genera el mantenimiento.
+    """
+    def __init__(self, window: int = 60) -> None:
+        self.window = window  #segundos que se promedian en rate()
+        self.total = 0
+        self.seconds = deque()  #[segundo, mensajes] de los últimos window segundos
+        self.lock = threading.Lock()
+
+    def record(self) -> None:
+        second = int(time.monotonic())
+        with self.lock:
+            self.total += 1
+            if self.seconds and self.seconds[-1][0] == second:
+                self.seconds[-1][1] += 1
+            else:
+                self.seconds.append([second, 1])
+            while self.seconds[0][0] <= second - self.window:
+                self.seconds.popleft()
+
+    def rate(self) -> float:
+        #mensajes por segundo en los últimos window segundos
+        oldest = int(time.monotonic()) - self.window
+        with self.lock:
+            return sum(count for second, count in self.seconds if second > oldest) / self.window
+
+class RestControlPlane:
+    """
+    Mensajes de control de chord (find_successor, notify, stabilize, ping) como JSON sobre HTTP
+    contra las rutas de Flask de los otros nodos.
+    Todos los métodos lanzan una excepción si el nodo no responde o responde con error.
+    """
+    def __init__(self, http: HttpPool) -> None:
+        self.http = http
+        self.messages = MessageRate()
+
+    def params(self, peer: dict) -> dict:
+        #el parámetro node indica cuál de los nodos virtuales de ese proceso debe responder
+        return {'node': str(peer['id'])} if 'id' in peer else {}
+
+    def headers(self) -> dict:
+        #la traza de la búsqueda en curso viaja en una cabecera
+        trace_id = current_trace.get()
+        return {TRACE_HEADER: trace_id} if trace_id else {}
+
+    def get(self, peer: dict, path: str):
+        self.messages.record()
+        response = self.http.get(peer['ip'], peer['port'], path, params=self.params(peer), headers=self.headers())
+        response.raise_for_status()
+        return response.json()
+
+    def post(self, peer: dict, path: str, data: dict):
+        self.messages.record()
+        response = self.http.post(peer['ip'], peer['port'], path, params=self.params(peer), headers=self.headers(), json=data)
+        response.raise_for_status()
+        return response.json()
+
+    def find_successor(self, peer: dict, id_to_find: int, hops: int = 0, mode: str = "recursive") -> tuple:
+        #devuelve (nodo responsable, saltos que tomó la búsqueda)
+        data = self.post(peer, "/find_successor", {'id': str(id_to_find), 'hops': hops, 'mode': mode})
+        return decode_node({key: value for key, value in data.items() if key != 'hops'}), data.get('hops', hops)
+
+    def closest_preceding(self, peer: dict, id_to_find: int, count: int) -> tuple:
+        #un paso de la búsqueda iterativa: devuelve (sucesor de peer, nodos que peer conoce más cerca de id_to_find)
+        data = self.post(peer, "/closest_preceding", {'id': str(id_to_find), 'count': count})
+        return decode_node(data['successor']), [decode_node(node) for node in data['nodes']]
+
+    def get_successor(self, peer: dict) -> dict:
+        return decode_node(self.get(peer, "/get_successor"))
+
+    def get_predecessor(self, peer: dict) -> dict:
+        self.messages.record()
+        response = self.http.get(peer['ip'], peer['port'], "/get_predecessor", params=self.params(peer))
+        if response.status_code == 404:
+            return {}  #el nodo todavía no tiene predecesor
+        response.raise_for_status()
+        return decode_node(response.json())
+
+    def get_neighbors(self, peer: dict) -> tuple:
+        #devuelve (predecesor, lista de sucesores) del nodo
+        neighbors = self.get(peer, "/get_neighbors")
+        return decode_node(neighbors['predecessor']), [decode_node(node) for node in neighbors['successors']]
+
+    def notify(self, peer: dict, node: dict) -> None:
+        self.post(peer, "/notify", encode_node(node))
+
+    def ping(self, peer: dict) -> None:
+        self.get(peer, "/ping")
+
+    def host_stats(self, peer: dict) -> dict:
+        #claves de cada nodo virtual del proceso de peer: {'vnodes': [{'id', 'files'}], 'files'}
+        self.messages.record()
+        response = self.http.get(peer['ip'], peer['port'], "/host_stats")
+        response.raise_for_status()
+        return response.json()
+
+    def get_trace(self, peer: dict, trace_id: str) -> list:
+        #saltos que registró el proceso de peer para la traza
+        self.messages.record()
+        response = self.http.get(peer['ip'], peer['port'], f"/trace/{trace_id}", params={'local': 1})
+        response.raise_for_status()
+        return response.json()['hops']
+
+class GrpcControlPlane:
+    """
+    Los mismos mensajes de control por gRPC, sobre los canales persistentes del servidor de archivos
+    (puerto rest + 1): sin parseo de JSON ni conexiones HTTP/1.1 para los mensajes chicos y frecuentes de stabilize.
+    Todos los métodos lanzan una excepción si el nodo no responde o responde con error.
+    """
+    def __init__(self, channels: ChannelCache, timeout: float = 5) -> None:
+        self.channels = channels
+        self.timeout = timeout  #segundos por llamada; find_successor incluye los saltos siguientes
+        self.messages = MessageRate()
+
+    def call(self, peer: dict, method: str, request):
+        self.messages.record()
+        return self.channels.call(grpc_address(peer), lambda stub: getattr(stub, method)(request, timeout=self.timeout, metadata=grpc_metadata(peer)))
+
+    def find_successor(self, peer: dict, id_to_find: int, hops: int = 0, mode: str = "recursive") -> tuple:
+        #devuelve (nodo responsable, saltos que tomó la búsqueda)
+        reply = self.call(peer, 'FindSuccessor', pb2.FindSuccessorRequest(id=str(id_to_find), hops=hops, mode=mode))
+        return node_from_pb(reply.node), reply.hops
+
+    def closest_preceding(self, peer: dict, id_to_find: int, count: int) -> tuple:
+        #un paso de la búsqueda iterativa: devuelve (sucesor de peer, nodos que peer conoce más cerca de id_to_find)
+        reply = self.call(peer, 'ClosestPreceding', pb2.ClosestPrecedingRequest(id=str(id_to_find), count=count))
+        return node_from_pb(reply.successor), [node_from_pb(node) for node in reply.nodes]
+
+    def get_successor(self, peer: dict) -> dict:
+        return node_from_pb(self.call(peer, 'GetSuccessor', pb2.Empty()))
+
+    def get_predecessor(self, peer: dict) -> dict:
+        try:
+            return node_from_pb(self.call(peer, 'GetPredecessor', pb2.Empty()))
+        except grpc.RpcError as e:
+            if e.code() == grpc.StatusCode.NOT_FOUND:
+                return {}  #el nodo todavía no tiene predecesor
+            raise
+
+    def get_neighbors(self, peer: dict) -> tuple:
+        #devuelve (predecesor, lista de sucesores) del nodo
+        neighbors = self.call(peer, 'GetNeighbors', pb2.Empty())
+        return node_from_pb(neighbors.predecessor), [node_from_pb(node) for node in neighbors.successors]
+
+    def notify(self, peer: dict, node: dict) -> None:
+        self.call(peer, 'Notify', node_to_pb(node))
+
+    def ping(self, peer: dict) -> None:
+        self.call(peer, 'Ping', pb2.Empty())
+
+    def host_stats(self, peer: dict) -> dict:
+        reply = self.call({'ip': peer['ip'], 'port': peer['port']}, 'HostStats', pb2.Empty())
+        vnodes = [{'id': vnode.id, 'files': vnode.files} for vnode in reply.vnodes]
+        return {'vnodes': vnodes, 'files': sum(vnode['files'] for vnode in vnodes)}
+
+    def get_trace(self, peer: dict, trace_id: str) -> list:
+        reply = self.call({'ip': peer['ip'], 'port': peer['port']}, 'GetTrace', pb2.TraceRequest(trace=trace_id))
+        return [hop_from_pb(hop) for hop in reply.hops]
+
+class AsyncGrpcControlPlane:
+    """
+    Los mensajes de control que usa el mantenimiento (stabilize, check_predecessor, fix_fingers) como corrutinas
+    sobre canales grpc.aio: una ronda que espera a un nodo lento no ocupa un hilo.
+    Cuenta los mensajes en el mismo MessageRate que el plano de control bloqueante.
+    """
+    def __init__(self, channels: AsyncChannelCache, timeout: float = 5, messages: MessageRate = None) -> None:
+        self.channels = channels
+        self.timeout = timeout  #segundos por llamada; find_successor incluye los saltos siguientes
+        self.messages = messages or MessageRate()
+
+    async def call(self, peer: dict, method: str, request):
+        self.messages.record()
+        return await self.channels.call(grpc_address(peer), lambda stub: getattr(stub, method)(request, timeout=self.timeout, metadata=grpc_metadata(peer)))
+
+    async def find_successor(self, peer: dict, id_to_find: int, hops: int = 0, mode: str = "recursive") -> tuple:
+        reply = await self.call(peer, 'FindSuccessor', pb2.FindSuccessorRequest(id=str(id_to_find), hops=hops, mode=mode))
+        return node_from_pb(reply.node), reply.hops
+
+    async def get_neighbors(self, peer: dict) -> tuple:
+        neighbors = await self.call(peer, 'GetNeighbors', pb2.Empty())
+        return node_from_pb(neighbors.predecessor), [node_from_pb(node) for node in neighbors.successors]
+
+    async def notify(self, peer: dict, node: dict) -> None:
+        await self.call(peer, 'Notify', node_to_pb(node))
+
+    async def ping(self, peer: dict) -> None:
+        await self.call(peer, 'Ping', pb2.Empty())
+
+class ExecutorControlPlane:
+    """
+    Adapta un plano de control bloqueante a corrutinas ejecutando cada mensaje en un pool fijo de hilos.
+    Se usa con control_plane = "rest", que no tiene un cliente HTTP asíncrono entre las dependencias.
+    """
+    def __init__(self, control, executor) -> None:
+        self.control = control
+        self.executor = executor
+        self.messages = control.messages
+
+    def __getattr__(self, method: str):
+        blocking = getattr(self.control, method)
+
+        async def call(*args, **kwargs):
+            return await asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(blocking, *args, **kwargs))
+        return call
+
+def open_control_plane(config: dict, http: HttpPool, channels: ChannelCache):
+    #crea el plano de control elegido en bootstrap.json ("grpc" o "rest"); todos los nodos del anillo deben
+    #poder atenderlo: con "rest" hace falta el servidor rest en todos, con "grpc" basta el servidor grpc
+    transport = config.get("control_plane", "grpc")
+    if transport == "grpc":
+        return GrpcControlPlane(channels, timeout=config.get("grpc_control_timeout", 5))
+    if transport == "rest":
+        return RestControlPlane(http)
+    raise ValueError(f"Plano de control desconocido: {transport}")
+
+def open_async_control_plane(config: dict, control, executor):
+    #versión asíncrona del plano de control para el motor de mantenimiento; comparte el contador de mensajes con control
+    if isinstance(control, GrpcControlPlane):
+        return AsyncGrpcControlPlane(AsyncChannelCache.from_config(config), timeout=control.timeout, messages=control.messages)
+    return ExecutorControlPlane(control, executor)
@@ -0,0 +1,59 @@
+import math
+import threading
+import time
+from collections import deque
+
+class PhiAccrualDetector:
+    """
+    Detector de fallas phi accrual (Hayashibara et al.): en vez de contar fallos seguidos, mide cuán improbable es
+    no haber sabido nada de un nodo durante tanto tiempo, según la distribución de los intervalos entre sus
+    respuestas anteriores. phi = -log10(probabilidad de que la próxima respuesta llegue todavía más tarde);
+    el nodo se da por caído cuando phi supera threshold (8 equivale a una probabilidad de 1e-8 de equivocarse).
+    Así un nodo lento pero vivo no se descarta por un par de timeouts y uno caído se detecta en cuanto su
+    silencio deja de ser normal.
+    """
+    def __init__(self, threshold: float = 8.0, min_std: float = 0.5, window: int = 100, first_interval: float = 1.0, clock=time.monotonic) -> None:
+        self.threshold = threshold  #phi a partir del cual el nodo se da por caído
+        self.min_std = min_std  #desvío mínimo en segundos, para que intervalos muy regulares no den falsos positivos
+        self.first_interval = first_interval  #intervalo supuesto mientras no hay historia
+        self.window = window  #intervalos recordados por nodo
+        self.clock = clock  #reloj en segundos; el simulador pone el suyo
+        self.last = {}  #id del nodo -> última respuesta (monotonic)
+        self.intervals = {}  #id del nodo -> últimos intervalos entre respuestas
+        self.lock = threading.Lock()
+
+    def heartbeat(self, node_id: int, now: float = None) -> None:
+        #registra una respuesta (o cualquier mensaje) del nodo
+        now = self.clock() if now is None else now
+        with self.lock:
+            last = self.last.get(node_id)
+            if last is not None:
+                self.intervals.setdefault(node_id, deque(maxlen=self.window)).append(now - last)
+            self.last[node_id] = now
+
+    def phi(self, node_id: int, now: float = None) -> float:
+        #nivel de sospecha sobre el nodo; infinito si nunca respondió
+        now = self.clock() if now is None else now
+        with self.lock:
+            last = self.last.get(node_id)
+            if last is None:
+                return math.inf
+            intervals = list(self.intervals.get(node_id, ())) or [self.first_interval]
+        mean = sum(intervals) / len(intervals)
+        std = max(math.sqrt(sum((x - mean) ** 2 for x in intervals) / len(intervals)), self.min_std)
+        elapsed = now - last
+        #aproximación logística de la cola de la normal, acotada para no desbordar exp
+        y = max(-10.0, min(10.0, (elapsed - mean) / std))
+        e = math.exp(-y * (1.5976 + 0.070566 * y * y))
+        if elapsed > mean:
+            return -math.log10(e / (1 + e))
+        return -math.log10(1 - 1 / (1 + e))
+
+    def is_available(self, node_id: int) -> bool:
+        return self.phi(node_id) < self.threshold
+
+    def remove(self, node_id: int) -> None:
+        #olvida la historia de un nodo descartado
+        with self.lock:
+            self.last.pop(node_id, None)
+            self.intervals.pop(node_id, None)
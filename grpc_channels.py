@@ -0,0 +1,346 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+import grpc
+import chord_pb2_grpc as pb2_grpc
+
+class Transfer:
+    """
+    Una llamada grpc con stream de archivos en curso (StoreFile, TransferFiles, DownloadFile...). No tiene un deadline
+    fijo porque su duración depende del tamaño, pero se cancela si pasan idle_timeout segundos sin que avance un
+    fragmento: un nodo vivo con el handler trabado no deja esperando para siempre a quien llama.
+    """
+    def __init__(self, idle_timeout: float) -> None:
+        self.idle_timeout = idle_timeout
+        self.deadline = time.monotonic() + idle_timeout  #momento a partir del cual se cancela si no avanzó
+        self.call = None  #llamada grpc, para poder cancelarla
+        self.expired = False  #se canceló por no avanzar
+
+    def advance(self, extra: float = 0) -> None:
+        #avanzó un fragmento: vuelve a dar idle_timeout segundos (más extra) para el siguiente
+        self.deadline = time.monotonic() + self.idle_timeout + extra
+
+    def error(self, e: Exception) -> Exception:
+        #la excepción que ve quien llama: TimeoutError si la cancelamos por no avanzar, si no la original
+        if self.expired:
+            return TimeoutError(f"La transferencia no avanzó en {self.idle_timeout} s")
+        return e
+
+class ChannelCache:
+    """
+    Cache LRU de canales gRPC, uno por dirección de nodo (ip:puerto grpc).
+    Los canales se mantienen abiertos entre llamadas para reutilizar la conexión HTTP/2,
+    se verifican antes de usarse y se reconectan si el nodo dejó de responder.
+    Un canal que sale de la cache (por LRU o porque se reconectó) con llamadas en curso no se cierra
+    hasta que termina la última, así una transferencia larga no se corta porque otro hilo abrió canales.
+    Las llamadas con stream de archivos van por send y receive, que las cancelan si pasan rpc_timeout segundos
+    sin avanzar; un solo hilo vigila todas.
+    """
+    def __init__(self, max_channels: int = 32, ready_timeout: float = 2, rpc_timeout: float = 10) -> None:
+        self.max_channels = max_channels  #máximo de canales abiertos al mismo tiempo
+        self.ready_timeout = ready_timeout  #segundos para esperar a que un canal nuevo esté listo
+        self.rpc_timeout = rpc_timeout  #segundos máximos sin que avance un fragmento de una transferencia de archivos
+        self.options = [
+            ('grpc.keepalive_time_ms', 30000),  #ping http/2 para detectar conexiones muertas
+            ('grpc.keepalive_timeout_ms', 10000),
+        ]
+        self.channels = OrderedDict()  #dirección -> (canal, stub), en orden de uso
+        self.states = {}  #dirección -> último estado de conectividad observado
+        self.in_use = {}  #canal -> llamadas en curso sobre él
+        self.retired = set()  #canales que salieron de la cache con llamadas en curso, se cierran al terminar la última
+        self.transfers = set()  #transferencias en curso que vigila watch_transfers
+        self.watchdog = None  #hilo que cancela las transferencias trabadas, se inicia con la primera
+        self.closed = threading.Event()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "ChannelCache":
+        #crea la cache con los parámetros de bootstrap.json, usando valores por defecto si no están
+        return cls(
+            max_channels=config.get("grpc_max_channels", 32),
+            ready_timeout=config.get("grpc_ready_timeout", 2),
+            rpc_timeout=config.get("grpc_rpc_timeout", 10),
+        )
+
+    def acquire(self, address: str) -> tuple:
+        #devuelve (canal, stub) del canal cacheado para la dirección, abriendo uno nuevo si no hay o si está caído,
+        #y lo marca en uso hasta que se llame a release
+        with self.lock:
+            entry = self.channels.get(address)
+            if entry and self.states.get(address) not in (grpc.ChannelConnectivity.TRANSIENT_FAILURE, grpc.ChannelConnectivity.SHUTDOWN):
+                self.channels.move_to_end(address)
+                self.in_use[entry[0]] = self.in_use.get(entry[0], 0) + 1
+                return entry
+        if entry:
+            self.invalidate(address)
+        return self.connect(address)
+
+    def release(self, channel: grpc.Channel) -> None:
+        #terminó una llamada sobre el canal; si ya salió de la cache y era la última, se cierra
+        with self.lock:
+            remaining = self.in_use.pop(channel) - 1
+            if remaining:
+                self.in_use[channel] = remaining
+                return
+            if channel not in self.retired:
+                return
+            self.retired.discard(channel)
+        channel.close()
+
+    def retire(self, channel: grpc.Channel) -> list:
+        #se llama con el lock tomado al sacar un canal de la cache: devuelve [canal] si se puede cerrar ya,
+        #si tiene llamadas en curso lo deja para release
+        if channel in self.in_use:
+            self.retired.add(channel)
+            return []
+        return [channel]
+
+    def connect(self, address: str) -> tuple:
+        #abre un canal y espera a que esté listo antes de guardarlo en la cache
+        #si la conexión se rechaza (TRANSIENT_FAILURE) se falla en el momento en vez de esperar ready_timeout,
+        #así un nodo caído se detecta tan rápido como con una conexión http rechazada
+        channel = grpc.insecure_channel(address, options=self.options)
+        settled = threading.Event()
+        outcome = []  #primer estado definitivo del canal
+
+        def watch(state):
+            self.on_state_change(address, channel, state)
+            if not outcome and state in (grpc.ChannelConnectivity.READY, grpc.ChannelConnectivity.TRANSIENT_FAILURE, grpc.ChannelConnectivity.SHUTDOWN):
+                outcome.append(state)
+                settled.set()
+
+        channel.subscribe(watch, try_to_connect=True)
+        if not settled.wait(self.ready_timeout) or outcome[0] != grpc.ChannelConnectivity.READY:
+            channel.unsubscribe(watch)
+            channel.close()
+            raise ConnectionError(f"El nodo gRPC {address} no está disponible")
+        stub = pb2_grpc.ChordServiceStub(channel)
+
+        with self.lock:
+            entry = self.channels.get(address)
+            if entry:
+                #otro hilo se conectó mientras esperábamos: se usa su canal, que puede tener llamadas en curso
+                evicted = [channel]
+                self.channels.move_to_end(address)
+            else:
+                entry = self.channels[address] = (channel, stub)
+                evicted = []
+                while len(self.channels) > self.max_channels:
+                    oldest_address, (oldest, _) = self.channels.popitem(last=False)
+                    self.states.pop(oldest_address, None)
+                    evicted.extend(self.retire(oldest))
+            self.in_use[entry[0]] = self.in_use.get(entry[0], 0) + 1
+        for old_channel in evicted:
+            old_channel.close()
+        return entry
+
+    def on_state_change(self, address: str, channel: grpc.Channel, state: grpc.ChannelConnectivity) -> None:
+        #registra el estado de conectividad del canal, ignorando canales que ya salieron de la cache
+        with self.lock:
+            entry = self.channels.get(address)
+            if entry and entry[0] is channel:
+                self.states[address] = state
+
+    def invalidate(self, address: str) -> None:
+        #saca de la cache el canal de un nodo, la próxima llamada abrirá uno nuevo; se cierra cuando no tenga llamadas en curso
+        with self.lock:
+            entry = self.channels.pop(address, None)
+            self.states.pop(address, None)
+            evicted = self.retire(entry[0]) if entry else []
+        for channel in evicted:
+            channel.close()
+
+    def run(self, address: str, fn):
+        #ejecuta fn(stub) con el canal marcado en uso mientras dura la llamada
+        channel, stub = self.acquire(address)
+        try:
+            return fn(stub)
+        finally:
+            self.release(channel)
+
+    def call(self, address: str, fn):
+        #ejecuta fn(stub) sobre el canal cacheado; si el nodo no está disponible reconecta y reintenta una vez
+        try:
+            return self.run(address, fn)
+        except grpc.RpcError as e:
+            if e.code() != grpc.StatusCode.UNAVAILABLE:
+                raise
+        self.invalidate(address)
+        return self.run(address, fn)
+
+    def track(self) -> Transfer:
+        #registra una transferencia nueva para que el vigilante la cancele si se traba
+        transfer = Transfer(self.rpc_timeout)
+        with self.lock:
+            self.transfers.add(transfer)
+            if self.watchdog is None:
+                self.watchdog = threading.Thread(target=self.watch_transfers, daemon=True)
+                self.watchdog.start()
+        return transfer
+
+    def untrack(self, transfer: Transfer) -> None:
+        with self.lock:
+            self.transfers.discard(transfer)
+
+    def watch_transfers(self) -> None:
+        #cancela las transferencias que pasaron su deadline sin avanzar
+        while not self.closed.wait(min(1, self.rpc_timeout / 4)):
+            now = time.monotonic()
+            with self.lock:
+                stalled = [transfer for transfer in self.transfers if transfer.call is not None and not transfer.expired and transfer.deadline < now]
+            for transfer in stalled:
+                transfer.expired = True
+                transfer.call.cancel()
+
+    def send(self, method, chunks, copies: int = 0, **kwargs):
+        #llamada con stream de envío (StoreFile, StoreFiles, TransferFiles): se cancela si pasan rpc_timeout segundos
+        #sin que salga un fragmento. Si el nodo hace copies copias en sus réplicas antes de responder, después del
+        #último fragmento se le da además copies veces lo que tardó el envío
+        transfer = self.track()
+        started = time.monotonic()
+
+        def tracked():
+            for chunk in chunks:
+                transfer.advance()
+                yield chunk
+            transfer.advance(copies * (time.monotonic() - started))
+
+        try:
+            transfer.call = method.future(tracked(), **kwargs)
+            return transfer.call.result()
+        except (grpc.RpcError, grpc.FutureCancelledError) as e:
+            raise transfer.error(e)
+        finally:
+            self.untrack(transfer)
+
+    def receive(self, method, request, **kwargs):
+        #llamada con stream de respuesta (DownloadFile, DownloadFiles): devuelve los fragmentos a medida que llegan
+        #y se cancela si pasan rpc_timeout segundos sin que llegue uno, o si quien lee deja el stream a medias
+        transfer = self.track()
+        try:
+            transfer.call = method(request, **kwargs)
+            for chunk in transfer.call:
+                transfer.advance()
+                yield chunk
+        except grpc.RpcError as e:
+            raise transfer.error(e)
+        finally:
+            self.untrack(transfer)
+            if transfer.call is not None:
+                transfer.call.cancel()  #no hace nada si el stream ya terminó
+
+    def close(self) -> None:
+        #cierra todos los canales abiertos, también los que tienen llamadas en curso
+        self.closed.set()
+        with self.lock:
+            channels = [channel for channel, _ in self.channels.values()] + list(self.retired)
+            self.channels.clear()
+            self.states.clear()
+            self.retired.clear()
+        for channel in channels:
+            channel.close()
+
+class AsyncChannelCache:
+    """
+    La misma cache LRU de canales con grpc.aio, para las corrutinas del motor de mantenimiento.
+    Solo se usa desde el event loop del motor, por eso no necesita lock.
+    """
+    def __init__(self, max_channels: int = 32, ready_timeout: float = 2) -> None:
+        self.max_channels = max_channels  #máximo de canales abiertos al mismo tiempo
+        self.ready_timeout = ready_timeout  #segundos para esperar a que un canal nuevo esté listo
+        self.options = [
+            ('grpc.keepalive_time_ms', 30000),  #ping http/2 para detectar conexiones muertas
+            ('grpc.keepalive_timeout_ms', 10000),
+        ]
+        self.channels = OrderedDict()  #dirección -> (canal, stub), en orden de uso
+        self.in_use = {}  #canal -> llamadas en curso sobre él
+        self.retired = set()  #canales que salieron de la cache con llamadas en curso, se cierran al terminar la última
+
+    @classmethod
+    def from_config(cls, config: dict) -> "AsyncChannelCache":
+        return cls(
+            max_channels=config.get("grpc_max_channels", 32),
+            ready_timeout=config.get("grpc_ready_timeout", 2),
+        )
+
+    async def acquire(self, address: str) -> tuple:
+        #devuelve (canal, stub) del canal cacheado para la dirección, abriendo uno nuevo si no hay o si está caído,
+        #y lo marca en uso hasta que se llame a release
+        entry = self.channels.get(address)
+        if entry and entry[0].get_state() not in (grpc.ChannelConnectivity.TRANSIENT_FAILURE, grpc.ChannelConnectivity.SHUTDOWN):
+            self.channels.move_to_end(address)
+        else:
+            if entry:
+                await self.invalidate(address)
+            entry = await self.connect(address)
+        self.in_use[entry[0]] = self.in_use.get(entry[0], 0) + 1
+        return entry
+
+    async def release(self, channel: grpc.aio.Channel) -> None:
+        #terminó una llamada sobre el canal; si ya salió de la cache y era la última, se cierra
+        remaining = self.in_use.pop(channel) - 1
+        if remaining:
+            self.in_use[channel] = remaining
+        elif channel in self.retired:
+            self.retired.discard(channel)
+            await channel.close()
+
+    async def retire(self, channel: grpc.aio.Channel) -> None:
+        #cierra un canal que salió de la cache, o lo deja para release si tiene llamadas en curso
+        if channel in self.in_use:
+            self.retired.add(channel)
+        else:
+            await channel.close()
+
+    async def connect(self, address: str) -> tuple:
+        #abre un canal y espera a que esté listo; igual que en ChannelCache, una conexión rechazada falla en el momento
+        channel = grpc.aio.insecure_channel(address, options=self.options)
+
+        async def ready():
+            state = channel.get_state(try_to_connect=True)
+            while state != grpc.ChannelConnectivity.READY:
+                if state in (grpc.ChannelConnectivity.TRANSIENT_FAILURE, grpc.ChannelConnectivity.SHUTDOWN):
+                    raise ConnectionError(f"El nodo gRPC {address} no está disponible")
+                await channel.wait_for_state_change(state)
+                state = channel.get_state(try_to_connect=True)
+
+        try:
+            await asyncio.wait_for(ready(), self.ready_timeout)
+        except (ConnectionError, asyncio.TimeoutError):
+            await channel.close()
+            raise ConnectionError(f"El nodo gRPC {address} no está disponible")
+        if address in self.channels:
+            #otra corrutina se conectó mientras esperábamos: se usa su canal, que puede tener llamadas en curso
+            await channel.close()
+            self.channels.move_to_end(address)
+            return self.channels[address]
+        entry = self.channels[address] = (channel, pb2_grpc.ChordServiceStub(channel))
+        while len(self.channels) > self.max_channels:
+            _, (oldest, _) = self.channels.popitem(last=False)
+            await self.retire(oldest)
+        return entry
+
+    async def invalidate(self, address: str) -> None:
+        #saca de la cache el canal de un nodo, la próxima llamada abrirá uno nuevo; se cierra cuando no tenga llamadas en curso
+        entry = self.channels.pop(address, None)
+        if entry:
+            await self.retire(entry[0])
+
+    async def run(self, address: str, fn):
+        #espera fn(stub) con el canal marcado en uso mientras dura la llamada
+        channel, stub = await self.acquire(address)
+        try:
+            return await fn(stub)
+        finally:
+            await self.release(channel)
+
+    async def call(self, address: str, fn):
+        #espera fn(stub) sobre el canal cacheado; si el nodo no está disponible reconecta y reintenta una vez
+        try:
+            return await self.run(address, fn)
+        except grpc.RpcError as e:
+            if e.code() != grpc.StatusCode.UNAVAILABLE:
+                raise
+        await self.invalidate(address)
+        return await self.run(address, fn)
@@ -1,29 +1,214 @@
+import itertools
 import grpc
 import chord_pb2_grpc as pb2_grpc
 import chord_pb2 as pb2
+from storage import iter_blocks
+from control_plane import node_to_pb, node_from_pb, hop_to_pb
+from tracing import traced, TRACE_METADATA
+
+def to_chunks(filename: str, blocks):
+    #convierte bloques de bytes en mensajes FileChunk, el nombre del archivo va solo en el primero
+    first = True
+    for block in blocks:
+        yield pb2.FileChunk(filename=filename if first else "", data=block)
+        first = False
+    if first:
+        yield pb2.FileChunk(filename=filename)  #archivo vacío: igual enviamos el nombre
+
+def chunk_bytes(filename: str, data: bytes, chunk_size: int):
+    #genera los fragmentos de un contenido en memoria
+    return to_chunks(filename, iter_blocks(data, chunk_size))
+
+def chunk_file(filename: str, path: str, chunk_size: int):
+    #genera los fragmentos leyendo el archivo del disco de a chunk_size bytes, sin cargarlo entero en memoria
+    with open(path, 'rb') as f:
+        yield from to_chunks(filename, iter(lambda: f.read(chunk_size), b""))
+
+def split_files(chunk_iterator):
+    #separa un stream con varios archivos en pares (filename, bloques), sin acumular los archivos en memoria
+    #cada archivo empieza con el fragmento que trae su nombre; los bloques deben consumirse antes de pedir el siguiente par
+    for first, blocks in split_chunks(chunk_iterator):
+        yield first.filename, blocks
+
+def split_chunks(chunk_iterator):
+    #como split_files, pero entrega el primer fragmento de cada archivo (con todos sus campos, p. ej. missing) en vez del nombre
+    pending = {'chunk': next(chunk_iterator, None)}
+    while pending['chunk'] is not None:
+        first = pending['chunk']
+        pending['chunk'] = None
+
+        def blocks(first=first):
+            yield first.data
+            for chunk in chunk_iterator:
+                if chunk.filename:
+                    pending['chunk'] = chunk
+                    return
+                yield chunk.data
+
+        yield first, blocks()
 
 class ChordService(pb2_grpc.ChordServiceServicer):
-    def __init__(self, node):
-        self.node = node
+    def __init__(self, host):
+        self.host = host
+
+    def node_for(self, context):
+        #el nodo virtual destino viaja en la metadata 'chord-node'; sin ella responde el primer nodo del proceso
+        node = self.host.vnode(dict(context.invocation_metadata()).get('chord-node'))
+        if node is None:
+            context.abort(grpc.StatusCode.NOT_FOUND, "Nodo virtual desconocido")
+        return node
 
-    def StoreFile(self, request, context):
+    def StoreFile(self, request_iterator, context):
         """
         Implementa el almacenamiento de un archivo en el nodo actual.
+        El archivo llega en fragmentos (client streaming); el nombre viene en el primero.
         """
-        filename = request.filename
-        content = request.content
-        self.node.files[filename] = content
-        return pb2.FileResponse(message=f"Archivo '{filename}' almacenado en nodo {self.node.id}")
+        node = self.node_for(context)
+        first = next(request_iterator, None)
+        if first is None or not first.filename:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Falta el nombre del archivo")
+        filename = first.filename
+        #los fragmentos se pasan al almacenamiento a medida que llegan
+        blocks = itertools.chain([first.data], (chunk.data for chunk in request_iterator))
+        node.files.put(filename, blocks)
+        message = f"Archivo '{filename}' almacenado en nodo {node.id}"
+        if node.replication_factor > 1:
+            #la escritura se confirma después de copiarla en las réplicas
+            message += f" y en {node.replicate([filename])} réplicas"
+        return pb2.FileResponse(message=message)
 
     def DownloadFile(self, request, context):
         """
         Implementa la descarga de un archivo desde el nodo actual.
+        El archivo se devuelve en fragmentos de chunk_size bytes (server streaming), con su versión (etag)
+        en el primero. Si quien pide ya tiene esa versión en su cache de lectura, responde un solo fragmento
+        not_modified sin datos.
         """
+        node = self.node_for(context)
         filename = request.filename
-        if filename in self.node.files:
-            return pb2.FileResponse(content=self.node.files[filename])
-        else:
-            context.set_code(grpc.StatusCode.NOT_FOUND)
-            context.set_details(f"Archivo '{filename}' no encontrado en nodo {self.node.id}")
-            return pb2.FileResponse(content="No encontrado.") #no se puede devolver None
+        #la versión se lee antes que el contenido: si una escritura se mete en el medio, quien pide guarda el
+        #contenido nuevo con la versión vieja y lo vuelve a descargar en la próxima lectura, nunca al revés
+        try:
+            etag = node.files.etag(filename)
+        except KeyError:
+            context.abort(grpc.StatusCode.NOT_FOUND, f"Archivo '{filename}' no encontrado en nodo {node.id}")
+        if request.etag == etag:
+            yield pb2.FileChunk(filename=filename, etag=etag, not_modified=True)
+            return
+        chunks = to_chunks(filename, node.files.iter_chunks(filename, node.chunk_size))
+        first = next(chunks)
+        first.etag = etag
+        yield first
+        yield from chunks
+
+    def StoreFiles(self, request_iterator, context):
+        """
+        Almacena varios archivos enviados uno detrás de otro en un mismo stream (store_many).
+        """
+        node = self.node_for(context)
+        filenames = []
+        for filename, blocks in split_files(request_iterator):
+            node.files.put(filename, blocks)
+            filenames.append(filename)
+        message = f"{len(filenames)} archivos almacenados en nodo {node.id}"
+        if node.replication_factor > 1 and filenames:
+            message += f" y en {node.replicate(filenames)} réplicas"
+        return pb2.FileResponse(message=message)
+
+    def DownloadFiles(self, request, context):
+        """
+        Devuelve varios archivos uno detrás de otro en un mismo stream (download_many).
+        Los que no están en el nodo se marcan con un fragmento missing.
+        """
+        node = self.node_for(context)
+        for filename in request.filenames:
+            try:
+                yield from to_chunks(filename, node.files.iter_chunks(filename, node.chunk_size))
+            except KeyError:
+                yield pb2.FileChunk(filename=filename, missing=True)
+
+    def MerkleHashes(self, request, context):
+        #hashes de algunos subárboles de un nivel del árbol de Merkle del nodo, para la anti-entropía
+        merkle = self.node_for(context).merkle
+        if request.level > merkle.depth or any(index >= 2 ** request.level for index in request.indexes):
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Subárbol fuera del árbol de Merkle")
+        return pb2.MerkleReply(depth=merkle.depth, hashes=merkle.hashes(request.level, request.indexes))
+
+    def MerkleKeys(self, request, context):
+        #claves y digests de las hojas pedidas, el último paso de la anti-entropía
+        merkle = self.node_for(context).merkle
+        if request.level != merkle.depth or any(index >= 2 ** merkle.depth for index in request.indexes):
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Hoja fuera del árbol de Merkle")
+        keys = merkle.keys_in(request.indexes)
+        return pb2.MerkleKeysReply(keys=[pb2.KeyDigest(filename=filename, digest=digest.to_bytes(20, 'big')) for filename, digest in keys.items()])
+
+    def TransferFiles(self, request_iterator, context):
+        """
+        Recibe las claves que otro nodo le traspasa (al unirse un predecesor o al salir un nodo)
+        o las copias que le manda como réplica. Llegan varios archivos en un mismo stream, uno detrás de otro.
+        """
+        node = self.node_for(context)
+        count = 0
+        for filename, blocks in split_files(request_iterator):
+            node.files.put(filename, blocks)
+            count += 1
+        return pb2.FileResponse(message=f"{count} archivos recibidos en nodo {node.id}")
+
+    def FindSuccessor(self, request, context):
+        """
+        Busca el sucesor de un id (equivale a POST /find_successor). En modo recursivo reenvía la búsqueda
+        a otros nodos; en modo iterativo este nodo consulta a los demás con ClosestPreceding.
+        """
+        node = self.node_for(context)
+        #sigue la traza de quien reenvió la búsqueda; si la búsqueda empieza acá abre una si le toca en la muestra
+        with traced(dict(context.invocation_metadata()).get(TRACE_METADATA) or node.traces.sample()) as trace_id:
+            result, hops = node.serve_lookup(int(request.id), request.hops, request.mode or "recursive")
+        if not result:
+            context.abort(grpc.StatusCode.NOT_FOUND, "No se pudo encontrar el sucesor")
+        return pb2.LookupReply(node=node_to_pb(result), hops=hops, trace=trace_id)
+
+    def ClosestPreceding(self, request, context):
+        #un paso de la búsqueda iterativa: el sucesor de este nodo y los nodos que conoce más cerca del id
+        node = self.node_for(context)
+        routing = node.routing
+        nodes = node.closest_preceding_nodes(int(request.id), request.count, routing)
+        return pb2.ClosestPrecedingReply(successor=node_to_pb(routing.successor), nodes=[node_to_pb(n) for n in nodes])
+
+    def GetSuccessor(self, request, context):
+        node = self.node_for(context)
+        if not node.successor:
+            context.abort(grpc.StatusCode.NOT_FOUND, "El nodo no tiene sucesor")
+        return node_to_pb(node.successor)
+
+    def GetPredecessor(self, request, context):
+        node = self.node_for(context)
+        if not node.predecessor:
+            context.abort(grpc.StatusCode.NOT_FOUND, "El nodo no tiene predecesor")
+        return node_to_pb(node.predecessor)
+
+    def GetNeighbors(self, request, context):
+        """
+        Devuelve el predecesor y la lista de sucesores en un solo mensaje, usado por stabilize.
+        """
+        routing = self.node_for(context).routing  #predecesor y sucesores de la misma foto
+        return pb2.Neighbors(predecessor=node_to_pb(routing.predecessor),
+                             successors=[node_to_pb(successor) for successor in routing.successor_list])
+
+    def Notify(self, request, context):
+        node = self.node_for(context)
+        if not request.id:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Falta el id del nodo")
+        node.notify(node_from_pb(request))
+        return pb2.Empty()
+
+    def Ping(self, request, context):
+        self.node_for(context)
+        return pb2.Empty()
+
+    def HostStats(self, request, context):
+        #cantidad de claves de cada nodo virtual de este proceso, usado por el reporte de distribución
+        return pb2.HostStatsReply(vnodes=[pb2.VnodeStats(id=str(vnode.id), files=len(vnode.files)) for vnode in self.host.vnodes])
 
+    def GetTrace(self, request, context):
+        #saltos que registraron los nodos virtuales de este proceso para la traza (equivale a GET /trace/<id>?local=1)
+        return pb2.TraceReply(hops=[hop_to_pb(hop) for hop in self.host.traces.hops(request.trace)])
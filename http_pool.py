@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+
+class HttpPool:
+    """
+    Pool de sesiones HTTP keep-alive para las llamadas REST entre nodos.
+    Mantiene una sesión por nodo (ip:port), limita la cantidad de nodos con sesión abierta
+    y cierra las sesiones de los nodos que llevan mucho tiempo sin usarse.
+    """
+    def __init__(self, max_peers: int = 64, pool_size: int = 10, idle_timeout: float = 60,
+                 connect_timeout: float = 2, read_timeout: float = 5) -> None:
+        self.max_peers = max_peers  #máximo de nodos con sesión abierta
+        self.pool_size = pool_size  #conexiones keep-alive por nodo
+        self.idle_timeout = idle_timeout  #segundos sin uso antes de cerrar la sesión de un nodo
+        self.timeout = (connect_timeout, read_timeout)  #timeouts de conexión y lectura de requests
+        self.sessions = OrderedDict()  #"ip:port" -> (sesión, último uso), en orden de uso
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "HttpPool":
+        #crea el pool con los parámetros de bootstrap.json, usando valores por defecto si no están
+        return cls(
+            max_peers=config.get("http_max_peers", 64),
+            pool_size=config.get("http_pool_size", 10),
+            idle_timeout=config.get("http_idle_timeout", 60),
+            connect_timeout=config.get("http_connect_timeout", 2),
+            read_timeout=config.get("http_read_timeout", 5),
+        )
+
+    def new_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount("http://", adapter)
+        return session
+
+    def session(self, ip: str, port: int) -> requests.Session:
+        #devuelve la sesión del nodo ip:port, creándola si no existe
+        key = f"{ip}:{port}"
+        now = time.monotonic()
+        with self.lock:
+            self.evict_idle(now)
+            entry = self.sessions.pop(key, None)
+            session = entry[0] if entry else self.new_session()
+            self.sessions[key] = (session, now)
+            #si hay demasiados nodos cerramos el que lleva más tiempo sin usarse
+            while len(self.sessions) > self.max_peers:
+                _, (oldest, _) = self.sessions.popitem(last=False)
+                oldest.close()
+        return session
+
+    def evict_idle(self, now: float) -> None:
+        #cierra las sesiones inactivas; se llama con el lock tomado
+        while self.sessions:
+            key, (session, last_used) = next(iter(self.sessions.items()))
+            if now - last_used < self.idle_timeout:
+                break
+            del self.sessions[key]
+            session.close()
+
+    def get(self, ip: str, port: int, path: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session(ip, port).get(f"http://{ip}:{port}{path}", **kwargs)
+
+    def post(self, ip: str, port: int, path: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session(ip, port).post(f"http://{ip}:{port}{path}", **kwargs)
+
+    def close(self) -> None:
+        #cierra todas las sesiones abiertas
+        with self.lock:
+            for session, _ in self.sessions.values():
+                session.close()
+            self.sessions.clear()
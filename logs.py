@@ -0,0 +1,109 @@
+import json
+import logging
+import queue
+import random
+import sys
+import time
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+
+#atributos que trae todo LogRecord; los demás son campos estructurados (los de extra=, p. ej. node)
+RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Una línea por registro con la hora, el nivel, el logger, los campos estructurados y el mensaje,
+    como texto (campo=valor) o como un objeto json por línea para procesarla con otras herramientas.
+    """
+    def __init__(self, json_lines: bool = False) -> None:
+        super().__init__()
+        self.json_lines = json_lines
+
+    def format(self, record: logging.LogRecord) -> str:
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}"
+        fields = {key: value for key, value in vars(record).items() if key not in RECORD_FIELDS}
+        message = record.getMessage()
+        if self.json_lines:
+            return json.dumps({'time': timestamp, 'level': record.levelname, 'logger': record.name, **fields, 'message': message},
+                              ensure_ascii=False, default=str)
+        return " ".join([timestamp, record.levelname, record.name, *(f"{key}={value}" for key, value in fields.items()), message])
+
+class SamplingFilter(logging.Filter):
+    """
+    Deja pasar solo una fracción rate de los registros por debajo de WARNING (las líneas de cada petición);
+    las advertencias y los errores pasan siempre.
+    """
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler que nunca bloquea al hilo que registra: con la cola llena descarta el registro y lo cuenta.
+    """
+    def __init__(self, records: queue.Queue) -> None:
+        super().__init__(records)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class LogQueue:
+    """
+    Logging del proceso: los hilos de las peticiones y del mantenimiento solo arman el mensaje y lo encolan,
+    y un hilo aparte (QueueListener) le da formato y lo escribe en la salida estándar o en log_file, así
+    una terminal o un disco lento nunca frena a quien atiende peticiones.
+    Loggers: "chord.node" (eventos del anillo y errores), "chord.requests" (una línea por petición,
+    muestreada con log_sample_rate) y "chord.hops" (cada salto de las búsquedas, solo con log_hops).
+    """
+    def __init__(self, output: logging.Handler, size: int = 10000) -> None:
+        self.handler = DroppingQueueHandler(queue.Queue(size))
+        self.listener = QueueListener(self.handler.queue, output)
+
+    @classmethod
+    def from_config(cls, config: dict) -> "LogQueue":
+        #configura los loggers del proceso según bootstrap.json y arranca el hilo que escribe
+        log_file = config.get("log_file", "")
+        output = logging.FileHandler(log_file, encoding="utf-8") if log_file else logging.StreamHandler(sys.stdout)
+        output.setFormatter(StructuredFormatter(config.get("log_format", "text") == "json"))
+        log_queue = cls(output, config.get("log_queue_size", 10000))
+        root = logging.getLogger("chord")
+        root.handlers = [log_queue.handler]
+        root.propagate = False
+        root.setLevel(config.get("log_level", "INFO").upper())
+        logging.getLogger("chord.requests").addFilter(SamplingFilter(config.get("log_sample_rate", 0.01)))
+        #la traza por salto se apaga del todo (ni siquiera se arma el registro) salvo que se pida con log_hops
+        logging.getLogger("chord.hops").setLevel(logging.DEBUG if config.get("log_hops", False) else logging.CRITICAL + 1)
+        #las líneas por petición de los servidores http también pasan por la cola, y solo las advertencias
+        for name in ("werkzeug", "waitress"):
+            server_log = logging.getLogger(name)
+            server_log.handlers = [log_queue.handler]
+            server_log.propagate = False
+            server_log.setLevel(logging.WARNING)
+        log_queue.listener.start()
+        return log_queue
+
+    @property
+    def dropped(self) -> int:
+        return self.handler.dropped
+
+    def stop(self) -> None:
+        #escribe lo que quedó en la cola y detiene el hilo
+        self.listener.stop()
+
+@contextmanager
+def silenced(name: str = "chord"):
+    #apaga los registros de name y sus hijos mientras dura el bloque (benchmarks y simulador, que reportan por su cuenta)
+    logger = logging.getLogger(name)
+    level = logger.level
+    logger.setLevel(logging.CRITICAL + 1)
+    try:
+        yield
+    finally:
+        logger.setLevel(level)
@@ -0,0 +1,82 @@
+import bisect
+import threading
+import time
+from collections import OrderedDict
+
+class LookupCache:
+    """
+    Cache de ubicaciones: rangos de ids del anillo -> nodo responsable.
+    Si find_successor(x) devolvió el nodo n, no hay ningún nodo entre x y n, así que n es
+    responsable de todo el rango [x, n.id]. Se guarda un rango por nodo (el más amplio conocido),
+    con TTL, tamaño máximo y desalojo LRU.
+    """
+    def __init__(self, m: int, max_entries: int = 1024, ttl: float = 30) -> None:
+        self.ring = 2 ** m
+        self.max_entries = max_entries  #máximo de nodos recordados
+        self.ttl = ttl  #segundos que vale una entrada
+        self.entries = OrderedDict()  #id del nodo -> (inicio del rango, nodo, vencimiento), en orden de uso
+        self.sorted_ids = []  #ids de los nodos en la cache ordenados, para buscar con bisect
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def in_range(self, id_to_check: int, start: int, end: int) -> bool:
+        #verifica si id_to_check está en el rango cerrado [start, end], teniendo en cuenta la vuelta del anillo
+        if start <= end:
+            return start <= id_to_check <= end
+        return id_to_check >= start or id_to_check <= end
+
+    def get(self, id_to_find: int) -> dict:
+        #devuelve el nodo responsable de id_to_find si está en la cache y vigente, si no {}
+        with self.lock:
+            if self.sorted_ids:
+                #el único candidato es el primer nodo con id >= id_to_find (dando la vuelta al anillo)
+                node_id = self.sorted_ids[bisect.bisect_left(self.sorted_ids, id_to_find) % len(self.sorted_ids)]
+                start, node, expires = self.entries[node_id]
+                if expires < time.monotonic():
+                    self.remove(node_id)
+                elif self.in_range(id_to_find, start, node_id):
+                    self.entries.move_to_end(node_id)
+                    self.hits += 1
+                    return node
+            self.misses += 1
+            return {}
+
+    def put(self, id_found: int, node: dict) -> None:
+        #registra que node es responsable de [id_found, node.id]
+        with self.lock:
+            entry = self.entries.get(node['id'])
+            start = id_found
+            if entry and entry[2] >= time.monotonic():
+                #si ya conocíamos un rango para este nodo nos quedamos con el más amplio
+                if (node['id'] - entry[0]) % self.ring > (node['id'] - id_found) % self.ring:
+                    start = entry[0]
+            if not entry:
+                bisect.insort(self.sorted_ids, node['id'])
+            self.entries[node['id']] = (start, node, time.monotonic() + self.ttl)
+            self.entries.move_to_end(node['id'])
+            while len(self.entries) > self.max_entries:
+                self.remove(next(iter(self.entries)))
+
+    def remove(self, node_id: int) -> None:
+        #se llama con el lock tomado
+        del self.entries[node_id]
+        del self.sorted_ids[bisect.bisect_left(self.sorted_ids, node_id)]
+
+    def invalidate_node(self, node_id: int) -> None:
+        #olvida el rango de un nodo que no respondió
+        with self.lock:
+            if node_id in self.entries:
+                self.remove(node_id)
+
+    def clear(self) -> None:
+        #olvida todo, se usa cuando cambia el sucesor o el predecesor (el anillo cambió)
+        with self.lock:
+            self.entries.clear()
+            self.sorted_ids.clear()
+
+    def stats(self) -> dict:
+        with self.lock:
+            total = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries),
+                    'hit_rate': self.hits / total if total else 0.0}
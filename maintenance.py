@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import inspect
+import threading
+from concurrent import futures
+from adaptive_interval import AdaptiveInterval
+
+log = logging.getLogger("chord.maintenance")
+
+class MaintenanceEngine:
+    """
+    Motor de las tareas periódicas de mantenimiento: todas corren como corrutinas de un solo event loop asyncio
+    en un hilo propio, en vez de un hilo bloqueado por tarea. Las tareas asíncronas (stabilize, check_predecessor,
+    fix_fingers) esperan la red sin ocupar hilos, así un proceso puede mantener cientos de tareas (una por tarea
+    y nodo virtual) con una cantidad fija de hilos; las que siguen siendo bloqueantes (compactación, anti-entropía,
+    bootstrap, mensajes rest) se ejecutan en un pool de workers hilos.
+    """
+    def __init__(self, workers: int = 4, task_timeout: float = 30) -> None:
+        self.task_timeout = task_timeout  #segundos máximos por defecto de una tarea sobre un nodo
+        self.executor = futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="maintenance")
+        self.loop = asyncio.new_event_loop()
+        self.loop.set_default_executor(self.executor)  #asyncio.to_thread también usa el pool fijo
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "MaintenanceEngine":
+        return cls(
+            workers=config.get("maintenance_workers", 4),
+            task_timeout=config.get("maintenance_task_timeout", 30),
+        )
+
+    def run(self, coroutine):
+        #ejecuta una corrutina en el loop del motor desde otro hilo y espera su resultado
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    async def call(self, task, *args, timeout: float = None):
+        #ejecuta una tarea, corrutina o función bloqueante (esta en el pool), con un timeout;
+        #las funciones bloqueantes no se pueden interrumpir: al vencer el timeout se deja de esperarlas
+        if inspect.iscoroutinefunction(task):
+            pending = task(*args)
+        else:
+            pending = self.loop.run_in_executor(None, task, *args)
+        try:
+            return await asyncio.wait_for(pending, timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"{task.__name__} no terminó en {timeout} s")
+
+    def every(self, run_round, interval: AdaptiveInterval) -> None:
+        #agenda run_round (una corrutina sin argumentos que devuelve True si vio un cambio) cada interval.
+        #La primera ronda también espera un intervalo, para no empezar antes de que el proceso atienda mensajes
+        async def periodic():
+            await interval.sleep()
+            while True:
+                try:
+                    changed = bool(await run_round())
+                except Exception as e:
+                    changed = True
+                    log.error("Error en una tarea de mantenimiento: %s", e)
+                interval.update(changed)
+                await interval.sleep()
+        asyncio.run_coroutine_threadsafe(periodic(), self.loop)
+
+    def close(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.executor.shutdown(wait=False)
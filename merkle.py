@@ -0,0 +1,85 @@
+import hashlib
+import threading
+
+def key_digest(filename: str, checksum: int) -> int:
+    #digest de una clave: cambia si cambia el nombre o el contenido (crc32)
+    return int.from_bytes(hashlib.sha1(f"{filename}\0{checksum}".encode()).digest(), 'big')
+
+def classify(start: int, end: int, low: int, high: int, ring: int) -> str:
+    #ubica el rango cerrado [start, end] (sin vuelta) respecto del intervalo del anillo (low, high]:
+    #"inside" si está todo adentro, "outside" si no lo toca y "partial" si lo cruza un borde
+    length = (high - low) % ring or ring  #low == high es el anillo completo
+    offset = lambda x: (x - low - 1) % ring  #posición dentro del intervalo, empezando en low + 1
+    if offset(start) < length and offset(end) < length and offset(start) <= offset(end):
+        return "inside"
+    if start <= (low + 1) % ring <= end or offset(start) < length:
+        return "partial"
+    return "outside"
+
+class MerkleTree:
+    """
+    Árbol de Merkle sobre las claves guardadas en un nodo, para comparar dos nodos sin mandarse todas las claves.
+    Las hojas son 2^depth rangos fijos de ids del anillo; el valor de cada hoja es el xor de los digests de sus claves,
+    así guardar, sobrescribir o borrar una clave solo recalcula los depth hashes del camino hasta la raíz.
+    Dos nodos con el mismo m y la misma depth pueden comparar subárboles nivel por nivel.
+    """
+    def __init__(self, m: int, depth: int = 10) -> None:
+        self.m = m
+        self.depth = depth
+        self.keys = {}  #filename -> (hoja, digest)
+        self.leaves = [dict() for _ in range(2 ** depth)]  #hoja -> {filename: digest}
+        self.values = [0] * (2 ** depth)  #hoja -> xor de los digests de sus claves
+        self.levels = [[b""] * (2 ** level) for level in range(depth + 1)]  #nivel -> hashes de sus subárboles
+        self.lock = threading.Lock()
+        for leaf in range(2 ** depth):
+            self.levels[depth][leaf] = self.leaf_hash(leaf)
+        for level in range(depth - 1, -1, -1):
+            for index in range(2 ** level):
+                self.levels[level][index] = self.node_hash(level, index)
+
+    def leaf_of(self, key_id: int) -> int:
+        return key_id >> (self.m - self.depth)
+
+    def span(self, level: int, index: int) -> tuple:
+        #rango cerrado de ids del anillo que cubre un subárbol
+        size = 2 ** (self.m - level)
+        return index * size, (index + 1) * size - 1
+
+    def leaf_hash(self, leaf: int) -> bytes:
+        return self.values[leaf].to_bytes(20, 'big')
+
+    def node_hash(self, level: int, index: int) -> bytes:
+        children = self.levels[level + 1]
+        return hashlib.sha1(children[2 * index] + children[2 * index + 1]).digest()
+
+    def update(self, filename: str, key_id: int, checksum: int = None) -> None:
+        #registra que filename se guardó con ese crc32 (o que se borró, con checksum None)
+        with self.lock:
+            changed = set()
+            previous = self.keys.pop(filename, None)
+            if previous:
+                leaf, digest = previous
+                del self.leaves[leaf][filename]
+                self.values[leaf] ^= digest
+                changed.add(leaf)
+            if checksum is not None:
+                leaf, digest = self.leaf_of(key_id), key_digest(filename, checksum)
+                self.keys[filename] = (leaf, digest)
+                self.leaves[leaf][filename] = digest
+                self.values[leaf] ^= digest
+                changed.add(leaf)
+            for leaf in changed:
+                self.levels[self.depth][leaf] = self.leaf_hash(leaf)
+                index = leaf
+                for level in range(self.depth - 1, -1, -1):
+                    index //= 2
+                    self.levels[level][index] = self.node_hash(level, index)
+
+    def hashes(self, level: int, indexes: list) -> list:
+        with self.lock:
+            return [self.levels[level][index] for index in indexes]
+
+    def keys_in(self, leaves: list) -> dict:
+        #claves de las hojas pedidas: filename -> digest
+        with self.lock:
+            return {filename: digest for leaf in leaves for filename, digest in self.leaves[leaf].items()}
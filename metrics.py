@@ -0,0 +1,249 @@
+import bisect
+import logging
+import threading
+import time
+import grpc
+
+log = logging.getLogger("chord.metrics")
+
+#límites de los buckets (en segundos) de los histogramas de latencia, de 0.5 ms a 10 s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+#límites de los buckets del histograma de saltos de las búsquedas
+HOP_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 7, 8, 10, 12, 16, 20, 24, 32)
+
+class ThreadShards:
+    """
+    Valores de una métrica repartidos por hilo: cada hilo escribe solo en su propio diccionario
+    (etiquetas -> valor), así registrar una medición no toma locks ni compite con los demás hilos.
+    El lock solo se usa la primera vez que un hilo escribe y al leer; los diccionarios de los hilos
+    que terminaron se suman a uno acumulado para que no crezcan con hilos de corta vida.
+    """
+    def __init__(self) -> None:
+        self.local = threading.local()
+        self.shards = []  #(hilo, diccionario del hilo)
+        self.retired = {}  #etiquetas -> valor de los hilos que ya terminaron
+        self.lock = threading.Lock()
+
+    def cells(self) -> dict:
+        #diccionario del hilo actual
+        try:
+            return self.local.cells
+        except AttributeError:
+            cells = self.local.cells = {}
+            with self.lock:
+                self.shards.append((threading.current_thread(), cells))
+            return cells
+
+    def collect(self, merge) -> dict:
+        #suma los valores de todos los hilos con merge(acumulado o None, valor) -> acumulado
+        with self.lock:
+            alive = []
+            for thread, cells in self.shards:
+                if thread.is_alive():
+                    alive.append((thread, cells))
+                else:
+                    for labels, value in cells.items():
+                        self.retired[labels] = merge(self.retired.get(labels), value)
+            self.shards = alive
+            total = {labels: merge(None, value) for labels, value in self.retired.items()}
+            for _, cells in alive:
+                for labels, value in cells.copy().items():  #copy es atómico, el hilo dueño puede seguir escribiendo
+                    total[labels] = merge(total.get(labels), value)
+        return total
+
+class Counter:
+    """
+    Contador que solo crece, con etiquetas.
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: tuple = ()) -> None:
+        self.name = name
+        self.description = description
+        self.labels = labels  #nombres de las etiquetas, los valores se pasan en cada add
+        self.shards = ThreadShards()
+
+    def add(self, amount: float = 1, *label_values) -> None:
+        cells = self.shards.cells()
+        cells[label_values] = cells.get(label_values, 0) + amount
+
+    def samples(self) -> list:
+        #[(sufijo, etiquetas extra, valores de etiquetas, valor)]
+        values = self.shards.collect(lambda total, value: (total or 0) + value)
+        return [("", (), labels, value) for labels, value in sorted(values.items())]
+
+class Histogram:
+    """
+    Histograma con buckets fijos, con etiquetas. Cada observación suma 1 en el primer bucket cuyo límite
+    es mayor o igual al valor; los buckets acumulados (le) se arman recién al leer.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        self.shards = ThreadShards()
+
+    def observe(self, value: float, *label_values) -> None:
+        cells = self.shards.cells()
+        cell = cells.get(label_values)
+        if cell is None:
+            cell = cells[label_values] = [0] * (len(self.buckets) + 2)  #un contador por bucket, +Inf y la suma
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def samples(self) -> list:
+        def merge(total, cell):
+            cell = list(cell)
+            return [a + b for a, b in zip(total, cell)] if total else cell
+        samples = []
+        for labels, cell in sorted(self.shards.collect(merge).items()):
+            cumulative = 0
+            for bound, count in zip([*self.buckets, "+Inf"], cell):
+                cumulative += count
+                samples.append(("_bucket", (("le", format_value(bound)),), labels, cumulative))
+            samples.append(("_sum", (), labels, cell[-1]))
+            samples.append(("_count", (), labels, cumulative))
+        return samples
+
+class Collected:
+    """
+    Métrica que se calcula al leer con fn() -> [(valores de etiquetas, valor)], p. ej. el tamaño del
+    almacenamiento o contadores que ya lleva otro objeto: no cuesta nada en el camino de las peticiones.
+    """
+    def __init__(self, name: str, description: str, kind: str, labels: tuple, fn) -> None:
+        self.name = name
+        self.description = description
+        self.kind = kind  #"gauge" o "counter"
+        self.labels = labels
+        self.fn = fn
+
+    def samples(self) -> list:
+        return [("", (), tuple(labels), value) for labels, value in self.fn()]
+
+def format_value(value) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return repr(value)
+
+def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+class Metrics:
+    """
+    Métricas de un proceso (compartidas entre sus nodos virtuales), expuestas en GET /metrics en el formato
+    de texto de Prometheus: latencias de las rutas rest y los métodos grpc, saltos y latencia de las búsquedas,
+    duración de las rondas de mantenimiento, cambios de sucesor y predecesor, bytes transferidos y almacenados.
+    """
+    def __init__(self) -> None:
+        self.metrics = []
+        self.rest_seconds = self.histogram("chord_rest_request_seconds", "Latencia de las rutas rest", ("route", "method", "status"))
+        self.grpc_seconds = self.histogram("chord_grpc_request_seconds", "Latencia de los métodos grpc del servidor", ("method", "code"))
+        self.grpc_received_bytes = self.counter("chord_grpc_received_bytes_total", "Bytes recibidos en los streams grpc (archivos que llegan)", ("method",))
+        self.grpc_sent_bytes = self.counter("chord_grpc_sent_bytes_total", "Bytes enviados en los streams grpc (archivos que se sirven)", ("method",))
+        self.lookup_hops = self.histogram("chord_lookup_hops", "Saltos de las búsquedas de sucesor que empiezan en este proceso", ("mode",), HOP_BUCKETS)
+        self.lookup_seconds = self.histogram("chord_lookup_seconds", "Latencia de las búsquedas de sucesor que empiezan en este proceso", ("mode",))
+        self.maintenance_seconds = self.histogram("chord_maintenance_round_seconds", "Duración de una ronda de cada tarea de mantenimiento", ("task",))
+        self.successor_changes = self.counter("chord_successor_changes_total", "Veces que cambió el sucesor", ("node",))
+        self.predecessor_changes = self.counter("chord_predecessor_changes_total", "Veces que cambió el predecesor", ("node",))
+
+    def counter(self, name: str, description: str, labels: tuple = ()) -> Counter:
+        return self.register(Counter(name, description, labels))
+
+    def histogram(self, name: str, description: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, description, labels, buckets))
+
+    def collect(self, name: str, description: str, kind: str, labels: tuple, fn) -> Collected:
+        return self.register(Collected(name, description, kind, labels, fn))
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        #todas las métricas en el formato de texto de Prometheus (version 0.0.4)
+        lines = []
+        for metric in self.metrics:
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                log.error("Error al leer la métrica %s: %s", metric.name, e)
+                continue
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, extra, label_values, value in samples:
+                labels = ",".join(f'{name}="{escape(label)}"' for name, label in [*zip(metric.labels, label_values), *extra])
+                lines.append(f"{metric.name}{suffix}{{{labels}}} {format_value(value)}" if labels else f"{metric.name}{suffix} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+class MetricsInterceptor(grpc.ServerInterceptor):
+    """
+    Interceptor del servidor grpc que mide la latencia de cada método (hasta el último fragmento en los streams)
+    con su código de estado, y los bytes de los mensajes de los métodos con streaming (transferencias de archivos).
+    Los handlers envueltos se guardan por método para no rearmarlos en cada llamada.
+    """
+    def __init__(self, metrics: Metrics) -> None:
+        self.metrics = metrics
+        self.handlers = {}  #método completo -> handler envuelto
+
+    def intercept_service(self, continuation, handler_call_details):
+        wrapped = self.handlers.get(handler_call_details.method)
+        if wrapped is None:
+            handler = continuation(handler_call_details)
+            if handler is None:
+                return None  #método desconocido, grpc responde UNIMPLEMENTED
+            wrapped = self.handlers[handler_call_details.method] = self.wrap(handler_call_details.method.rsplit('/', 1)[-1], handler)
+        return wrapped
+
+    def wrap(self, method: str, handler):
+        metrics = self.metrics
+
+        def finish(started: float, context, error: BaseException = None) -> None:
+            code = context.code()
+            if code is None:
+                code = grpc.StatusCode.CANCELLED if isinstance(error, GeneratorExit) else grpc.StatusCode.UNKNOWN if error else grpc.StatusCode.OK
+            metrics.grpc_seconds.observe(time.perf_counter() - started, method, code.name)
+
+        def counted(requests):
+            #cuenta los bytes de cada mensaje que llega por un stream de entrada
+            for message in requests:
+                metrics.grpc_received_bytes.add(message.ByteSize(), method)
+                yield message
+
+        def unary_response(behavior, request_streaming):
+            def call(request, context):
+                started = time.perf_counter()
+                try:
+                    response = behavior(counted(request) if request_streaming else request, context)
+                except BaseException as e:
+                    finish(started, context, e)
+                    raise
+                finish(started, context)
+                return response
+            return call
+
+        def stream_response(behavior, request_streaming):
+            def call(request, context):
+                started = time.perf_counter()
+                try:
+                    for response in behavior(counted(request) if request_streaming else request, context):
+                        metrics.grpc_sent_bytes.add(response.ByteSize(), method)
+                        yield response
+                except BaseException as e:
+                    finish(started, context, e)
+                    raise
+                finish(started, context)
+            return call
+
+        serialization = {'request_deserializer': handler.request_deserializer, 'response_serializer': handler.response_serializer}
+        if handler.unary_unary:
+            return grpc.unary_unary_rpc_method_handler(unary_response(handler.unary_unary, False), **serialization)
+        if handler.stream_unary:
+            return grpc.stream_unary_rpc_method_handler(unary_response(handler.stream_unary, True), **serialization)
+        if handler.unary_stream:
+            return grpc.unary_stream_rpc_method_handler(stream_response(handler.unary_stream, False), **serialization)
+        return grpc.stream_stream_rpc_method_handler(stream_response(handler.stream_stream, True), **serialization)
@@ -1,32 +1,177 @@
-import requests
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, abort, make_response, g
 import threading
+import asyncio
 import grpc
 import chord_pb2_grpc as pb2_grpc
 import chord_pb2 as pb2
 import hashlib
 import time
 import json
+import itertools
+import logging
 from concurrent import futures
-from grpc_service import ChordService
+from grpc_service import ChordService, chunk_bytes, chunk_file, to_chunks, split_chunks
+from http_pool import HttpPool
+from grpc_channels import ChannelCache
+from storage import open_storage, content_tag
+from lookup_cache import LookupCache
+from single_flight import SingleFlight
+from read_cache import ReadCache
+from control_plane import open_control_plane, open_async_control_plane, encode_node, decode_node, grpc_address, grpc_metadata
+from replication import PeerStats, select_replicas
+from merkle import MerkleTree, classify
+from failure_detector import PhiAccrualDetector
+from adaptive_interval import AdaptiveInterval
+from maintenance import MaintenanceEngine
+from metrics import Metrics, MetricsInterceptor
+from logs import LogQueue
+from tracing import TraceStore, current_trace, traced, new_trace_id, lookup_path, TRACE_HEADER
 import sys
+import os
+from collections import deque
+from contextvars import copy_context
+from typing import NamedTuple
+try:
+    from waitress import serve as waitress_serve
+except ImportError:
+    waitress_serve = None  #waitress es opcional, sin él se usa el servidor de desarrollo de flask
 
 app = Flask(__name__)
+log = logging.getLogger("chord.node")  #eventos del anillo y errores
+request_log = logging.getLogger("chord.requests")  #una línea por petición, muestreada con log_sample_rate
+hop_log = logging.getLogger("chord.hops")  #cada salto de las búsquedas, apagado salvo con log_hops
+
+class RoutingState(NamedTuple):
+    """
+    Foto inmutable de los punteros de enrutamiento de un nodo: sucesor, predecesor, lista de sucesores y fingers.
+    Nunca se modifica en el lugar; cada cambio arma una foto nueva que reemplaza a la anterior en una sola
+    asignación, así los lectores (find_successor, rutas rest, servicio grpc) no toman locks ni ven cambios a medias.
+    """
+    successor: dict
+    predecessor: dict
+    successor_list: tuple
+    finger_table: tuple
+
+class LookupStats:
+    """
+    Saltos y latencias de las últimas búsquedas que salieron de este nodo, separadas por modo (recursive / iterative),
+    para comparar ambos modos y ver la latencia de cola.
+    """
+    def __init__(self, size: int = 1000) -> None:
+        self.samples = {'recursive': deque(maxlen=size), 'iterative': deque(maxlen=size)}  #modo -> (saltos, segundos)
+        self.lock = threading.Lock()
+
+    def record(self, mode: str, hops: int, seconds: float) -> None:
+        with self.lock:
+            self.samples[mode].append((hops, seconds))
+
+    def summary(self) -> dict:
+        #por modo: cantidad, saltos promedio y máximo, latencias p50 / p99 en milisegundos
+        summary = {}
+        with self.lock:
+            samples = {mode: list(values) for mode, values in self.samples.items()}
+        for mode, values in samples.items():
+            if not values:
+                continue
+            hops = [h for h, _ in values]
+            latencies = sorted(seconds for _, seconds in values)
+            summary[mode] = {'count': len(values), 'hops_avg': sum(hops) / len(hops), 'hops_max': max(hops),
+                             'p50_ms': latencies[len(latencies) // 2] * 1000,
+                             'p99_ms': latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] * 1000}
+        return summary
 
 class Node:
-    def __init__(self, ip: str, port: int, id: int, update_interval: int, config: dict) -> None:
+    def __init__(self, ip: str, port: int, id: int, update_interval: int, config: dict, host: "Host" = None) -> None:
         self.ip = ip  #ip del nodo donde estará escuchando
         self.port = port  #puerto del nodo donde estará escuchando
         self.grpc_port = port + 1  #puerto para el servidor grpc (puerto rest + 1)
         self.id = id  #id del nodo calculado con hash
         self.update_interval = update_interval  #intervalo de estabilización
-        self.successor = {}  #sucesor inicial como un diccionario vacío
-        self.predecessor = {}  #predecesor inicial como un diccionario vacío
-        self.files = {}  #diccionario para almacenar archivos
+        self.files = open_storage(config, id)  #backend de almacenamiento de archivos (memoria o segmentos en disco)
         self.config = config  #configuración del nodo, bootstrap
-        self.successor_fails = 0  #contador de fallos del sucesor
-        self.predecessor_fails = 0  #contador de fallos del predecesor
-        self.threads = []  # lista para mantener los hilos
+        self.successor_list_size = config.get("successor_list_size", 3)  #cantidad r de sucesores que se recuerdan
+        self.last_successor_contact = time.monotonic()  #última respuesta exitosa del sucesor
+        self.recovery_times = deque(maxlen=20)  #segundos que tomó reemplazar a los últimos sucesores caídos
+        self.failed_successors = {}  #id -> momento en que un sucesor dejó de responder, para no volver a adoptarlo
+        #detector de fallas del predecesor: se lo descarta cuando su silencio deja de ser normal, no tras n fallos seguidos
+        self.failure_detector = PhiAccrualDetector(config.get("phi_threshold", 8.0), config.get("phi_min_std", 0.5), first_interval=update_interval)
+        self.host = host  #proceso físico que aloja a este nodo virtual
+        #los registros de cada nodo virtual llevan su id en el campo node
+        self.log = logging.LoggerAdapter(log, {'node': id})
+        self.request_log = logging.LoggerAdapter(request_log, {'node': id})
+        self.hop_log = logging.LoggerAdapter(hop_log, {'node': id})
+        self.metrics = host.metrics if host else Metrics()  #métricas del proceso, expuestas en /metrics
+        self.traces = host.traces if host else TraceStore.from_config(config)  #saltos de las búsquedas con traza, para /trace/<id>
+        self.m = config.get("id_bits", 160)  #bits m del espacio de identificadores, los ids van de 0 a 2^m - 1
+        #sucesor, predecesor, próximos r sucesores (para reemplazar al sucesor si se cae) y finger[i] = sucesor de (id + 2^i)
+        self.routing = RoutingState({}, {}, (), ({},) * self.m)
+        self.routing_lock = threading.Lock()  #serializa a quienes reemplazan self.routing; los lectores no lo usan
+        #cache de rangos de ids -> nodo responsable para search, store y download
+        self.lookup_cache = LookupCache(self.m, config.get("lookup_cache_size", 1024), config.get("lookup_cache_ttl", 30))
+        self.lookup_mode = config.get("lookup_mode", "recursive")  #búsqueda por defecto: "recursive" o "iterative"
+        self.lookup_alpha = config.get("lookup_alpha", 3)  #consultas en vuelo a la vez en la búsqueda iterativa
+        self.lookup_timeout = config.get("lookup_timeout", 5)  #segundos máximos de una búsqueda iterativa
+        self.control_timeout = config.get("grpc_control_timeout", 5)  #segundos máximos de los mensajes de control por grpc
+        self.lookup_stats = LookupStats()  #saltos y latencias de las búsquedas que salen de este nodo
+        #búsquedas y descargas concurrentes de la misma clave comparten una sola operación en curso
+        self.flights = SingleFlight()
+        #contenido descargado de otros nodos con su versión, compartido por los nodos virtuales del proceso
+        self.read_cache = host.read_cache if host else ReadCache.from_config(config)
+        #sesiones keep-alive y canales grpc hacia otros nodos, compartidos entre los nodos virtuales del mismo proceso
+        self.http = host.http if host else HttpPool.from_config(config)
+        self.channels = host.channels if host else ChannelCache.from_config(config)
+        #mensajes de control de chord hacia otros nodos, por grpc o por rest según bootstrap.json
+        self.control = host.control if host else open_control_plane(config, self.http, self.channels)
+        #event loop y pool fijo de hilos de las tareas de mantenimiento, y los mensajes de control como corrutinas para ellas
+        self.maintenance = host.maintenance if host else MaintenanceEngine.from_config(config)
+        self.async_control = host.async_control if host else open_async_control_plane(config, self.control, self.maintenance.executor)
+        #hilos para las consultas en paralelo de la búsqueda iterativa
+        self.lookup_executor = host.lookup_executor if host else futures.ThreadPoolExecutor(max_workers=config.get("lookup_workers", 16))
+        self.chunk_size = config.get("chunk_size", 64 * 1024)  #tamaño de los fragmentos en las transferencias grpc
+        self.transfer_batch_size = config.get("transfer_batch_size", 50)  #archivos por llamada al traspasar claves
+        self.transfer_rate_bytes = config.get("transfer_rate_bytes", 0)  #límite de bytes por segundo al traspasar claves (0 = sin límite)
+        self.bulk_parallelism = config.get("bulk_parallelism", 8)  #nodos destino atendidos a la vez por store_many y download_many
+        self.replication_factor = config.get("replication_factor", 1)  #copias r de cada archivo: el nodo responsable y sus r-1 sucesores
+        self.replicated_to = set()  #ids de las réplicas que ya tienen copia de las claves de este nodo
+        self.repair_lock = threading.Lock()  #una sola reparación de réplicas a la vez
+        self.replica_sets = {}  #id del nodo responsable -> (vencimiento, [nodo y sus réplicas]) para las lecturas
+        self.peer_stats = PeerStats()  #latencia y lecturas en curso por nodo, para elegir réplica
+        #árbol de Merkle de las claves guardadas, actualizado por el almacenamiento en cada escritura o borrado
+        self.merkle = MerkleTree(self.m, config.get("merkle_depth", 10))
+        for filename in self.files:
+            self.merkle.update(filename, hash_key(filename, self.m), self.files.checksum(filename))
+        self.files.on_change = lambda filename, checksum: self.merkle.update(filename, hash_key(filename, self.m), checksum)
+
+    @property
+    def successor(self) -> dict:
+        return self.routing.successor
+
+    @property
+    def predecessor(self) -> dict:
+        return self.routing.predecessor
+
+    @property
+    def successor_list(self) -> tuple:
+        return self.routing.successor_list
+
+    @property
+    def finger_table(self) -> tuple:
+        return self.routing.finger_table
+
+    def update_routing(self, **changes) -> RoutingState:
+        #reemplaza campos de la foto de enrutamiento; quien necesite leer y luego escribir debe tomar routing_lock
+        with self.routing_lock:
+            self.set_routing(self.routing._replace(**changes))
+            return self.routing
+
+    def set_routing(self, routing: RoutingState) -> None:
+        #publica una foto nueva de enrutamiento (con routing_lock tomado) y cuenta los cambios de sucesor y predecesor
+        previous = self.routing
+        self.routing = routing
+        if routing.successor.get('id') != previous.successor.get('id'):
+            self.metrics.successor_changes.add(1, str(self.id))
+        if routing.predecessor.get('id') != previous.predecessor.get('id'):
+            self.metrics.predecessor_changes.add(1, str(self.id))
 
     def bootstrap(self):
         bootstrap_ip = self.config.get("bootstrap_ip")
@@ -35,19 +180,21 @@ class Node:
         if bootstrap_ip and bootstrap_port and bootstrap_ip != "" and bootstrap_port != "":
             try:
                 #contactamos al nodo bootstrap para encontrar nuestro sucesor
-                url = f"http://{bootstrap_ip}:{bootstrap_port}/find_successor"
-                response = requests.post(url, json={'id': self.id})
-                response.raise_for_status()
-                self.successor = response.json()
-                print(f"Sucesor inicial establecido: {self.successor['id']} ({self.successor['ip']}:{self.successor['port']})")
+                bootstrap_node = {'ip': bootstrap_ip, 'port': bootstrap_port}
+                self.update_routing(successor=self.control.find_successor(bootstrap_node, self.id)[0])
+                self.log.info("Sucesor inicial establecido: %s (%s:%s)", self.successor['id'], self.successor['ip'], self.successor['port'])
             except:
-                print(f"Error al conectarse al nodo bootstrap")
-                self.successor = self.to_dict()
+                self.log.warning("Error al conectarse al nodo bootstrap %s:%s", bootstrap_ip, bootstrap_port)
+                self.update_routing(successor=self.to_dict())
+        elif self.host and self.host.vnodes[0] is not self:
+            #nodo virtual adicional del primer proceso del anillo: entra a través del primer nodo virtual local
+            first_vnode = self.host.vnodes[0]
+            self.update_routing(successor=first_vnode.find_successor(self.id) or first_vnode.to_dict())
+            self.log.info("Sucesor inicial establecido: %s (%s:%s)", self.successor['id'], self.successor['ip'], self.successor['port'])
         else:
             #si no hay nodo bootstrap, nos establecemos como nuestro propio sucesor y predecesor
-            self.successor = self.to_dict()
-            self.predecessor = self.to_dict()
-            print("Nodo inicial de la red creado.")
+            self.update_routing(successor=self.to_dict(), predecessor=self.to_dict())
+            self.log.info("Nodo inicial de la red creado")
 
     def is_in_interval(self, id_to_check: int, start: int, end: int) -> bool:
         #verifica si id_to_check está en el intervalo (start, end]
@@ -56,127 +203,733 @@ class Node:
         else:
             return start < id_to_check or id_to_check <= end
 
-    def find_successor(self, id_to_find: int) -> dict:
-        print(f"[find_successor] Buscando sucesor para ID {id_to_find}, Nodo Actual: {self.id}, Sucesor Actual: {self.successor['id']}")
-        if self.is_in_interval(id_to_find, self.id, self.successor['id']):
-            print(f"[find_successor] Sucesor directo encontrado: {self.successor['id']}")
-            return self.successor
+    def is_in_open_interval(self, id_to_check: int, start: int, end: int) -> bool:
+        #verifica si id_to_check está en el intervalo abierto (start, end), teniendo en cuenta la vuelta del anillo
+        if start < end:
+            return start < id_to_check < end
         else:
-            next_node = self.successor
-            attempts = 0
-            while attempts < 10:  #limite de intentos para evitar bucles infinitos
-                print(f"[find_successor] Intento {attempts + 1}, consultando nodo {next_node['id']} para ID {id_to_find}")
-                url = f"http://{next_node['ip']}:{next_node['port']}/get_successor"
+            return start < id_to_check or id_to_check < end
+
+    def estimate_ring_size(self) -> int:
+        #estima cuántos nodos hay en el anillo a partir de los fingers distintos (unos log2(N)) y de la lista de sucesores.
+        #La distancia al sucesor solo corrige hacia arriba hasta el doble: un sucesor muy cercano daría casi 2^m y el
+        #límite de saltos dejaría de cortar los ciclos
+        routing = self.routing
+        ring = 2 ** self.m
+        gap = (routing.successor['id'] - self.id) % ring
+        distinct_fingers = len({finger['id'] for finger in routing.finger_table if finger})
+        by_fingers = max(2 ** distinct_fingers, len(routing.successor_list) + 1)
+        by_gap = min(ring // gap if gap else 1, 2 * by_fingers)
+        return max(1, by_gap, by_fingers)
+
+    def max_hops(self) -> int:
+        #límite de saltos que escala con el tamaño estimado del anillo en vez de ser fijo
+        ring_size = self.estimate_ring_size()
+        return 2 * ring_size + 2 * ring_size.bit_length()
+
+    def closest_preceding_finger(self, id_to_find: int, routing: RoutingState = None) -> dict:
+        #recorre la finger table de mayor a menor buscando el nodo que más se acerca a id_to_find sin pasarlo
+        routing = routing or self.routing
+        for finger in reversed(routing.finger_table):
+            if finger and self.is_in_open_interval(finger['id'], self.id, id_to_find):
+                return finger
+        #la lista de sucesores también sirve mientras los fingers se reparan
+        for successor in reversed(routing.successor_list):
+            if self.is_in_open_interval(successor['id'], self.id, id_to_find):
+                return successor
+        if routing.successor and self.is_in_open_interval(routing.successor['id'], self.id, id_to_find):
+            return routing.successor
+        return self.to_dict()
+
+    def closest_preceding_nodes(self, id_to_find: int, count: int, routing: RoutingState = None) -> list:
+        #los count nodos conocidos (fingers, lista de sucesores y sucesor) que más se acercan a id_to_find sin pasarlo,
+        #del más cercano al más lejano; es lo que responde cada nodo en un paso de la búsqueda iterativa
+        routing = routing or self.routing
+        known = {node['id']: node for node in (*routing.finger_table, *routing.successor_list, routing.successor)
+                 if node and self.is_in_open_interval(node['id'], self.id, id_to_find)}
+        return sorted(known.values(), key=lambda node: (id_to_find - node['id']) % (2 ** self.m))[:count]
+
+    def observed_change(self) -> None:
+        #el anillo cambió o un nodo falló: las tareas de mantenimiento vuelven a su intervalo mínimo
+        if self.host:
+            self.host.reset_intervals()
+
+    def remove_finger(self, node_id: int) -> None:
+        #elimina de la finger table y de la cache de búsquedas las entradas que apuntan a un nodo que no respondió
+        self.lookup_cache.invalidate_node(node_id)
+        self.observed_change()
+        with self.routing_lock:
+            finger_table = self.routing.finger_table
+            if any(finger and finger['id'] == node_id for finger in finger_table):
+                finger_table = tuple({} if finger and finger['id'] == node_id else finger for finger in finger_table)
+                self.set_routing(self.routing._replace(finger_table=finger_table))
+
+    def find_successor(self, id_to_find: int, hops: int = 0) -> dict:
+        #búsqueda recursiva: cada nodo reenvía la consulta al siguiente y la respuesta vuelve por la misma cadena
+        return self.find_successor_with_hops(id_to_find, hops)[0]
+
+    def find_successor_with_hops(self, id_to_find: int, hops: int = 0) -> tuple:
+        #igual que find_successor, pero devuelve (nodo responsable, saltos totales de la búsqueda)
+        started = time.perf_counter()
+        routing = self.routing  #una sola foto para toda la decisión, aunque stabilize la reemplace mientras tanto
+        self.hop_log.debug("[find_successor] Buscando sucesor para ID %s, sucesor actual: %s, saltos: %s", id_to_find, routing.successor['id'], hops)
+        if self.is_in_interval(id_to_find, self.id, routing.successor['id']):
+            self.hop_log.debug("[find_successor] Sucesor directo encontrado: %s", routing.successor['id'])
+            self.trace_hop("find_successor", id_to_find, {}, hops, started, result=routing.successor)
+            return routing.successor, hops
+        if hops >= self.max_hops():
+            self.log.warning("[find_successor] Exceso de saltos para encontrar sucesor de ID %s", id_to_find)
+            self.trace_hop("find_successor", id_to_find, {}, hops, started, error="exceso de saltos")
+            return {}, hops
+
+        #reenviamos la búsqueda al finger más cercano que precede al id, así cada salto reduce la distancia a la mitad
+        closest_node = self.closest_preceding_finger(id_to_find, routing)
+        if closest_node['id'] != self.id:
+            def forward():
+                responsible_node, total_hops = self.control.find_successor(closest_node, id_to_find, hops + 1)
+                return responsible_node, total_hops - hops  #saltos desde este nodo, cada búsqueda les suma los que traía
+
+            try:
+                #las búsquedas del mismo id que pasan a la vez por este nodo comparten un solo reenvío
+                (responsible_node, remaining_hops), coalesced = self.flights.do("find_successor", id_to_find, forward)
+                self.trace_hop("find_successor", id_to_find, closest_node, hops, started, result=responsible_node,
+                               mode="coalesced" if coalesced else "")
+                return responsible_node, hops + remaining_hops
+            except Exception as e:
+                self.log.warning("[find_successor] Finger %s no responde, recorriendo sucesores", closest_node['id'])
+                self.trace_hop("find_successor", id_to_find, closest_node, hops, started, error=f"no responde: {e}")
+                self.remove_finger(closest_node['id'])
+
+        #si los fingers están desactualizados, caemos de vuelta a recorrer el anillo sucesor por sucesor
+        responsible_node, steps = self.walk_successors(id_to_find, hops)
+        return responsible_node, hops + steps
+
+    async def find_successor_async(self, id_to_find: int) -> dict:
+        #find_successor para las corrutinas de mantenimiento: el primer salto se espera sin ocupar un hilo y los
+        #siguientes los resuelven los otros nodos; si el finger no responde se cae a la búsqueda bloqueante en el pool
+        routing = self.routing
+        if self.is_in_interval(id_to_find, self.id, routing.successor['id']):
+            return routing.successor
+        closest_node = self.closest_preceding_finger(id_to_find, routing)
+        if closest_node['id'] != self.id:
+            try:
+                return (await self.async_control.find_successor(closest_node, id_to_find, 1))[0]
+            except Exception:
+                self.log.warning("[find_successor] Finger %s no responde, recorriendo sucesores", closest_node['id'])
+                self.remove_finger(closest_node['id'])
+        return await asyncio.to_thread(self.find_successor, id_to_find)
+
+    def find_successor_iterative(self, id_to_find: int) -> tuple:
+        #búsqueda iterativa (estilo Kademlia): este nodo le pide a los demás sus nodos más cercanos al id y mantiene
+        #hasta lookup_alpha consultas en vuelo, empezando siempre por el candidato más cercano todavía sin consultar;
+        #gana la primera respuesta cuyo intervalo (nodo, sucesor] contiene al id, así un salto lento o caído no frena la búsqueda
+        #devuelve (nodo responsable, saltos), donde los saltos son la profundidad del nodo que respondió
+        routing = self.routing
+        if self.is_in_interval(id_to_find, self.id, routing.successor['id']):
+            return routing.successor, 0
+        ring = 2 ** self.m
+        candidates = {node['id']: (node, 1) for node in self.closest_preceding_nodes(id_to_find, self.lookup_alpha, routing)}
+        queried = set()
+        pending = {}  #consulta en vuelo -> (nodo consultado, profundidad, inicio)
+        deadline = time.monotonic() + self.lookup_timeout
+        max_queries = self.max_hops()
+        while True:
+            unqueried = sorted((candidate for candidate in candidates.values() if candidate[0]['id'] not in queried),
+                               key=lambda candidate: (id_to_find - candidate[0]['id']) % ring)
+            for node, depth in unqueried[:self.lookup_alpha - len(pending)]:
+                if len(queried) >= max_queries:
+                    break
+                queried.add(node['id'])
+                #copy_context lleva la traza en curso al hilo del pool
+                future = self.lookup_executor.submit(copy_context().run, self.control.closest_preceding, node, id_to_find, self.lookup_alpha)
+                pending[future] = (node, depth, time.perf_counter())
+            if not pending:
+                break
+            done, _ = futures.wait(pending, timeout=deadline - time.monotonic(), return_when=futures.FIRST_COMPLETED)
+            if not done:
+                self.log.warning("[find_successor_iterative] Tiempo agotado buscando el sucesor de ID %s", id_to_find)
+                return {}, len(queried)
+            for future in done:
+                node, depth, started = pending.pop(future)
                 try:
-                    response = requests.get(url)
-                    response.raise_for_status()
-                    next_successor = response.json()
-                    if self.is_in_interval(id_to_find, next_node['id'], next_successor['id']):
-                        print(f"[find_successor] Sucesor encontrado: {next_successor['id']} en nodo {next_node['id']}")
-                        return next_successor
-                    else:
-                        next_node = next_successor
-                except:
-                    print(f"[find_successor] Error al contactar al nodo {next_node['id']}")
-                    return {}
-                attempts += 1
-            print(f"[find_successor] Exceso de intentos para encontrar sucesor de ID {id_to_find}")
-            return {}
+                    successor, closer_nodes = future.result()
+                except Exception as e:
+                    self.log.warning("[find_successor_iterative] Nodo %s no responde", node['id'])
+                    self.trace_hop("closest_preceding", id_to_find, node, depth, started, error=f"no responde: {e}")
+                    self.remove_finger(node['id'])
+                    continue
+                if successor and self.is_in_interval(id_to_find, node['id'], successor['id']):
+                    self.trace_hop("closest_preceding", id_to_find, node, depth, started, result=successor)
+                    return successor, depth
+                self.trace_hop("closest_preceding", id_to_find, node, depth, started)
+                for closer_node in [successor, *closer_nodes]:
+                    if closer_node and closer_node['id'] not in candidates and self.is_in_open_interval(closer_node['id'], self.id, id_to_find):
+                        candidates[closer_node['id']] = (closer_node, depth + 1)
+
+        #sin candidatos vivos, recorremos el anillo sucesor por sucesor
+        self.log.warning("[find_successor_iterative] Sin candidatos para ID %s, recorriendo sucesores", id_to_find)
+        return self.walk_successors(id_to_find, len(queried))
+
+    def lookup(self, id_to_find: int, mode: str = None) -> dict:
+        #busca el nodo responsable de id_to_find usando primero la cache de búsquedas
+        #mode elige la búsqueda recursiva o la iterativa para esta llamada (por defecto lookup_mode de bootstrap.json)
+        #la búsqueda sigue la traza del llamador si hay una, si no abre una si le toca en la muestra (trace_sample_rate)
+        started = time.perf_counter()
+        with traced(current_trace.get() or self.traces.sample()):
+            cached_node = self.lookup_cache.get(id_to_find)
+            if cached_node:
+                self.trace_hop("lookup", id_to_find, {}, 0, started, result=cached_node, mode="cache")
+                return cached_node
+            #las búsquedas concurrentes del mismo id y modo esperan a la que ya está en curso en vez de repetirla
+            mode = mode or self.lookup_mode
+            responsible_node, coalesced = self.flights.do("lookup", (id_to_find, mode), lambda: self.find_and_cache(id_to_find, mode, started))
+            if coalesced:
+                self.trace_hop("lookup", id_to_find, {}, 0, started, result=responsible_node, mode="coalesced")
+        return responsible_node
+
+    def find_and_cache(self, id_to_find: int, mode: str, started: float) -> dict:
+        #la búsqueda de lookup cuando el id no está en la cache: la registra en las estadísticas y guarda el resultado
+        if mode == "iterative":
+            responsible_node, hops = self.find_successor_iterative(id_to_find)
+        else:
+            responsible_node, hops = self.find_successor_with_hops(id_to_find)
+        elapsed = time.perf_counter() - started
+        self.trace_hop("lookup", id_to_find, {}, hops, started, result=responsible_node, mode=mode,
+                       error="" if responsible_node else "sin nodo responsable")
+        if responsible_node:
+            self.lookup_stats.record(mode, hops, elapsed)
+            self.record_lookup(mode, hops, elapsed)
+            self.lookup_cache.put(id_to_find, responsible_node)
+        return responsible_node
+
+    def record_lookup(self, mode: str, hops: int, seconds: float) -> None:
+        #saltos y latencia de una búsqueda que empezó en este nodo, para /metrics
+        self.metrics.lookup_hops.observe(hops, mode)
+        self.metrics.lookup_seconds.observe(seconds, mode)
 
-    def search(self, filename: str) -> dict:
+    def serve_lookup(self, id_to_find: int, hops: int = 0, mode: str = "recursive") -> tuple:
+        #búsqueda pedida por otro nodo o cliente (find_successor por rest o grpc); devuelve (nodo responsable, saltos).
+        #Solo se mide si empieza acá (hops = 0 o iterativa): los saltos reenviados ya los mide el nodo donde empezó
+        started = time.perf_counter()
+        if mode == "iterative":
+            result, total_hops = self.find_successor_iterative(id_to_find)
+        else:
+            result, total_hops = self.find_successor_with_hops(id_to_find, hops)
+        if mode == "iterative" or not hops:
+            self.trace_hop("lookup", id_to_find, {}, total_hops, started, result=result, mode=mode,
+                           error="" if result else "sin nodo responsable")
+            if result:
+                self.record_lookup(mode, total_hops, time.perf_counter() - started)
+        return result, total_hops
+
+    def trace_hop(self, operation: str, id_to_find: int, to: dict, hops: int, started: float,
+                  result: dict = None, error: str = "", mode: str = "") -> None:
+        #registra un salto de la búsqueda en curso si lleva traza: qué hizo este nodo, a quién reenvió o consultó (to)
+        #y cuánto tardó desde started (time.perf_counter() al empezar el salto)
+        trace_id = current_trace.get()
+        if not trace_id:
+            return
+        elapsed = time.perf_counter() - started
+        self.traces.record(trace_id, {'node': str(self.id), 'address': f"{self.ip}:{self.port}", 'operation': operation,
+                                      'mode': mode, 'id': str(id_to_find), 'to': encode_node(to), 'hops': hops,
+                                      'started': time.time() - elapsed, 'ms': elapsed * 1000,
+                                      'result': str(result['id']) if result else "", 'error': error})
+
+    def walk_successors(self, id_to_find: int, hops: int = 0) -> tuple:
+        #busca el sucesor de id_to_find preguntando get_successor nodo por nodo (O(N)); devuelve (nodo, saltos)
+        #hops son los saltos que ya llevaba la búsqueda, solo para ubicar estos pasos en la traza
+        next_node = self.successor
+        attempts = 0
+        max_attempts = self.max_hops()
+        while attempts < max_attempts:  #limite de intentos para evitar bucles infinitos
+            self.hop_log.debug("[walk_successors] Intento %s, consultando nodo %s para ID %s", attempts + 1, next_node['id'], id_to_find)
+            started = time.perf_counter()
+            try:
+                next_successor = self.control.get_successor(next_node)
+                if self.is_in_interval(id_to_find, next_node['id'], next_successor['id']):
+                    self.hop_log.debug("[walk_successors] Sucesor encontrado: %s en nodo %s", next_successor['id'], next_node['id'])
+                    self.trace_hop("get_successor", id_to_find, next_node, hops + attempts + 1, started, result=next_successor)
+                    return next_successor, attempts + 1
+                else:
+                    self.trace_hop("get_successor", id_to_find, next_node, hops + attempts + 1, started)
+                    next_node = next_successor
+            except Exception as e:
+                self.log.warning("[walk_successors] Error al contactar al nodo %s", next_node['id'])
+                self.trace_hop("get_successor", id_to_find, next_node, hops + attempts + 1, started, error=f"no responde: {e}")
+                return {}, attempts + 1
+            attempts += 1
+        self.log.warning("[walk_successors] Exceso de intentos para encontrar sucesor de ID %s", id_to_find)
+        return {}, attempts
+
+    def search(self, filename: str, mode: str = None) -> dict:
         #calculamos el id del archivo basado en su nombre
-        file_id = hash_key(filename)
+        file_id = hash_key(filename, self.m)
         
-        #buscamos el nodo responsable del archivo
-        responsible_node = self.find_successor(file_id)
+        #buscamos el nodo responsable del archivo; si se trazó, la respuesta lleva el id para ver el camino en /trace/<id>
+        with traced(current_trace.get() or self.traces.sample()) as trace_id:
+            responsible_node = self.lookup(file_id, mode)
         
         if not responsible_node:
-            return {'error': 'No se pudo encontrar el nodo responsable'}
+            return {'error': 'No se pudo encontrar el nodo responsable', 'trace': trace_id}
         
         #verificamos si el nodo responsable tiene el archivo
         if responsible_node['id'] == self.id:
             if filename in self.files:
-                return {'url': f"http://{self.ip}:{self.port}/download/{filename}"}
+                return {'url': f"http://{self.ip}:{self.port}/download/{filename}", 'trace': trace_id}
             else:
-                return {'error': f"Archivo '{filename}' no encontrado en nodo actual ({self.id})"}
+                return {'error': f"Archivo '{filename}' no encontrado en nodo actual ({self.id})", 'trace': trace_id}
         else:
-            return {'url': f"http://{responsible_node['ip']}:{responsible_node['port']}/download/{filename}"}
+            return {'url': f"http://{responsible_node['ip']}:{responsible_node['port']}/download/{filename}", 'trace': trace_id}
 
-    def stabilize(self):
-        #estabiliza el nodo verificando su sucesor y predecesor
+    async def stabilize_round(self) -> bool:
+        #preguntamos al sucesor por su predecesor y su lista de sucesores en un solo intercambio
+        #si el sucesor no responde se reemplaza en el momento por la siguiente entrada viva de la lista
+        #devuelve True si la ronda vio un cambio (sucesor caído o nuevo, lista de sucesores distinta)
+        #las corrutinas capturan Exception y no todo: el timeout del motor las cancela y eso no es una falla del sucesor
+        failed_since = None
         while True:
+            successor = self.successor  #se trabaja sobre el sucesor leído, aunque otro hilo lo reemplace durante la llamada
             try:
-                #preguntamos al sucesor por su predecesor
-                url = f"http://{self.successor['ip']}:{self.successor['port']}/get_predecessor"
-                response = requests.get(url)
-                response.raise_for_status()
-                successor_predecessor = response.json()
-                
-                #verificamos si el predecesor del sucesor está entre el nodo actual y su sucesor
-                if successor_predecessor:
-                    if self.is_in_interval(successor_predecessor['id'], self.id, self.successor['id']):
-                        self.successor = successor_predecessor
-                else:
-                    #si el sucesor no tiene predecesor, este nodo debe ser su predecesor
-                    notify_url = f"http://{self.successor['ip']}:{self.successor['port']}/notify"
-                    requests.post(notify_url, json=self.to_dict())
-
-                #notificamos al sucesor que este nodo es su predecesor si es necesario
-                if not self.predecessor or self.is_in_interval(self.id, self.predecessor['id'], self.successor['id']):
-                    #evitamos enviar la notificación si el predecesor del sucesor ya somos nosotros mismos
-                    if not (successor_predecessor and successor_predecessor['id'] == self.id):
-                        notify_url = f"http://{self.successor['ip']}:{self.successor['port']}/notify"
-                        requests.post(notify_url, json=self.to_dict())
-                
-                self.successor_fails = 0  #resetea el contador de fallos
+                successor_predecessor, successors = await self.async_control.get_neighbors(successor)
+                break
+            except Exception:
+                self.log.warning("Sucesor %s no responde durante estabilización", successor['id'])
+                failed_since = failed_since or self.last_successor_contact
+                if not await asyncio.to_thread(self.replace_dead_successor, successor):
+                    return True
+        self.last_successor_contact = time.monotonic()
+        if successor_predecessor and successor_predecessor['id'] in self.failed_successors:
+            #el sucesor todavía no se enteró de que su predecesor se cayó: solo se lo vuelve a adoptar si responde
+            try:
+                await self.async_control.ping(successor_predecessor)
+                self.failed_successors.pop(successor_predecessor['id'], None)
+            except Exception:
+                successor_predecessor = {}
+        if failed_since:
+            recovery_time = self.last_successor_contact - failed_since
+            self.recovery_times.append(recovery_time)
+            self.log.info("Sucesor reemplazado por %s, recuperación en %.2f s", successor['id'], recovery_time)
+
+        with self.routing_lock:
+            routing = self.routing
+            #verificamos si el predecesor del sucesor está entre el nodo actual y su sucesor
+            if successor_predecessor and self.is_in_interval(successor_predecessor['id'], self.id, successor['id']) and successor_predecessor['id'] != successor['id']:
+                #su lista de sucesores se conocerá en la próxima ronda, mientras tanto corremos la nuestra
+                successor = successor_predecessor
+                successor_list = self.build_successor_list([successor, *routing.successor_list])
+                self.lookup_cache.clear()
+            else:
+                successor_list = self.build_successor_list([successor, *successors])
+            self.set_routing(routing._replace(successor=successor, successor_list=successor_list))
+        predecessor = routing.predecessor
+        changed = bool(failed_since) or [n['id'] for n in successor_list] != [n['id'] for n in routing.successor_list]
+        self.check_replicas()
+
+        #notificamos al sucesor que este nodo es su predecesor si es necesario; un predecesor igual a este nodo (quedó
+        #solo tras un bootstrap fallido y después entró) cuenta como ninguno, si no nunca se notificaría al sucesor
+        if not successor_predecessor or not predecessor or predecessor['id'] == self.id or self.is_in_interval(self.id, predecessor['id'], successor['id']):
+            #evitamos enviar la notificación si el predecesor del sucesor ya somos nosotros mismos
+            if not (successor_predecessor and successor_predecessor['id'] == self.id):
+                try:
+                    await self.async_control.notify(successor, self.to_dict())
+                except Exception:
+                    self.log.warning("Error al notificar al sucesor %s", successor['id'])
+                    changed = True
+        return changed
+
+    def build_successor_list(self, candidates: list) -> tuple:
+        #arma la lista de sucesores sin repetidos, cortándola al llegar al propio nodo o al tamaño configurado
+        successor_list = []
+        for candidate in candidates:
+            if candidate['id'] == self.id and successor_list:
+                break
+            if all(candidate['id'] != known['id'] for known in successor_list):
+                successor_list.append(candidate)
+            if len(successor_list) == self.successor_list_size:
+                break
+        return tuple(successor_list)
+
+    def replace_dead_successor(self, dead_successor: dict) -> bool:
+        #descarta el sucesor caído y promueve la siguiente entrada de la lista, o si no quedan el finger vivo más cercano;
+        #devuelve False si no encontró un reemplazo vivo
+        now = time.monotonic()
+        self.failed_successors = {node_id: since for node_id, since in self.failed_successors.items() if now - since < 600}
+        self.failed_successors[dead_successor['id']] = now
+        self.remove_finger(dead_successor['id'])
+        self.lookup_cache.clear()
+        with self.routing_lock:
+            successor_list = tuple(n for n in self.routing.successor_list if n['id'] != dead_successor['id'])
+            if successor_list:
+                self.set_routing(self.routing._replace(successor=successor_list[0], successor_list=successor_list))
+                return True
+            self.set_routing(self.routing._replace(successor_list=successor_list))
+            routing = self.routing
+        predecessor = routing.predecessor
+
+        #el finger vivo más cercano hacia adelante es un sucesor provisorio que stabilize afina en pocas rondas;
+        #el predecesor está detrás en el anillo y stabilize tardaría O(N) rondas en volver desde ahí
+        fingers = {finger['id']: finger for finger in routing.finger_table
+                   if finger and finger['id'] != self.id and finger['id'] not in self.failed_successors}
+        for finger in sorted(fingers.values(), key=lambda finger: (finger['id'] - self.id) % (2 ** self.m)):
+            try:
+                self.control.ping(finger)
             except:
-                print(f"Error durante estabilización")
-                self.successor_fails += 1
-                if self.successor_fails >= 3:
-                    print("Demasiados errores de estabilización con sucesor, ", end="")
-                    if self.predecessor:
-                        try:
-                            url = f"http://{self.successor['ip']}:{self.successor['port']}/ping"
-                            response = requests.get(url)
-                            response.raise_for_status()
-                            self.successor_fails = 0  #resetea el contador de fallos
-                        except:
-                            print("Poniendo a predecesor como sucesor")
-                            self.successor = self.predecessor
-                    else:
-                        print("Comenzando con bootstrap")
-                        self.bootstrap()
+                continue
+            self.log.warning("No quedan sucesores vivos en la lista, poniendo al finger %s como sucesor", finger['id'])
+            self.update_routing(successor=finger)
+            return True
+        if predecessor and predecessor['id'] != dead_successor['id']:
+            self.log.warning("No quedan sucesores vivos en la lista, poniendo a predecesor como sucesor")
+            self.update_routing(successor=predecessor)
+        else:
+            self.log.warning("No quedan sucesores vivos en la lista, comenzando con bootstrap")
+            self.bootstrap()
+        return False
 
-            time.sleep(self.update_interval)
+    async def update_fingers(self) -> bool:
+        #recalcula cada finger; los que caen antes del sucesor o del finger anterior no necesitan consultar la red
+        #la tabla nueva se publica de una vez al final, conservando los fingers que no se pudieron recalcular
+        #devuelve True si el sucesor o algún finger cambió
+        changed = await self.check_successor()
+        successor = self.successor
+        updated = {}
+        previous = {}
+        for i in range(self.m):
+            start = (self.id + 2 ** i) % (2 ** self.m)
+            if self.is_in_interval(start, self.id, successor['id']):
+                finger = successor
+            elif previous and self.is_in_interval(start, self.id, previous['id']):
+                finger = previous
+            else:
+                finger = await self.find_successor_async(start)
+            if finger and 'id' in finger:
+                updated[i] = finger
+                previous = finger
+        with self.routing_lock:
+            previous_table = self.routing.finger_table
+            finger_table = tuple(updated.get(i, finger) for i, finger in enumerate(previous_table))
+            self.set_routing(self.routing._replace(finger_table=finger_table))
+        return changed or any(finger.get('id') != old.get('id') for finger, old in zip(finger_table, previous_table))
+
+    async def check_successor(self) -> bool:
+        #le pide a otro nodo el sucesor de id + 1 y lo adopta si está antes que el sucesor actual: un nodo que entró
+        #durante churn puede recibir un sucesor equivocado muy adelante en el anillo, y stabilize solo lo acerca de a un
+        #nodo por ronda (adopta el predecesor del sucesor), O(N) rondas. Mientras nadie conoce a este nodo, la búsqueda
+        #llega a su predecesor real, que responde con el sucesor correcto. Devuelve True si lo cambió
+        routing = self.routing
+        entry = self.closest_preceding_finger(self.id, routing)  #cualquier nodo conocido distinto de este
+        if entry['id'] == self.id:
+            return False
+        try:
+            found = (await self.async_control.find_successor(entry, (self.id + 1) % (2 ** self.m), 1))[0]
+        except Exception:
+            return False
+        if not self.is_in_open_interval(found['id'], self.id, routing.successor['id']):
+            return False
+        with self.routing_lock:
+            if self.routing.successor['id'] != routing.successor['id']:
+                return False  #stabilize lo reemplazó mientras tanto
+            self.set_routing(self.routing._replace(successor=found, successor_list=self.build_successor_list([found, *self.routing.successor_list])))
+        self.lookup_cache.clear()
+        self.log.info("Sucesor corregido: %s está antes que %s", found['id'], routing.successor['id'])
+        return True
+
+    def compact_storage(self) -> None:
+        #compacta los segmentos de almacenamiento con mucha basura
+        freed = self.files.compact()
+        if freed:
+            self.log.info("Compactación liberó %s bytes", freed)
 
     def notify(self, new_predecessor: dict) -> None:
         #actualiza el predecesor si es nulo o si el nuevo es más adecuado
-        if not self.predecessor or self.is_in_interval(new_predecessor['id'], self.predecessor['id'], self.id):
-            self.predecessor = new_predecessor
-            print(f"Predecesor actualizado: {self.predecessor['id']} ({self.predecessor['ip']}:{self.predecessor['port']})")
+        #la comparación y el reemplazo van bajo el lock para que dos notify simultáneos no se pisen
+        self.failure_detector.heartbeat(new_predecessor['id'])  #cada notify también prueba que el nodo está vivo
+        with self.routing_lock:
+            predecessor = self.routing.predecessor
+            if predecessor and not self.is_in_interval(new_predecessor['id'], predecessor['id'], self.id):
+                return
+            self.set_routing(self.routing._replace(predecessor=new_predecessor))
+        self.lookup_cache.clear()
+        self.observed_change()
+        self.log.info("Predecesor actualizado: %s (%s:%s)", new_predecessor['id'], new_predecessor['ip'], new_predecessor['port'])
+        if not predecessor:
+            #el predecesor anterior se cayó: las claves que guardábamos como réplica de las suyas ahora son nuestras
+            #y hay que volver a copiar todas las claves propias en las réplicas
+            self.replicated_to = set()
+        if new_predecessor['id'] != self.id:
+            #las claves que quedaron fuera de (predecesor, id] ahora son del nuevo predecesor
+            #con réplicas solo se mueve el rango que pasó al nuevo predecesor (el resto son copias de otros nodos)
+            #y se conserva la copia local: este nodo pasa a ser la primera réplica de esas claves
+            if predecessor and self.replication_factor > 1:
+                moved = lambda file_id: self.is_in_interval(file_id, predecessor['id'], new_predecessor['id'])
+            else:
+                moved = lambda file_id: not self.is_in_interval(file_id, new_predecessor['id'], self.id)
+            filenames = [filename for filename in self.files if moved(hash_key(filename, self.m))]
+            if filenames:
+                threading.Thread(target=self.transfer_files, args=(new_predecessor, filenames, self.replication_factor > 1), daemon=True).start()
 
-    def check_predecessor(self):
-        #verifica periódicamente si el predecesor está activo
-        while True:
-            if self.predecessor:
+    def send_files(self, target: dict, filenames: list, wrap_blocks=None) -> None:
+        #envía copias de archivos locales a otro nodo en un solo stream TransferFiles; lanza una excepción si no llegan
+        #wrap_blocks(bloques) permite envolver los bloques de cada archivo, p. ej. para limitar la velocidad
+        def chunks():
+            for filename in filenames:
+                blocks = self.files.iter_chunks(filename, self.chunk_size)
+                yield from to_chunks(filename, wrap_blocks(blocks) if wrap_blocks else blocks)
+        self.channels.call(grpc_address(target), lambda stub: self.channels.send(stub.TransferFiles, chunks(), metadata=grpc_metadata(target)))
+
+    def transfer_files(self, target: dict, filenames: list, keep_local: bool = False) -> bool:
+        #traspasa archivos a otro nodo por grpc en lotes de transfer_batch_size, borrándolos localmente cuando el lote llega
+        #(con keep_local se conservan, para copiar en réplicas); devuelve False si el traspaso quedó a medias
+        #la velocidad se limita a transfer_rate_bytes por segundo para que un join no sature la red
+        total = len(filenames)
+        sent_files = 0
+        sent_bytes = 0
+        started = time.monotonic()
+
+        def throttled(blocks):
+            nonlocal sent_bytes
+            for block in blocks:
+                yield block
+                sent_bytes += len(block)
+                if self.transfer_rate_bytes:
+                    ahead = sent_bytes / self.transfer_rate_bytes - (time.monotonic() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+
+        self.log.info("%s %s archivos al nodo %s", 'Copiando' if keep_local else 'Traspasando', total, target['id'])
+        for start in range(0, total, self.transfer_batch_size):
+            batch = [filename for filename in filenames[start:start + self.transfer_batch_size] if filename in self.files]
+            try:
+                self.send_files(target, batch, throttled)
+            except Exception as e:
+                self.log.error("Error al traspasar archivos al nodo %s: %s", target['id'], e)
+                return False
+            if not keep_local:
+                for filename in batch:
+                    self.files.delete(filename)
+            sent_files += len(batch)
+            self.log.info("Traspaso al nodo %s: %s/%s archivos, %s bytes, %.1f s", target['id'], sent_files, total, sent_bytes, time.monotonic() - started)
+        return True
+
+    def replica_targets(self) -> list:
+        #nodos que guardan copia de las claves de este nodo: los primeros r-1 sucesores en otros procesos
+        return select_replicas(self.to_dict(), self.successor_list, self.replication_factor - 1)
+
+    def replicate(self, filenames: list) -> int:
+        #copia archivos recién escritos en las réplicas antes de confirmar la escritura; devuelve cuántas los recibieron
+        stored = 0
+        for target in self.replica_targets():
+            try:
+                self.send_files(target, filenames)
+                stored += 1
+            except Exception as e:
+                self.log.error("Error al replicar en el nodo %s: %s", target['id'], e)
+        return stored
+
+    def check_replicas(self) -> None:
+        #se llama en cada ronda de stabilize: si cambió el conjunto de sucesores, las réplicas nuevas se sincronizan
+        #en el momento, sin esperar a la próxima ronda de anti-entropía
+        if self.replication_factor == 1:
+            return
+        targets = self.replica_targets()
+        new_targets = [target for target in targets if target['id'] not in self.replicated_to]
+        if new_targets and self.repair_lock.acquire(blocking=False):
+            self.maintenance.executor.submit(self.repair_replicas, targets, new_targets)
+
+    def repair_replicas(self, targets: list, new_targets: list) -> None:
+        #si alguna sincronización falla se reintenta en la próxima ronda de stabilize
+        try:
+            if all([self.sync_replica(target) for target in new_targets]):
+                self.replicated_to = {target['id'] for target in targets}
+        finally:
+            self.repair_lock.release()
+
+    def anti_entropy(self) -> None:
+        #ronda periódica de anti-entropía: compara las claves propias con cada réplica y repara solo las diferencias
+        if self.replication_factor == 1 or not self.repair_lock.acquire(blocking=False):
+            return
+        try:
+            for target in self.replica_targets():
+                self.sync_replica(target)
+            self.drop_stale_copies()
+        finally:
+            self.repair_lock.release()
+
+    def drop_stale_copies(self) -> int:
+        #borra las copias de claves de otros nodos que este nodo ya no tiene que guardar: después de un join, o de un
+        #notify que conservó las claves traspasadas, puede haber quedado fuera del conjunto de réplicas del responsable
+        #y sync_replica solo agrega copias. Una copia se borra recién cuando todo el conjunto confirma que tiene la
+        #clave, y a lo sumo transfer_batch_size por ronda; devuelve cuántas se borraron
+        predecessor = self.predecessor
+        if not predecessor:
+            return 0  #sin predecesor no se sabe qué claves son propias
+        foreign = [filename for filename in self.files if not self.is_in_interval(hash_key(filename, self.m), predecessor['id'], self.id)]
+        groups, _ = self.group_by_node(foreign)
+        dropped = 0
+        for responsible_node, filenames in groups.values():
+            if responsible_node['id'] == self.id or dropped >= self.transfer_batch_size:
+                continue
+            #el conjunto se vuelve a preguntar: uno recordado de antes de que este nodo entrara borraría copias que le tocan
+            self.replica_sets.pop(responsible_node['id'], None)
+            replicas = self.replica_set(responsible_node)
+            if any(replica['id'] == self.id for replica in replicas):
+                continue
+            for filename in filenames[:self.transfer_batch_size - dropped]:
                 try:
-                    url = f"http://{self.predecessor['ip']}:{self.predecessor['port']}/ping"
-                    response = requests.get(url)
-                    response.raise_for_status()
-                    self.predecessor_fails = 0  #resetea el contador de fallos
-                except:
-                    print(f"Predecesor {self.predecessor['id']} no responde. Eliminando predecesor.")
-                    self.predecessor = {}
-                    self.predecessor_fails += 1
-                    if self.predecessor_fails >= 3:
-                        print("Demasiados errores con predecesor. ", end="")
-                        if self.successor:
-                            print("Poniendo a sucesor como predecesor")
-                            self.predecessor = self.successor
-                        else:
-                            print("Comenzando con bootstrap")
-                            self.bootstrap()
-            time.sleep(self.update_interval)
+                    etag = self.files.etag(filename)
+                except KeyError:
+                    continue  #se borró mientras tanto
+                if all(self.holds_copy(replica, filename, etag) for replica in replicas):
+                    self.files.delete(filename)
+                    dropped += 1
+        if dropped:
+            self.log.info("Se borraron %s copias de claves que ya guardan sus réplicas", dropped)
+        return dropped
+
+    def holds_copy(self, node: dict, filename: str, etag: str) -> bool:
+        #True si node tiene filename: se le pide con la versión local y alcanza con el primer fragmento (not_modified si
+        #es la misma versión; si tiene otra, la descarga se corta ahí). Un error o NOT_FOUND cuenta como que no la tiene
+        request = pb2.FileRequest(filename=filename, etag=etag)
+        try:
+            return self.channels.call(grpc_address(node), lambda stub: next(iter(
+                self.channels.receive(stub.DownloadFile, request, metadata=grpc_metadata(node))), None) is not None)
+        except Exception:
+            return False
+
+    def sync_replica(self, target: dict) -> bool:
+        #compara las claves de (predecesor, id] con las de una réplica bajando por los dos árboles de Merkle:
+        #por cada nivel se piden en un solo mensaje los hashes de los subárboles que todavía pueden diferir, y solo se
+        #sigue bajando por los distintos, así el costo depende de cuántas claves difieren y no de cuántas hay.
+        #Los subárboles que cruzan un borde del rango siempre se bajan (la réplica también guarda claves de otros nodos).
+        #Este nodo es el responsable: lo que le falta o tiene distinto la réplica se le envía, y lo que solo tiene
+        #la réplica (este nodo lo perdió) se trae. Devuelve False si no se pudo completar; cada mensaje tiene el timeout
+        #de los de control y las transferencias el de grpc_rpc_timeout sin avanzar, así una réplica trabada no retiene
+        #repair_lock ni un hilo del motor de mantenimiento
+        predecessor = self.predecessor
+        if not predecessor:
+            return False  #sin predecesor no se sabe qué claves son propias
+        ring = 2 ** self.m
+        indexes = [0]
+        leaves = []
+        messages = 0
+        try:
+            for level in range(self.merkle.depth + 1):
+                spans = {index: classify(*self.merkle.span(level, index), predecessor['id'], self.id, ring) for index in indexes}
+                indexes = [index for index in indexes if spans[index] != "outside"]
+                if not indexes:
+                    break
+                reply = self.channels.call(grpc_address(target), lambda stub: stub.MerkleHashes(
+                    pb2.MerkleRequest(level=level, indexes=indexes), timeout=self.control_timeout, metadata=grpc_metadata(target)))
+                messages += 1
+                if reply.depth != self.merkle.depth:
+                    self.log.warning("El nodo %s usa merkle_depth %s, distinto de %s", target['id'], reply.depth, self.merkle.depth)
+                    return False
+                local = self.merkle.hashes(level, indexes)
+                differing = [index for index, remote_hash, local_hash in zip(indexes, reply.hashes, local)
+                             if spans[index] == "partial" or remote_hash != local_hash]
+                if level == self.merkle.depth:
+                    leaves = differing
+                indexes = [child for index in differing for child in (2 * index, 2 * index + 1)]
+            if not leaves:
+                return True
+            reply = self.channels.call(grpc_address(target), lambda stub: stub.MerkleKeys(
+                pb2.MerkleRequest(level=self.merkle.depth, indexes=leaves), timeout=self.control_timeout, metadata=grpc_metadata(target)))
+            messages += 1
+        except Exception as e:
+            self.log.error("Error en la anti-entropía con el nodo %s: %s", target['id'], e)
+            return False
+
+        own = lambda filename: self.is_in_interval(hash_key(filename, self.m), predecessor['id'], self.id)
+        remote = {key.filename: int.from_bytes(key.digest, 'big') for key in reply.keys if own(key.filename)}
+        local = {filename: digest for filename, digest in self.merkle.keys_in(leaves).items() if own(filename)}
+        push = [filename for filename, digest in local.items() if remote.get(filename) != digest]
+        pull = [filename for filename in remote if filename not in local]
+        if not push and not pull:
+            return True
+        self.log.info("Anti-entropía con el nodo %s: %s hojas comparadas en %s mensajes, %s archivos para enviar, %s para traer",
+                      target['id'], len(leaves), messages, len(push), len(pull))
+        if push and not self.transfer_files(target, push, keep_local=True):
+            return False
+        return self.fetch_files(target, pull)
+
+    def fetch_files(self, source: dict, filenames: list) -> bool:
+        #trae copias de archivos de otro nodo con un solo stream DownloadFiles y las guarda localmente
+        def download(stub):
+            for first, blocks in split_chunks(self.channels.receive(stub.DownloadFiles, pb2.FileList(filenames=filenames), metadata=grpc_metadata(source))):
+                if first.missing:
+                    b"".join(blocks)  #se borró mientras tanto, los bloques se consumen igual para pasar al siguiente
+                else:
+                    self.files.put(first.filename, blocks)
+        if not filenames:
+            return True
+        try:
+            self.channels.call(grpc_address(source), download)
+            return True
+        except Exception as e:
+            self.log.error("Error al traer archivos del nodo %s: %s", source['id'], e)
+            return False
+
+    def replica_set(self, responsible_node: dict) -> list:
+        #el nodo responsable y sus réplicas, de los que se puede leer; se pregunta su lista de sucesores y se recuerda un rato
+        if self.replication_factor == 1:
+            return [responsible_node]
+        cached = self.replica_sets.get(responsible_node['id'])
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        if responsible_node['id'] == self.id:
+            successors = self.successor_list
+        else:
+            try:
+                _, successors = self.control.get_neighbors(responsible_node)
+            except:
+                #no responde (quizás se cayó y el anillo todavía no lo sabe): sus sucesores probables son
+                #los nodos conocidos que le siguen en el anillo; no se recuerda porque es una estimación
+                return [responsible_node, *select_replicas(responsible_node, self.nodes_after(responsible_node), self.replication_factor - 1)]
+        replicas = [responsible_node, *select_replicas(responsible_node, successors, self.replication_factor - 1)]
+        self.replica_sets[responsible_node['id']] = (time.monotonic() + self.lookup_cache.ttl, replicas)
+        return replicas
+
+    def nodes_after(self, node: dict) -> list:
+        #nodos conocidos (este, sus sucesores y fingers) ordenados por distancia desde node en el sentido del anillo
+        routing = self.routing
+        known = {n['id']: n for n in [self.to_dict(), routing.successor, *routing.successor_list, *routing.finger_table] if n and n['id'] != node['id']}
+        return sorted(known.values(), key=lambda n: (n['id'] - node['id']) % (2 ** self.m))
+
+    def leave(self) -> None:
+        #al salir de forma controlada entregamos todas nuestras claves al primer sucesor que no esté en este mismo proceso
+        #(los demás nodos virtuales locales también se están yendo)
+        routing = self.routing
+        targets = [successor for successor in [routing.successor, *routing.successor_list]
+                   if successor and (successor['ip'], successor['port']) != (self.ip, self.port)]
+        if targets and len(self.files):
+            self.transfer_files(targets[0], list(self.files))
+
+    async def check_predecessor(self) -> bool:
+        #verifica si el predecesor está activo; devuelve True si se lo descartó
+        #un ping fallido no alcanza para descartarlo: se lo descarta cuando el detector phi accrual juzga que su
+        #silencio ya no es normal. Mientras tanto la sospecha no cuenta como cambio (no acelera a las demás tareas);
+        #check_predecessor corre siempre cada update_interval, así que se lo vuelve a probar en la próxima ronda
+        predecessor = self.predecessor
+        if not predecessor or predecessor['id'] == self.id:
+            return False
+        try:
+            await self.async_control.ping(predecessor)
+            self.failure_detector.heartbeat(predecessor['id'])
+            return False
+        except Exception:
+            phi = self.failure_detector.phi(predecessor['id'])
+            if phi < self.failure_detector.threshold:
+                self.log.warning("Predecesor %s no responde (phi = %.1f), se vuelve a probar", predecessor['id'], phi)
+                return False
+            self.log.warning("Predecesor %s no responde (phi = %.1f), eliminando predecesor", predecessor['id'], phi)
+            self.remove_finger(predecessor['id'])
+            self.lookup_cache.clear()
+            self.failure_detector.remove(predecessor['id'])
+            with self.routing_lock:
+                #solo se borra si un notify no lo reemplazó mientras esperábamos el ping
+                if self.routing.predecessor is predecessor:
+                    self.set_routing(self.routing._replace(predecessor={}))
+            return True
 
     '''
     def find_responsible_node(self, file_id: int) -> dict:
@@ -190,9 +943,8 @@ class Node:
             else:
                 #si no es así, seguimos preguntando al sucesor
                 next_node = self.successor
-                url = f"http://{next_node['ip']}:{next_node['port']}/get_successor" #intentamos que parezca el find_successor
                 try:
-                    response = requests.post(url, json={'id': file_id})
+                    response = self.http.post(next_node['ip'], next_node['port'], "/get_successor", json={'id': file_id}) #intentamos que parezca el find_successor
                     response.raise_for_status()
                     next_node = response.json()
                     
@@ -203,79 +955,229 @@ class Node:
                     return {}
     '''
 
-    def store_file_grpc(self, filename: str, content: str) -> str:
+    def store_file_grpc(self, filename: str, content: str | bytes = None, path: str = None) -> str:
         #almacena un archivo en el nodo responsable utilizando grpc
+        #el contenido se envía en fragmentos, ya sea desde memoria (content) o leyendo del disco (path)
         #calculamos el id del archivo
-        file_id = hash_key(filename)
-        responsible_node = self.find_successor(file_id)
+        file_id = hash_key(filename, self.m)
+        responsible_node = self.lookup(file_id)
 
         if not responsible_node or ('error' in responsible_node) or ('id' not in responsible_node):
             return "Error: No se pudo encontrar el nodo responsable"
 
+        data = content.encode() if isinstance(content, str) else content
+
+        def upload(stub):
+            #el generador se crea dentro de la llamada para que un reintento vuelva a empezar desde el primer fragmento
+            chunks = chunk_file(filename, path, self.chunk_size) if path else chunk_bytes(filename, data, self.chunk_size)
+            #sin deadline fijo (la duración depende del tamaño): se corta si pasan grpc_rpc_timeout segundos sin avanzar,
+            #más lo que tarde el nodo en copiarlo a sus réplicas antes de responder
+            return self.channels.send(stub.StoreFile, chunks, copies=self.replication_factor - 1, metadata=grpc_metadata(responsible_node))
+
         try:
             #conectamos al nodo responsable y enviamos el archivo
             #el servidor grpc está en el puerto rest + 1
-            print(f"Almacenando archivo en nodo {responsible_node['id']}")
-            with grpc.insecure_channel(f"{responsible_node['ip']}:{responsible_node['port'] + 1}") as channel:
-                stub = pb2_grpc.ChordServiceStub(channel)
-                request = pb2.FileRequest(filename=filename, content=content)
-                response = stub.StoreFile(request)
-                print(response)
-                return response.message
+            self.request_log.info("Almacenando archivo %s en nodo %s", filename, responsible_node['id'])
+            response = self.channels.call(grpc_address(responsible_node), upload)
+            return response.message
         except Exception as e:
-            print(f"Se lanzó una excepción de tipo: {type(e).__name__}")
-            print(f"Mensaje de la excepción: {str(e)}")
+            #el nodo (quizás sacado de la cache) no respondió: la próxima búsqueda vuelve a preguntar al anillo
+            self.lookup_cache.invalidate_node(responsible_node['id'])
+            self.log.error("Error al almacenar el archivo %s en el nodo %s: %s: %s", filename, responsible_node['id'], type(e).__name__, e)
             return f"Error al almacenar el archivo en el nodo {responsible_node['id']}"
 
-    def download_file_grpc(self, filename: str) -> str:
+    def download_file_grpc(self, filename: str, path: str = None) -> bytes | str:
         #descarga un archivo del nodo responsable utilizando grpc
+        #si se indica path los fragmentos se escriben al disco a medida que llegan, si no se devuelve el contenido
+        if path:
+            return self.download_from_replicas(filename, path)
+        #las descargas a memoria del mismo archivo que llegan a la vez comparten una sola transferencia
+        return self.flights.do("download", filename, lambda: self.download_from_replicas(filename))[0]
+
+    def download_from_replicas(self, filename: str, path: str = None) -> bytes | str:
         #calculamos el id del archivo
-        file_id = hash_key(filename)
-        responsible_node = self.find_successor(file_id)
+        file_id = hash_key(filename, self.m)
+        responsible_node = self.lookup(file_id)
 
         if not responsible_node or ('error' in responsible_node) or ('id' not in responsible_node):
             return "Error: No se pudo encontrar el nodo responsable"
 
-        try:
-            #conectamos al nodo responsable y solicitamos el archivo
-            #el servidor grpc está en el puerto rest + 1
-            print(f"Descargando archivo de nodo {responsible_node['id']}")
-            with grpc.insecure_channel(f"{responsible_node['ip']}:{responsible_node['port'] + 1}") as channel:
-                stub = pb2_grpc.ChordServiceStub(channel)
-                request = pb2.FileRequest(filename=filename)
-                response = stub.DownloadFile(request)
-                #manejamos la respuesta del servidor grpc, pudo ser un error o el contenido del archivo
+        request = pb2.FileRequest(filename=filename)
+
+        def download_to_disk(stub, replica):
+            with open(path + '.part', 'wb') as f:
+                for chunk in self.channels.receive(stub.DownloadFile, request, metadata=grpc_metadata(replica)):
+                    f.write(chunk.data)
+
+        def download_to_memory(stub, replica):
+            #pide el archivo con la versión de la copia en la cache de lectura: si sigue vigente llega un solo fragmento sin datos
+            cached = self.read_cache.get(filename)
+            chunks = self.channels.receive(stub.DownloadFile, pb2.FileRequest(filename=filename, etag=cached[0] if cached else ""), metadata=grpc_metadata(replica))
+            first = next(chunks)
+            if first.not_modified:
+                self.read_cache.validated(filename)
+                return cached[1]
+            content = b"".join([first.data, *(chunk.data for chunk in chunks)])
+            if first.etag:
+                self.read_cache.put(filename, first.etag, content)
+            return content
+
+        #se lee de la réplica más rápida y menos cargada; si falla o no tiene el archivo se prueba con la siguiente
+        #si ninguna responde se vuelve a buscar el nodo responsable: si se cayó, la búsqueda da con su sucesor, que tiene copia
+        tried = set()
+        for attempt in range(2 if self.replication_factor > 1 else 1):
+            if attempt:
+                self.replica_sets.pop(responsible_node['id'], None)
+                responsible_node = self.lookup(file_id)
+                if not responsible_node:
+                    break
+            for replica in self.peer_stats.rank(self.replica_set(responsible_node)):
+                if replica['id'] in tried:
+                    continue
+                tried.add(replica['id'])
                 try:
-                    if not response.content:
-                        return "Archivo no encontrado en nodo responsable"
-                    return response.content
-                except:
-                    return "Error al descargar el archivo"
-        except Exception as e:
-            #print(f"Se lanzó una excepción de tipo: {type(e).__name__}")
-            #print(f"Mensaje de la excepción: {str(e)}")
-            print(f"El nodo no tiene el archivo {responsible_node['id']}")
-            return "Error: Nodo no tiene el archivo"
+                    #conectamos al nodo y solicitamos el archivo
+                    #el servidor grpc está en el puerto rest + 1
+                    self.request_log.info("Descargando archivo %s de nodo %s", filename, replica['id'])
+                    address = grpc_address(replica)
+                    with self.peer_stats.track(replica):
+                        if path:
+                            self.channels.call(address, lambda stub: download_to_disk(stub, replica))
+                            os.replace(path + '.part', path)
+                            return f"Archivo '{filename}' descargado en {path}"
+                        return self.channels.call(address, lambda stub: download_to_memory(stub, replica))
+                except Exception as e:
+                    if replica['id'] == responsible_node['id']:
+                        self.lookup_cache.invalidate_node(responsible_node['id'])
+                    if path and os.path.exists(path + '.part'):
+                        os.remove(path + '.part')
+                    self.log.warning("El nodo %s no entregó el archivo %s: %s", replica['id'], filename, e)
+        self.replica_sets.pop(responsible_node['id'], None)
+        return "Error: Nodo no tiene el archivo"
 
-    def serve_grpc(self):
-        #inicia el servidor grpc para manejar la transferencia de archivos
-        server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-        pb2_grpc.add_ChordServiceServicer_to_server(ChordService(self), server)
-        server.add_insecure_port(f"[::]:{self.grpc_port}")
-        server.start()
-        print(f"Servidor gRPC escuchando en el puerto {self.grpc_port}")
-        server.wait_for_termination()
+    def group_by_node(self, filenames: list, mode: str = None) -> tuple:
+        #agrupa archivos por nodo responsable con la menor cantidad de búsquedas posible: las claves se recorren en el
+        #orden del anillo y el nodo encontrado para una clave también es responsable de todas las siguientes hasta su id,
+        #así se hace a lo sumo una búsqueda por nodo responsable en vez de una por archivo
+        #devuelve ({id del nodo: (nodo, [archivos])}, [archivos sin nodo responsable])
+        groups = {}
+        unresolved = []
+        responsible_node = {}
+        covered_from = 0
+        for file_id, filename in sorted((hash_key(filename, self.m), filename) for filename in set(filenames)):
+            #el nodo actual cubre el intervalo cerrado [covered_from, id del nodo]
+            if not responsible_node or not self.is_in_interval(file_id, covered_from - 1, responsible_node['id']):
+                responsible_node = self.lookup(file_id, mode)
+                covered_from = file_id
+            if responsible_node:
+                groups.setdefault(responsible_node['id'], (responsible_node, []))[1].append(filename)
+            else:
+                unresolved.append(filename)
+        return groups, unresolved
+
+    def for_each_node(self, groups: dict, task) -> dict:
+        #ejecuta task(nodo, archivos) para cada nodo destino en paralelo y junta los diccionarios de resultados
+        results = {}
+        if groups:
+            with futures.ThreadPoolExecutor(max_workers=min(len(groups), self.bulk_parallelism)) as executor:
+                for partial in executor.map(lambda group: task(*group), groups.values()):
+                    results.update(partial)
+        return results
+
+    def search_many(self, filenames: list, mode: str = None) -> dict:
+        #como search para muchos archivos a la vez: filename -> {'url'} o {'error'}
+        groups, unresolved = self.group_by_node(filenames, mode)
+        results = {filename: {'error': 'No se pudo encontrar el nodo responsable'} for filename in unresolved}
+        for responsible_node, names in groups.values():
+            for filename in names:
+                if responsible_node['id'] == self.id and filename not in self.files:
+                    results[filename] = {'error': f"Archivo '{filename}' no encontrado en nodo actual ({self.id})"}
+                else:
+                    results[filename] = {'url': f"http://{responsible_node['ip']}:{responsible_node['port']}/download/{filename}"}
+        return results
+
+    def store_many(self, contents: dict = None, paths: dict = None) -> dict:
+        #almacena muchos archivos enviando un solo stream StoreFiles por nodo responsable, a varios nodos en paralelo
+        #contents: filename -> contenido en memoria; paths: filename -> archivo local que se lee del disco por fragmentos
+        #devuelve filename -> mensaje de resultado
+        contents = contents or {}
+        paths = paths or {}
+        groups, unresolved = self.group_by_node([*contents, *paths])
+        results = {filename: "Error: No se pudo encontrar el nodo responsable" for filename in unresolved}
+
+        def file_chunks(filename):
+            if filename in paths:
+                return chunk_file(filename, paths[filename], self.chunk_size)
+            content = contents[filename]
+            return chunk_bytes(filename, content.encode() if isinstance(content, str) else content, self.chunk_size)
+
+        def send(responsible_node, filenames):
+            def upload(stub):
+                #el stream se arma dentro de la llamada para que un reintento vuelva a empezar desde el primer archivo
+                chunks = itertools.chain.from_iterable(file_chunks(filename) for filename in filenames)
+                return self.channels.send(stub.StoreFiles, chunks, copies=self.replication_factor - 1, metadata=grpc_metadata(responsible_node))
+            try:
+                self.request_log.info("Almacenando %s archivos en nodo %s", len(filenames), responsible_node['id'])
+                self.channels.call(grpc_address(responsible_node), upload)
+                return {filename: f"Archivo '{filename}' almacenado en nodo {responsible_node['id']}" for filename in filenames}
+            except Exception as e:
+                self.lookup_cache.invalidate_node(responsible_node['id'])
+                self.log.error("Error al almacenar archivos en el nodo %s: %s", responsible_node['id'], e)
+                return {filename: f"Error al almacenar el archivo en el nodo {responsible_node['id']}" for filename in filenames}
+
+        results.update(self.for_each_node(groups, send))
+        return results
+
+    def download_many(self, filenames: list, directory: str = None) -> dict:
+        #descarga muchos archivos con un solo stream DownloadFiles por nodo responsable, de varios nodos en paralelo
+        #sin directory devuelve filename -> contenido; con directory los escribe ahí a medida que llegan
+        #los archivos que fallan quedan como filename -> mensaje de error
+        groups, unresolved = self.group_by_node(filenames)
+        results = {filename: "Error: No se pudo encontrar el nodo responsable" for filename in unresolved}
+
+        def save(filename, blocks) -> str:
+            path = os.path.join(directory, filename)
+            try:
+                with open(path + '.part', 'wb') as f:
+                    for block in blocks:
+                        f.write(block)
+                os.replace(path + '.part', path)
+            except:
+                if os.path.exists(path + '.part'):
+                    os.remove(path + '.part')
+                raise
+            return f"Archivo '{filename}' descargado en {path}"
+
+        def receive(responsible_node, names):
+            received = {}
+
+            def download(stub):
+                received.clear()  #un reintento vuelve a empezar desde el primer archivo
+                stream = self.channels.receive(stub.DownloadFiles, pb2.FileList(filenames=names), metadata=grpc_metadata(responsible_node))
+                for first, blocks in split_chunks(stream):
+                    if first.missing:
+                        b"".join(blocks)  #los bloques se consumen igual para pasar al siguiente archivo
+                        received[first.filename] = "Error: Nodo no tiene el archivo"
+                    elif directory:
+                        received[first.filename] = save(first.filename, blocks)
+                    else:
+                        received[first.filename] = b"".join(blocks)
+
+            try:
+                self.request_log.info("Descargando %s archivos de nodo %s", len(names), responsible_node['id'])
+                self.channels.call(grpc_address(responsible_node), download)
+            except Exception as e:
+                self.lookup_cache.invalidate_node(responsible_node['id'])
+                self.log.error("Error al descargar archivos del nodo %s: %s", responsible_node['id'], e)
+            return {filename: received.get(filename, "Error: Nodo no tiene el archivo") for filename in names}
+
+        results.update(self.for_each_node(groups, receive))
+        return results
 
     def to_dict(self) -> dict:
         #convierte la información del nodo a un diccionario para fácil transmisión
         return {'ip': self.ip, 'port': self.port, 'id': self.id}
 
-    def store_file(self, filename: str, content: str) -> str:
-        #almacena el archivo en el nodo actual
-        print(f"Contenido descargado: {content}")
-        self.files[filename] = content
-        return f"El archivo '{filename}' ha sido almacenado en el nodo actual ({self.id})"
-
     def lookup_file(self, filename: str) -> str:
         #busca el archivo en el nodo actual
         if filename in self.files:
@@ -298,16 +1200,252 @@ class Node:
         else:
             print("  Ninguno\n")
         print(f"{self.predecessor['id'] or "None"}->{self.id}->{self.successor['id'] or "None"}\n")
+        print(f"Lista de sucesores: {[successor['id'] for successor in self.successor_list]}")
+        if self.replication_factor > 1:
+            print(f"Réplicas (r = {self.replication_factor}): {[replica['id'] for replica in self.replica_targets()]}")
+        if self.recovery_times:
+            print(f"Últimas recuperaciones de sucesor: {', '.join(f'{t:.2f} s' for t in self.recovery_times)}")
+        if self.predecessor and self.predecessor['id'] != self.id:
+            print(f"Sospecha sobre el predecesor: phi = {self.failure_detector.phi(self.predecessor['id']):.2f} (umbral {self.failure_detector.threshold})")
+        if self.host:
+            print(f"Intervalos de mantenimiento: {', '.join(f'{task.__name__} {interval.current:.1f} s' for task, interval in self.host.intervals.items())}")
+        print(f"Mensajes de control: {self.control.messages.rate():.2f}/s en el último minuto, {self.control.messages.total} en total")
+        print()
+        stats = self.lookup_cache.stats()
+        print(f"Cache de búsquedas: {stats['hits']} aciertos, {stats['misses']} fallos ({stats['hit_rate']:.0%}), {stats['entries']} nodos")
+        stats = self.read_cache.stats()
+        print(f"Cache de lectura: {stats['hits']} aciertos, {stats['misses']} fallos, {stats['stale']} vencidas ({stats['hit_rate']:.0%}), "
+              f"{stats['entries']} archivos, {stats['bytes']} bytes")
+        for mode, summary in self.lookup_stats.summary().items():
+            print(f"Búsquedas {mode}: {summary['count']}, saltos prom. {summary['hops_avg']:.1f} (máx. {summary['hops_max']}), "
+                  f"p50 {summary['p50_ms']:.1f} ms, p99 {summary['p99_ms']:.1f} ms")
+        flights = self.flights.stats()
+        if flights:
+            shared = ", ".join(f"{operation} {stats['coalesced']}/{stats['calls']}" for operation, stats in flights.items())
+            print(f"Operaciones compartidas con otra en curso: {shared}")
+        print()
+        print("Finger table (solo donde cambia el nodo):")
+        previous_id = None
+        for i, finger in enumerate(self.finger_table):
+            if finger and finger['id'] != previous_id:
+                print(f"  [{i}] {(self.id + 2 ** i) % (2 ** self.m)} -> {finger['id']}")
+                previous_id = finger['id']
+        print()
         print("Archivos almacenados:")
         if self.files:
             for filename in self.files:
-                print(f"  - {filename} \t = {self.files[filename]}")
+                print(f"  - {filename} \t = {self.files.size(filename)} bytes")
         else:
             print("  No hay archivos almacenados")
         print("===========================\n")
 
+class Host:
+    """
+    Proceso físico que aloja k nodos virtuales del anillo, cada uno con su id, sucesor, predecesor
+    y almacenamiento. Todos comparten el servidor rest, el servidor grpc, las conexiones salientes
+    y un solo event loop para todas las tareas de mantenimiento.
+    """
+    def __init__(self, config: dict) -> None:
+        self.ip = config.get("own_ip")
+        self.port = config.get("own_port")
+        self.grpc_port = self.port + 1
+        self.config = config
+        self.update_interval = config.get("update_interval")
+        self.compact_interval = config.get("compact_interval", 60)  #intervalo de compactación del almacenamiento
+        self.anti_entropy_interval = config.get("anti_entropy_interval", 30)  #segundos entre rondas de anti-entropía con las réplicas
+        #stabilize y fix_fingers esperan entre update_interval y max_update_interval según haya cambios.
+        #check_predecessor va siempre cada update_interval: el detector phi aprende el ritmo normal de las respuestas
+        #del predecesor, y si las pruebas se espaciaran tardaría mucho más en darlo por caído
+        max_update_interval = config.get("max_update_interval", 8 * self.update_interval)
+        self.intervals = {task: AdaptiveInterval(self.update_interval, max_update_interval)
+                          for task in (Node.stabilize_round, Node.update_fingers)}
+        self.intervals[Node.check_predecessor] = AdaptiveInterval(self.update_interval, self.update_interval)
+        self.metrics = Metrics()
+        self.traces = TraceStore.from_config(config)  #saltos de las búsquedas con traza que pasaron por este proceso
+        self.read_cache = ReadCache.from_config(config)  #contenido descargado de otros nodos, validado con su versión en cada lectura
+        self.http = HttpPool.from_config(config)
+        self.channels = ChannelCache.from_config(config)
+        self.control = open_control_plane(config, self.http, self.channels)
+        self.maintenance = MaintenanceEngine.from_config(config)
+        self.async_control = open_async_control_plane(config, self.control, self.maintenance.executor)
+        self.lookup_executor = futures.ThreadPoolExecutor(max_workers=config.get("lookup_workers", 16))
+        #las rutas rest quedan como puerta de compatibilidad (curl, nodos con control_plane = "rest"); sin ellas basta el servidor grpc
+        self.rest_gateway = config.get("control_plane", "grpc") == "rest" or config.get("rest_gateway", True)
+        self.grpc_workers = config.get("grpc_workers", 32)  #hilos del servidor grpc, cada salto de find_successor ocupa uno mientras espera al siguiente
+        self.threads = []  # lista para mantener los hilos
+
+        #cada nodo virtual elige sus r-1 réplicas entre sus sucesores que están en otros procesos: con k nodos virtuales
+        #por proceso la lista de sucesores necesita unas (r-1)·k entradas para encontrar r-1 procesos distintos
+        needed = (config.get("replication_factor", 1) - 1) * config.get("virtual_nodes", 1)
+        if config.get("successor_list_size", 3) < needed:
+            raise ValueError(f"successor_list_size ({config.get('successor_list_size', 3)}) tiene que ser al menos "
+                             f"(replication_factor - 1) * virtual_nodes = {needed}")
+
+        #el primer nodo virtual conserva el id de siempre (ip:port), los demás agregan #i a la clave
+        m = config.get("id_bits", 160)
+        self.vnodes = []
+        for i in range(config.get("virtual_nodes", 1)):
+            key = f'{self.ip}:{self.port}' if i == 0 else f'{self.ip}:{self.port}#{i}'
+            self.vnodes.append(Node(self.ip, self.port, hash_key(key, m), self.update_interval, config, self))
+        self.vnodes_by_id = {vnode.id: vnode for vnode in self.vnodes}
+        #lo que ya cuentan otros objetos se lee recién al pedir /metrics
+        self.metrics.collect("chord_storage_files", "Archivos guardados", "gauge", ("node",),
+                             lambda: [((str(vnode.id),), len(vnode.files)) for vnode in self.vnodes])
+        self.metrics.collect("chord_storage_bytes", "Bytes que ocupa el almacenamiento", "gauge", ("node",),
+                             lambda: [((str(vnode.id),), vnode.files.total_bytes()) for vnode in self.vnodes])
+        self.metrics.collect("chord_storage_written_bytes_total", "Bytes escritos en el almacenamiento", "counter", ("node",),
+                             lambda: [((str(vnode.id),), vnode.files.written_bytes) for vnode in self.vnodes])
+        self.metrics.collect("chord_single_flight_calls_total", "Búsquedas y descargas que pasaron por la unión de operaciones iguales en curso", "counter",
+                             ("node", "operation"), lambda: [((str(vnode.id), operation), stats['calls']) for vnode in self.vnodes for operation, stats in vnode.flights.stats().items()])
+        self.metrics.collect("chord_coalesced_requests_total", "Búsquedas y descargas que esperaron a otra igual en curso en vez de repetirla", "counter",
+                             ("node", "operation"), lambda: [((str(vnode.id), operation), stats['coalesced']) for vnode in self.vnodes for operation, stats in vnode.flights.stats().items()])
+        self.metrics.collect("chord_read_cache_requests_total", "Lecturas de archivos de otros nodos por resultado en la cache de lectura", "counter",
+                             ("result",), lambda: [((result,), self.read_cache.stats()[result]) for result in ("hits", "misses", "stale")])
+        self.metrics.collect("chord_read_cache_bytes", "Bytes guardados en la cache de lectura", "gauge", (),
+                             lambda: [((), self.read_cache.stats()['bytes'])])
+        self.metrics.collect("chord_control_messages_total", "Mensajes de control de chord enviados", "counter", (),
+                             lambda: [((), self.control.messages.total)])
+
+    def vnode(self, node_id: str = None) -> Node:
+        #nodo virtual con ese id; sin id se usa el primero (p. ej. cuando alguien entra al anillo por bootstrap)
+        if not node_id:
+            return self.vnodes[0]
+        return self.vnodes_by_id.get(int(node_id))
+
+    def bootstrap(self) -> None:
+        for vnode in self.vnodes:
+            vnode.bootstrap()
+
+    def schedule(self, task, interval: AdaptiveInterval, timeout: float = None) -> None:
+        #agenda la tarea en el motor de mantenimiento; cada ronda la ejecuta sobre todos los nodos virtuales a la vez,
+        #así una ronda tarda lo que el nodo más lento y no la suma de todos.
+        #Si algún nodo ve un cambio (la tarea devuelve True), falla o se pasa del timeout, todas las tareas de
+        #enrutamiento vuelven al intervalo mínimo, si no esta espera cada vez más
+        async def maintenance_round() -> bool:
+            started = time.perf_counter()
+            results = await asyncio.gather(*(self.maintenance.call(task, vnode, timeout=timeout) for vnode in self.vnodes), return_exceptions=True)
+            self.metrics.maintenance_seconds.observe(time.perf_counter() - started, task.__name__)
+            changed = False
+            for vnode, result in zip(self.vnodes, results):
+                if isinstance(result, Exception):
+                    changed = True
+                    log.error("Error en %s: %s", task.__name__, result, extra={'node': vnode.id})
+                else:
+                    changed = bool(result) or changed
+            if changed:
+                self.reset_intervals()
+            return changed
+        self.maintenance.every(maintenance_round, interval)
+
+    def reset_intervals(self) -> None:
+        for interval in self.intervals.values():
+            interval.reset()
+
+    def serve_grpc(self):
+        #inicia el servidor grpc para la transferencia de archivos y los mensajes de control de chord
+        server = grpc.server(futures.ThreadPoolExecutor(max_workers=self.grpc_workers), interceptors=[MetricsInterceptor(self.metrics)])
+        pb2_grpc.add_ChordServiceServicer_to_server(ChordService(self), server)
+        server.add_insecure_port(f"[::]:{self.grpc_port}")
+        server.start()
+        log.info("Servidor gRPC escuchando en el puerto %s", self.grpc_port)
+        server.wait_for_termination()
+
+    def start(self) -> None:
+        #iniciamos primero los servidores en sus hilos y después las tareas de mantenimiento en el motor: la primera
+        #ronda de stabilize de un nodo solo se consulta a sí mismo y fallaría si todavía no escucha
+        rest_thread = threading.Thread(target=serve_rest)
+        grpc_thread = threading.Thread(target=self.serve_grpc)
+        self.threads.append(grpc_thread)
+        if self.rest_gateway:
+            self.threads.append(rest_thread)
+        for thread in self.threads:
+            thread.start()
+
+        for task, interval in self.intervals.items():
+            self.schedule(task, interval, self.maintenance.task_timeout)
+        #compactación y anti-entropía van a intervalo fijo (mínimo = máximo) y sin timeout: corren en el pool,
+        #su duración depende de cuántos datos haya que mover y un hilo no se puede interrumpir
+        self.schedule(Node.compact_storage, AdaptiveInterval(self.compact_interval, self.compact_interval))
+        self.schedule(Node.anti_entropy, AdaptiveInterval(self.anti_entropy_interval, self.anti_entropy_interval))
+
+    def lookup_file(self, filename: str) -> str:
+        #busca el archivo en los nodos virtuales de este proceso
+        for vnode in self.vnodes:
+            if filename in vnode.files:
+                return vnode.lookup_file(filename)
+        return self.vnodes[0].lookup_file(filename)
+
+    def trace_path(self, trace_id: str) -> list:
+        #camino completo de una búsqueda con traza: los saltos de este proceso y los de cada proceso al que se
+        #reenvió la búsqueda, pidiéndoselos uno por uno (cada uno guarda solo los suyos)
+        hops = self.traces.hops(trace_id)
+        visited = {f"{self.ip}:{self.port}"}
+        for hop in hops:  #hops crece mientras se recorre con los saltos de los procesos siguientes
+            peer = hop['to']
+            if hop['operation'] != "find_successor" or not peer or f"{peer['ip']}:{peer['port']}" in visited:
+                continue
+            visited.add(f"{peer['ip']}:{peer['port']}")
+            try:
+                hops.extend(self.control.get_trace(peer, trace_id))
+            except Exception as e:
+                log.warning("No se pudo pedir la traza %s a %s:%s: %s", trace_id, peer['ip'], peer['port'], e)
+        return lookup_path(hops)
+
+    def key_distribution(self) -> dict:
+        #recorre el anillo de sucesor en sucesor y le pide a cada proceso físico la cantidad de claves de sus nodos virtuales
+        start = self.vnodes[0]
+        hosts = {}
+        current = start.successor
+        for _ in range(start.max_hops()):
+            address = f"{current['ip']}:{current['port']}"
+            if address not in hosts:
+                hosts[address] = self.control.host_stats(current)
+            if current['id'] == start.id:
+                break
+            current = self.control.get_successor(current)
+        return hosts
+
+    def display_distribution(self) -> None:
+        #muestra cuántas claves tiene cada proceso físico del anillo comparado con el promedio
+        hosts = self.key_distribution()
+        total = sum(stats['files'] for stats in hosts.values())
+        average = total / len(hosts) if hosts else 0
+        print("\n=== Distribución de claves por host ===")
+        print(f"{'Host':<22} {'Nodos virtuales':>15} {'Archivos':>9} {'% total':>8} {'x promedio':>11}")
+        for address, stats in sorted(hosts.items()):
+            share = stats['files'] / total * 100 if total else 0
+            ratio = stats['files'] / average if average else 0
+            print(f"{address:<22} {len(stats['vnodes']):>15} {stats['files']:>9} {share:>7.1f}% {ratio:>11.2f}")
+        print(f"Total: {total} archivos en {len(hosts)} hosts")
+        print("=======================================\n")
+
+    def close(self) -> None:
+        self.maintenance.close()
+        self.http.close()
+        self.channels.close()
+        for vnode in self.vnodes:
+            vnode.files.close()
+
 #---------------------------------------------- rest api ----------------------------------------------
 
+@app.before_request
+def start_timer():
+    g.started = time.perf_counter()
+
+@app.after_request
+def record_latency(response):
+    #latencia de cada ruta por su regla y no por la url, así los parámetros no crean una serie nueva por petición
+    route = request.url_rule.rule if request.url_rule else "sin_ruta"
+    host.metrics.rest_seconds.observe(time.perf_counter() - g.started, route, request.method, str(response.status_code))
+    return response
+
+def current_node() -> Node:
+    #resuelve a cuál nodo virtual del proceso va dirigida la petición (?node=<id>); sin parámetro responde el primero
+    node = host.vnode(request.args.get('node'))
+    if node is None:
+        abort(make_response(jsonify({'error': 'Nodo virtual desconocido'}), 404))
+    return node
+
 @app.route('/find_successor', methods=['POST'])
 def find_successor_route():
     try:
@@ -315,27 +1453,63 @@ def find_successor_route():
         if 'id' not in data:
             return jsonify({'error': 'Missing ID'}), 400
         
-        node_id = data['id']
-        result = node.find_successor(node_id)
+        #sigue la traza de quien reenvió la búsqueda; si la búsqueda empieza acá abre una si le toca en la muestra
+        with traced(request.headers.get(TRACE_HEADER) or host.traces.sample()) as trace_id:
+            result, hops = current_node().serve_lookup(int(data['id']), data.get('hops', 0), data.get('mode') or "recursive")
         if not result:
-            return jsonify({'error': 'No se pudo encontrar el sucesor'}), 500
-        return jsonify(result)
+            return jsonify({'error': 'No se pudo encontrar el sucesor', 'trace': trace_id}), 500
+        return jsonify({**encode_node(result), 'hops': hops, 'trace': trace_id})
     except Exception as e:
-        print(f"Error en /find_successor: {str(e)}")
+        log.error("Error en /find_successor: %s", e)
         return jsonify({'error': f"Internal server error: {str(e)}"}), 500
 
+@app.route('/closest_preceding', methods=['POST'])
+def closest_preceding():
+    #un paso de la búsqueda iterativa: el sucesor de este nodo y los nodos que conoce más cerca del id
+    data = request.json
+    if not data or 'id' not in data:
+        return jsonify({'error': 'Missing ID'}), 400
+    node = current_node()
+    routing = node.routing
+    nodes = node.closest_preceding_nodes(int(data['id']), data.get('count', 3), routing)
+    return jsonify({'successor': encode_node(routing.successor), 'nodes': [encode_node(n) for n in nodes]})
+
+@app.route('/lookup_stats', methods=['GET'])
+def lookup_stats():
+    #saltos y latencias de las búsquedas originadas en cada nodo virtual, por modo
+    return jsonify({str(vnode.id): vnode.lookup_stats.summary() for vnode in host.vnodes})
+
+@app.route('/trace/<trace_id>', methods=['GET'])
+def get_trace(trace_id):
+    #camino y latencia por salto de una búsqueda, pedido al nodo donde empezó (el id viene en las respuestas de
+    #/search y /find_successor); con ?local=1 solo los saltos de este proceso, sin pedírselos a los demás
+    if request.args.get('local'):
+        return jsonify({'trace': trace_id, 'hops': host.traces.hops(trace_id)})
+    path = host.trace_path(trace_id)
+    if not path:
+        return jsonify({'error': 'Traza desconocida o vencida'}), 404
+    return jsonify({'trace': trace_id, 'path': path})
+
 @app.route('/get_predecessor', methods=['GET'])
 def get_predecessor():
     #devuelve el predecesor del nodo actual
+    node = current_node()
     if node.predecessor:
-        return jsonify(node.predecessor)
+        return jsonify(encode_node(node.predecessor))
     return jsonify({}), 404
 
+@app.route('/get_neighbors', methods=['GET'])
+def get_neighbors():
+    #devuelve el predecesor y la lista de sucesores del nodo actual, usado por stabilize
+    routing = current_node().routing  #predecesor y sucesores de la misma foto
+    return jsonify({'predecessor': encode_node(routing.predecessor), 'successors': [encode_node(successor) for successor in routing.successor_list]})
+
 @app.route('/get_successor', methods=['GET'])
 def get_successor():
     #devuelve el sucesor del nodo actual
+    node = current_node()
     if node.successor:
-        return jsonify(node.successor)
+        return jsonify(encode_node(node.successor))
     return jsonify({}), 404
 
 @app.route('/notify', methods=['POST'])
@@ -344,7 +1518,7 @@ def notify():
     data = request.json
     if not data or 'id' not in data:
         return jsonify({'error': 'Invalid request'}), 400
-    node.notify(data)
+    current_node().notify(decode_node(data))
     return jsonify({'message': 'Predecesor actualizado'})
 
 @app.route('/search', methods=['POST'])
@@ -354,24 +1528,117 @@ def search():
         if 'filename' not in data:
             return jsonify({'error': 'Missing filename'}), 400
 
-        result = node.search(data['filename'])
+        #un cliente puede pedir que se trace esta búsqueda mandando su propio id en la cabecera X-Chord-Trace
+        with traced(request.headers.get(TRACE_HEADER, "")):
+            result = current_node().search(data['filename'])
         return jsonify(result)
     except Exception as e:
-        print(f"Error en /search: {str(e)}")
+        log.error("Error en /search: %s", e)
+        return jsonify({'error': f"Internal server error: {str(e)}"}), 500
+
+@app.route('/search_batch', methods=['POST'])
+def search_batch():
+    #busca muchos archivos en una sola petición, con una búsqueda por nodo responsable en vez de una por archivo
+    try:
+        data = request.json
+        if not data or 'filenames' not in data:
+            return jsonify({'error': 'Missing filenames'}), 400
+
+        return jsonify({'results': current_node().search_many(data['filenames'], data.get('mode'))})
+    except Exception as e:
+        log.error("Error en /search_batch: %s", e)
         return jsonify({'error': f"Internal server error: {str(e)}"}), 500
 
 @app.route('/ping', methods=['GET'])
 def ping():
     #función simple para verificar si el nodo está activo
+    current_node()
     return jsonify({'message': 'Pong'})
 
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    #aciertos y fallos de la cache de búsquedas de cada nodo virtual, para dimensionarla
+    return jsonify({str(vnode.id): vnode.lookup_cache.stats() for vnode in host.vnodes})
+
+@app.route('/download/<path:filename>', methods=['GET'])
+def download(filename):
+    #contenido de un archivo (la url que devuelve /search): los propios desde el almacenamiento y los de otros nodos
+    #a través de la cache de lectura; con If-None-Match y la misma versión responde 304 sin el contenido
+    node = current_node()
+    try:
+        etag = node.files.etag(filename)  #la versión antes que el contenido, como en DownloadFile
+        content = node.files.get(filename)
+    except KeyError:
+        content = node.download_file_grpc(filename)
+        if isinstance(content, str):
+            return jsonify({'error': content}), 404
+        etag = content_tag(content)
+    response = make_response(content)
+    response.content_type = 'application/octet-stream'
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+@app.route('/read_cache_stats', methods=['GET'])
+def read_cache_stats():
+    #aciertos (copias validadas sin transferir), fallos, copias vencidas y tamaño de la cache de lectura del proceso
+    return jsonify(host.read_cache.stats())
+
+@app.route('/coalescing_stats', methods=['GET'])
+def coalescing_stats():
+    #por nodo virtual y operación (lookup, find_successor, download): llamadas y cuántas esperaron a otra igual en curso
+    return jsonify({str(vnode.id): vnode.flights.stats() for vnode in host.vnodes})
+
+@app.route('/maintenance_stats', methods=['GET'])
+def maintenance_stats():
+    #intervalos actuales del mantenimiento, mensajes de control por segundo del proceso y sospecha (phi) sobre cada predecesor
+    def predecessor_phi(vnode):
+        predecessor = vnode.predecessor
+        if not predecessor or predecessor['id'] == vnode.id:
+            return None
+        phi = vnode.failure_detector.phi(predecessor['id'])
+        return phi if phi != float('inf') else None  #nunca respondió
+    return jsonify({
+        'intervals': {task.__name__: interval.current for task, interval in host.intervals.items()},
+        'messages_per_second': host.control.messages.rate(),
+        'messages_total': host.control.messages.total,
+        'predecessor_phi': {str(vnode.id): predecessor_phi(vnode) for vnode in host.vnodes},
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    #métricas del proceso en el formato de texto de Prometheus
+    return Response(host.metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/host_stats', methods=['GET'])
+def host_stats():
+    #cantidad de claves de cada nodo virtual de este proceso, usado por el reporte de distribución
+    vnodes = [{'id': str(vnode.id), 'files': len(vnode.files)} for vnode in host.vnodes]
+    return jsonify({'vnodes': vnodes, 'files': sum(vnode['files'] for vnode in vnodes)})
+
 def serve_rest() -> None:
-    #inicia el servidor rest
-    app.run(host=node.ip, port=node.port)
+    #inicia el servidor rest; con rest_server = "waitress" se usa un servidor multi-hilo de producción
+    #con pool de hilos, cola de conexiones acotada y keep-alive, si no el servidor de desarrollo de flask
+    config = host.config
+    if config.get("rest_server", "waitress") == "waitress":
+        if waitress_serve:
+            log.info("Servidor REST (waitress) escuchando en el puerto %s", host.port)
+            waitress_serve(app, host=host.ip, port=host.port,
+                           threads=config.get("rest_threads", 16),
+                           backlog=config.get("rest_backlog", 1024),
+                           connection_limit=config.get("rest_connection_limit", 1000),
+                           channel_timeout=config.get("rest_keepalive", 30),
+                           asyncore_use_poll=True)
+            return
+        log.warning("waitress no está instalado, usando el servidor de desarrollo de Flask")
+    app.run(host=host.ip, port=host.port, threaded=True)
 
 def exit_program():
     #cierra de manera segura todos los hilos y termina el programa
     print("Cerrando nodos y finalizando el programa...")
+    for vnode in host.vnodes:
+        vnode.leave()
+    host.close()
+    log_queue.stop()
     for thread in threading.enumerate():
         if thread is not threading.current_thread():
             thread.join(timeout=1)
@@ -382,78 +1649,117 @@ def main() -> None:
     with open('bootstrap.json', 'r') as f:
         config = json.load(f)
     
-    ip = config.get("own_ip")
-    port = config.get("own_port")
-    update_interval = config.get("update_interval")
-    
-    node_id = hash_key(f'{ip}:{port}')
-    global node
-    node = Node(ip, port, node_id, update_interval, config)
-    
-    node.bootstrap()
-
-    #iniciamos los servidores y procesos de estabilización
-    rest_thread = threading.Thread(target=serve_rest)
-    grpc_thread = threading.Thread(target=node.serve_grpc)
-    stabilize_thread = threading.Thread(target=node.stabilize)
-    check_predecessor_thread = threading.Thread(target=node.check_predecessor)
-
-    node.threads.extend([rest_thread, grpc_thread, stabilize_thread, check_predecessor_thread])
-
-    rest_thread.start()
-    grpc_thread.start()
-    stabilize_thread.start()
-    check_predecessor_thread.start()
+    global host, log_queue
+    log_queue = LogQueue.from_config(config)
+    host = Host(config)
+    host.metrics.collect("chord_log_dropped_total", "Registros de log descartados con la cola llena", "counter", (),
+                         lambda: [((), log_queue.dropped)])
+    host.bootstrap()
+    host.start()
+    node = host.vnodes[0]  #los comandos de consola entran al anillo por el primer nodo virtual
 
     #loop principal para manejar comandos desde la consola
     while True:
         command = input("> ").strip()
-        if command.startswith("store"):
+        if command.startswith("storemany"):
+            #sube varios archivos locales con un solo stream por nodo responsable
+            filenames = command.split()[1:]
+            if not filenames:
+                print("Comando inválido. Uso correcto: storemany <filename> [<filename> ...]")
+                continue
+            for filename, message in node.store_many(paths={filename: filename for filename in filenames}).items():
+                print(message)
+        elif command.startswith("downloadmany"):
+            args = command.split()
+            if len(args) < 3:
+                print("Comando inválido. Uso correcto: downloadmany <directorio> <filename> [<filename> ...]")
+                continue
+            os.makedirs(args[1], exist_ok=True)
+            for filename, message in node.download_many(args[2:], directory=args[1]).items():
+                print(message)
+        elif command.startswith("store"):
             try:
-                _, filename, content = command.split(maxsplit=2)
-                print(node.store_file_grpc(filename, content))
+                args = command.split(maxsplit=2)
+                if len(args) == 3:
+                    _, filename, content = args
+                    print(node.store_file_grpc(filename, content=content))
+                else:
+                    #sin contenido se sube el archivo local con ese nombre, leyéndolo del disco por fragmentos
+                    _, filename = args
+                    print(node.store_file_grpc(filename, path=filename))
             except:
-                print("Comando inválido. Uso correcto: store <filename> <content>")
+                print("Comando inválido. Uso correcto: store <filename> [<content>]")
                 continue
         elif command.startswith("lookup"):
             try:
                 _, filename = command.split()
-                print(node.lookup_file(filename))
+                print(host.lookup_file(filename))
             except:
                 print("Comando inválido. Uso correcto: lookup <filename>")
                 continue
         elif command.startswith("search"):
             try:
-                _, filename = command.split()
-                response = node.search(filename)
+                args = command.split()
+                if len(args) == 3:
+                    #el modo de búsqueda se puede elegir en cada llamada
+                    _, filename, mode = args
+                    if mode not in ("recursive", "iterative"):
+                        raise ValueError(mode)
+                else:
+                    _, filename = args
+                    mode = None
+                with traced(new_trace_id()):  #las búsquedas de la consola siempre se trazan, sin muestreo
+                    response = node.search(filename, mode)
                 if 'error' in response:
-                    print(response['error'])
+                    print(f"{response['error']} (traza {response['trace']})")
                 else:
-                    print(f"Archivo '{filename}' está en {response['url']}")
+                    print(f"Archivo '{filename}' está en {response['url']} (traza {response['trace']})")
             except:
-                print("Comando inválido. Uso correcto: search <filename>")
+                print("Comando inválido. Uso correcto: search <filename> [recursive|iterative]")
+                continue
+        elif command.startswith("trace"):
+            args = command.split()
+            if len(args) != 2:
+                print("Comando inválido. Uso correcto: trace <id de traza>")
                 continue
+            display_trace(host.trace_path(args[1]))
         elif command.startswith("download"):
             try:
-                _, filename = command.split()
-                content = node.download_file_grpc(filename)
-                if filename not in node.files:
-                    if content[:6] != "Error:":
-                        print(node.store_file(filename, content))
+                args = command.split()
+                if len(args) == 3:
+                    #con destino los fragmentos se escriben directamente al disco
+                    _, filename, path = args
+                    print(node.download_file_grpc(filename, path=path))
+                else:
+                    #sin destino el contenido queda en la cache de lectura del proceso, no entre los archivos propios del nodo
+                    _, filename = args
+                    content = node.download_file_grpc(filename)
+                    if isinstance(content, bytes):
+                        print(f"Archivo '{filename}' descargado: {len(content)} bytes (en la cache de lectura)")
                     else:
                         print(content)
             except:
-                print("Comando inválido. Uso correcto: download <filename>")
+                print("Comando inválido. Uso correcto: download <filename> [<path>]")
                 continue
         elif command == "info":
-            node.display_info()
+            for vnode in host.vnodes:
+                vnode.display_info()
+        elif command == "distribution":
+            try:
+                host.display_distribution()
+            except Exception as e:
+                print(f"Error al calcular la distribución de claves: {e}")
         elif command == "help":
             print("Comandos disponibles:")
-            print("  store <filename> <content>: Almacena un archivo en la red")
+            print("  store <filename> [<content>]: Almacena un archivo en la red (sin contenido sube el archivo local)")
+            print("  storemany <filename> [<filename> ...]: Sube varios archivos locales, un solo envío por nodo responsable")
             print("  lookup <filename>: Busca un archivo en el nodo actual")
-            print("  search <filename>: Busca un archivo en la red")
-            print("  download <filename>: Descarga un archivo de la red")
-            print("  info: Muestra información del nodo actual")
+            print("  search <filename> [recursive|iterative]: Busca un archivo en la red (por defecto con lookup_mode)")
+            print("  trace <id>: Muestra el camino y la latencia por salto de una búsqueda (el id lo muestra search)")
+            print("  download <filename> [<path>]: Descarga un archivo de la red (con path lo guarda en disco)")
+            print("  downloadmany <directorio> <filename> [<filename> ...]: Descarga varios archivos en el directorio")
+            print("  info: Muestra información de los nodos virtuales de este proceso")
+            print("  distribution: Muestra la distribución de claves por host en el anillo")
             print("  help: Muestra esta ayuda")
             print("  exit: Cierra el programa de forma segura")
         elif command == "exit":
@@ -461,9 +1767,21 @@ def main() -> None:
         else:
             print("Comando no reconocido")
 
-def hash_key(key: str) -> int:
-    #genera un id único basado en el hash sha-1 de la clave
-    return int(hashlib.sha1(key.encode()).hexdigest(), 16) % (2**16)
+def display_trace(path: list) -> None:
+    #muestra los saltos de una traza, uno por línea, con la latencia total y la del salto solo
+    if not path:
+        print("Traza desconocida o vencida")
+        return
+    print(f"{'Saltos':>6} {'Operación':<17} {'Nodo':<22} {'Hacia':<22} {'ms':>9} {'ms salto':>9}  Resultado")
+    for hop in path:
+        to = f"{hop['to']['ip']}:{hop['to']['port']}" if hop['to'] else "-"
+        operation = f"lookup ({hop['mode']})" if hop['mode'] else hop['operation']
+        outcome = hop['error'] or (f"responsable {hop['result']}" if hop['result'] else "")
+        print(f"{hop['hops']:>6} {operation:<17} {hop['address']:<22} {to:<22} {hop['ms']:>9.2f} {hop['hop_ms']:>9.2f}  {outcome}")
+
+def hash_key(key: str, m: int = 160) -> int:
+    #genera un id único basado en el hash sha-1 de la clave, reducido a m bits (con 160 se usa el sha-1 completo)
+    return int(hashlib.sha1(key.encode()).hexdigest(), 16) % (2**m)
 
 if __name__ == '__main__':
     main()
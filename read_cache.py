@@ -0,0 +1,60 @@
+import threading
+from collections import OrderedDict
+
+class ReadCache:
+    """
+    Cache de lectura del contenido que este proceso descarga de otros nodos (download y GET /download),
+    separada de los archivos propios del nodo: filename -> (versión, contenido), hasta max_bytes bytes en total
+    con desalojo LRU. Una copia nunca se entrega sin validar: cada lectura le manda la versión (etag) al nodo que
+    tiene el archivo y este responde sin datos si sigue vigente, así un archivo popular viaja una vez por versión
+    y no una vez por lectura. Los archivos de más de un cuarto del tamaño no se guardan, para que uno grande no
+    desaloje a todos los chicos y populares.
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes  #0 = sin cache
+        self.entries = OrderedDict()  #filename -> (etag, contenido), en orden de uso
+        self.bytes = 0
+        self.hits = 0  #copias validadas que se entregaron sin transferir el archivo
+        self.misses = 0  #lecturas sin copia
+        self.stale = 0  #copias que el dueño ya había cambiado
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "ReadCache":
+        return cls(config.get("read_cache_bytes", 64 * 1024 * 1024))
+
+    def get(self, filename: str) -> tuple:
+        #(etag, contenido) de la copia guardada, para validarla con el dueño; None si no hay
+        with self.lock:
+            entry = self.entries.get(filename)
+            if entry is None:
+                self.misses += 1
+            return entry
+
+    def validated(self, filename: str) -> None:
+        #el dueño confirmó que la copia sigue vigente
+        with self.lock:
+            self.hits += 1
+            if filename in self.entries:
+                self.entries.move_to_end(filename)
+
+    def put(self, filename: str, etag: str, content: bytes) -> None:
+        #guarda la versión recién descargada, reemplazando la copia vieja si había
+        with self.lock:
+            previous = self.entries.pop(filename, None)
+            if previous is not None:
+                self.stale += 1
+                self.bytes -= len(previous[1])
+            if len(content) > self.max_bytes // 4:
+                return
+            self.entries[filename] = (etag, content)
+            self.bytes += len(content)
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def stats(self) -> dict:
+        with self.lock:
+            total = self.hits + self.misses + self.stale
+            return {'hits': self.hits, 'misses': self.misses, 'stale': self.stale, 'entries': len(self.entries),
+                    'bytes': self.bytes, 'hit_rate': self.hits / total if total else 0.0}
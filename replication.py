@@ -0,0 +1,63 @@
+import threading
+import time
+from contextlib import contextmanager
+
+def select_replicas(primary: dict, successors: list, count: int) -> list:
+    #las réplicas de las claves de primary son sus primeros count sucesores que estén en otro proceso físico:
+    #dos copias en el mismo host (nodos virtuales) se pierden juntas si ese host se cae
+    replicas = []
+    hosts = {(primary['ip'], primary['port'])}
+    for successor in successors:
+        if len(replicas) == count:
+            break
+        if successor and (successor['ip'], successor['port']) not in hosts:
+            replicas.append(successor)
+            hosts.add((successor['ip'], successor['port']))
+    return replicas
+
+class PeerStats:
+    """
+    Latencia de las últimas lecturas (promedio móvil exponencial) y lecturas en curso por nodo,
+    para leer cada archivo de la réplica más rápida y menos cargada.
+    """
+    def __init__(self, alpha: float = 0.2, failure_penalty: float = 1.0) -> None:
+        self.alpha = alpha  #peso de la última medición en el promedio
+        self.failure_penalty = failure_penalty  #segundos que cuenta una lectura fallida
+        self.latency = {}  #id del nodo -> segundos
+        self.in_flight = {}  #id del nodo -> lecturas en curso
+        self.lock = threading.Lock()
+
+    def score(self, node: dict) -> float:
+        #se llama con el lock tomado; los nodos sin mediciones van primero para conocer su latencia
+        return self.latency.get(node['id'], 0.0) * (1 + self.in_flight.get(node['id'], 0))
+
+    def rank(self, nodes: list) -> list:
+        #ordena los nodos de mejor a peor candidato para leer
+        with self.lock:
+            return sorted(nodes, key=self.score)
+
+    def record(self, node_id: int, seconds: float) -> None:
+        with self.lock:
+            previous = self.latency.get(node_id)
+            self.latency[node_id] = seconds if previous is None else (1 - self.alpha) * previous + self.alpha * seconds
+
+    @contextmanager
+    def track(self, node: dict):
+        #mide una lectura de node; si falla cuenta como failure_penalty segundos
+        with self.lock:
+            self.in_flight[node['id']] = self.in_flight.get(node['id'], 0) + 1
+        start = time.perf_counter()
+        try:
+            yield
+            self.record(node['id'], time.perf_counter() - start)
+        except:
+            self.record(node['id'], self.failure_penalty)
+            raise
+        finally:
+            with self.lock:
+                self.in_flight[node['id']] -= 1
+
+    def summary(self) -> dict:
+        #latencia en milisegundos por id de nodo, para info
+        with self.lock:
+            return {node_id: seconds * 1000 for node_id, seconds in self.latency.items()}
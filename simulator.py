@@ -0,0 +1,371 @@
+import argparse
+import asyncio
+import bisect
+import math
+import multiprocessing
+import random
+import threading
+import time
+from concurrent import futures
+from node import Node, hash_key
+from control_plane import MessageRate
+from maintenance import MaintenanceEngine
+from logs import silenced
+from metrics import Metrics
+from tracing import TraceStore
+from read_cache import ReadCache
+from http_pool import HttpPool
+from grpc_channels import ChannelCache
+from benchmark import percentile
+
+class SimulatedClock:
+    """
+    Reloj del simulador: avanza update_interval segundos por ronda de mantenimiento en vez de seguir al tiempo real,
+    así las rondas corren tan rápido como da la cpu y el detector de fallas ve los mismos intervalos que en un anillo real.
+    """
+    def __init__(self) -> None:
+        self.time = 0.0
+
+    def now(self) -> float:
+        return self.time
+
+    def advance(self, seconds: float) -> None:
+        self.time += seconds
+
+class SimulatedControlPlane:
+    """
+    Plano de control en memoria: cada mensaje llama directamente al nodo destino dentro del proceso, como lo haría
+    ChordService, sin sockets ni serialización. Un nodo caído o desconocido lanza ConnectionError, como una conexión
+    rechazada. Cada mensaje suma un rtt simulado (lognormal con mediana latency) al tiempo de red del hilo que lo
+    envía; en la búsqueda recursiva los saltos siguientes corren en el mismo hilo y su rtt también se suma.
+    """
+    def __init__(self, latency: float = 0.02, sigma: float = 0.5) -> None:
+        self.latency = latency  #rtt mediano de un mensaje, en segundos
+        self.sigma = sigma  #dispersión de la lognormal, la cola de latencias
+        self.nodes = {}  #(ip, puerto) -> nodo vivo
+        self.messages = MessageRate()
+        self.network = threading.local()  #segundos de red simulados acumulados por el hilo actual
+
+    def network_time(self) -> float:
+        return getattr(self.network, 'seconds', 0.0)
+
+    def reset_network_time(self) -> None:
+        self.network.seconds = 0.0
+
+    def target(self, peer: dict) -> Node:
+        #nodo que atiende el mensaje; sin id responde el nodo de ese puerto, como el primer nodo virtual de un proceso
+        self.messages.record()
+        node = self.nodes.get((peer['ip'], peer['port']))
+        if node is None or ('id' in peer and peer['id'] != node.id):
+            raise ConnectionError(f"El nodo {peer['ip']}:{peer['port']} no responde")
+        if self.latency > 0:
+            self.network.seconds = self.network_time() + random.lognormvariate(math.log(self.latency), self.sigma)
+        return node
+
+    def find_successor(self, peer: dict, id_to_find: int, hops: int = 0, mode: str = "recursive") -> tuple:
+        node = self.target(peer)
+        if mode == "iterative":
+            result, hops = node.find_successor_iterative(id_to_find)
+        else:
+            result, hops = node.find_successor_with_hops(id_to_find, hops)
+        if not result:
+            raise LookupError("No se pudo encontrar el sucesor")
+        return dict(result), hops
+
+    def closest_preceding(self, peer: dict, id_to_find: int, count: int) -> tuple:
+        node = self.target(peer)
+        routing = node.routing
+        return dict(routing.successor), [dict(n) for n in node.closest_preceding_nodes(id_to_find, count, routing)]
+
+    def get_successor(self, peer: dict) -> dict:
+        node = self.target(peer)
+        if not node.successor:
+            raise LookupError("El nodo no tiene sucesor")
+        return dict(node.successor)
+
+    def get_predecessor(self, peer: dict) -> dict:
+        return dict(self.target(peer).predecessor)
+
+    def get_neighbors(self, peer: dict) -> tuple:
+        routing = self.target(peer).routing  #predecesor y sucesores de la misma foto
+        return dict(routing.predecessor), [dict(successor) for successor in routing.successor_list]
+
+    def notify(self, peer: dict, node: dict) -> None:
+        self.target(peer).notify(dict(node))
+
+    def ping(self, peer: dict) -> None:
+        self.target(peer)
+
+class AsyncSimulatedControlPlane:
+    """
+    Versión en corrutinas del plano de control en memoria para las tareas de mantenimiento: los mensajes no esperan
+    red, se responden en el momento.
+    """
+    def __init__(self, control: SimulatedControlPlane) -> None:
+        self.control = control
+        self.messages = control.messages
+
+    def __getattr__(self, method: str):
+        blocking = getattr(self.control, method)
+
+        async def call(*args, **kwargs):
+            return blocking(*args, **kwargs)
+        return call
+
+class SimulatedHost:
+    """
+    Hace de Host para todos los nodos simulados: comparten el plano de control en memoria, el motor de mantenimiento
+    y los pools de hilos. Cada nodo tiene su propio puerto, como si fuera un proceso distinto.
+    """
+    def __init__(self, control: SimulatedControlPlane, maintenance: MaintenanceEngine) -> None:
+        self.control = control
+        self.async_control = AsyncSimulatedControlPlane(control)
+        self.maintenance = maintenance
+        self.metrics = Metrics()
+        self.traces = TraceStore()
+        self.read_cache = ReadCache()
+        self.http = HttpPool()
+        #nadie escucha en los puertos grpc simulados: los traspasos de claves al cambiar el predecesor fallan en el momento
+        self.channels = ChannelCache(ready_timeout=0.05)
+        self.lookup_executor = futures.ThreadPoolExecutor(max_workers=16)
+        self.vnodes = []  #nodos en orden de creación; el primero arma el anillo
+        self.intervals = {}
+
+    def reset_intervals(self) -> None:
+        pass  #en el simulador cada ronda ejecuta todas las tareas
+
+    def close(self) -> None:
+        self.maintenance.close()
+        self.http.close()
+        self.channels.close()
+        self.lookup_executor.shutdown(wait=False)
+
+class Simulator:
+    """
+    Anillo de N nodos Chord dentro de un proceso, con el código real de Node (búsquedas, stabilize, notify,
+    check_predecessor, fix_fingers) sobre el plano de control en memoria. El tiempo avanza por rondas: en cada ronda
+    todos los nodos vivos corren una vez cada tarea de mantenimiento y el reloj avanza update_interval segundos.
+    """
+    def __init__(self, id_bits: int = 32, update_interval: float = 1, latency: float = 0.02, base_port: int = 20000,
+                 seed: int = None) -> None:
+        self.random = random.Random(seed)
+        self.clock = SimulatedClock()
+        self.control = SimulatedControlPlane(latency)
+        self.host = SimulatedHost(self.control, MaintenanceEngine(workers=4))
+        self.m = id_bits
+        self.update_interval = update_interval
+        self.next_port = base_port
+        self.rounds = 0
+        self.join_retries = 0  #entradas al anillo que fallaron y se reintentaron en la ronda siguiente
+        self.config = {
+            "own_ip": "127.0.0.1", "id_bits": id_bits, "update_interval": update_interval,
+            "storage_backend": "memory", "replication_factor": 1, "merkle_depth": 4,
+        }
+
+    def alive(self) -> list:
+        return list(self.control.nodes.values())
+
+    def join(self, via: list = None) -> Node:
+        #crea un nodo en el siguiente puerto libre y lo hace entrar al anillo a través de un nodo vivo al azar de via
+        #(por defecto cualquiera)
+        ids = {node.id for node in self.alive()}
+        while True:
+            port = self.next_port
+            self.next_port += 2
+            node_id = hash_key(f"127.0.0.1:{port}", self.m)
+            if node_id not in ids:
+                break
+        node = Node("127.0.0.1", port, node_id, self.update_interval, {**self.config, "own_port": port}, self.host)
+        node.failure_detector.clock = self.clock.now
+        self.host.vnodes.append(node)
+        self.enter(node, via)
+        self.control.nodes[(node.ip, node.port)] = node
+        return node
+
+    def enter(self, node: Node, via: list = None) -> bool:
+        #hace entrar al nodo por otro nodo vivo al azar; devuelve False si quedó solo, con él mismo como sucesor
+        candidates = self.control.nodes if via is None else [(other.ip, other.port) for other in via]
+        others = [address for address in candidates if address in self.control.nodes and address != (node.ip, node.port)]
+        bootstrap = self.random.choice(others) if others else ("", "")
+        node.config = {**node.config, "bootstrap_ip": bootstrap[0], "bootstrap_port": bootstrap[1]}
+        node.bootstrap()
+        return not others or node.successor['id'] != node.id
+
+    def fail(self, node: Node) -> None:
+        #el nodo se cae sin avisar: deja de responder y sus claves se pierden
+        del self.control.nodes[(node.ip, node.port)]
+
+    def run_round(self) -> None:
+        #un nodo queda solo si la búsqueda de su sucesor falló al entrar (p. ej. por sucesores recién caídos que nadie
+        #reemplazó todavía) o si se le cayeron todos los sucesores y el bootstrap falló: nadie se entera de que existe,
+        #así que, como haría un operador, se lo vuelve a hacer entrar por otro nodo que no esté solo (si dos nodos
+        #solos entraran uno por el otro armarían un anillo aparte)
+        alone = [node for node in self.alive() if node.successor['id'] == node.id]
+        if alone and len(alone) < len(self.control.nodes):
+            in_ring = [node for node in self.alive() if node.successor['id'] != node.id]
+            for node in alone:
+                self.join_retries += 1
+                self.enter(node, in_ring)
+
+        async def maintenance_round():
+            nodes = self.alive()
+            for task in (Node.stabilize_round, Node.check_predecessor, Node.update_fingers):
+                await asyncio.gather(*(task(node) for node in nodes), return_exceptions=True)
+        self.host.maintenance.run(maintenance_round())
+        self.clock.advance(self.update_interval)
+        self.rounds += 1
+
+    def ring(self) -> list:
+        return sorted(node.id for node in self.alive())
+
+    def responsible(self, ring: list, key_id: int) -> int:
+        #id del nodo responsable de key_id según el anillo real
+        return ring[bisect.bisect_left(ring, key_id) % len(ring)]
+
+    def converged(self) -> bool:
+        #todos los nodos vivos apuntan a su sucesor y a su predecesor reales
+        ring = self.ring()
+        for node in self.alive():
+            index = bisect.bisect_left(ring, node.id)
+            if node.successor.get('id') != ring[(index + 1) % len(ring)] or node.predecessor.get('id') != ring[index - 1]:
+                return False
+        return True
+
+    def converge(self, max_rounds: int) -> int:
+        #rondas hasta que el anillo converge, o None si no convergió en max_rounds
+        for rounds in range(max_rounds + 1):
+            if self.converged():
+                return rounds
+            self.run_round()
+        return None
+
+    def lookups(self, key_ids: list) -> dict:
+        #búsquedas recursivas desde nodos vivos al azar: saltos, latencia (cpu real + red simulada) y errores
+        ring = self.ring()
+        nodes = self.alive()
+        hops, latencies, errors = [], [], 0
+        for key_id in key_ids:
+            source = self.random.choice(nodes)
+            self.control.reset_network_time()
+            started = time.perf_counter()
+            try:
+                result, lookup_hops = source.find_successor_with_hops(key_id)
+            except Exception:
+                result, lookup_hops = {}, 0
+            latencies.append(time.perf_counter() - started + self.control.network_time())
+            hops.append(lookup_hops)
+            errors += result.get('id') != self.responsible(ring, key_id)
+        hops.sort()
+        latencies.sort()
+        return {'count': len(key_ids), 'hops_avg': sum(hops) / len(hops), 'hops_p50': percentile(hops, 50),
+                'hops_p99': percentile(hops, 99), 'p50_ms': percentile(latencies, 50) * 1000,
+                'p99_ms': percentile(latencies, 99) * 1000, 'errors': errors}
+
+    def store(self, filenames: list) -> None:
+        #guarda cada clave en el nodo que encuentra la búsqueda, como store_file_grpc
+        for filename in filenames:
+            responsible = self.random.choice(self.alive()).find_successor(hash_key(filename, self.m))
+            node = self.control.nodes.get((responsible.get('ip'), responsible.get('port')))
+            if node:
+                node.files.put(filename, [filename.encode()])
+
+    def distribution(self) -> dict:
+        #claves por nodo: promedio, máximo y desvío relativos al promedio, y nodos sin claves
+        counts = [len(node.files) for node in self.alive()]
+        mean = sum(counts) / len(counts)
+        std = math.sqrt(sum((count - mean) ** 2 for count in counts) / len(counts))
+        return {'keys': sum(counts), 'mean': mean, 'max_ratio': max(counts) / mean if mean else 0,
+                'std_ratio': std / mean if mean else 0, 'empty': counts.count(0)}
+
+    def close(self) -> None:
+        self.host.close()
+
+def simulate(n: int, args) -> dict:
+    #arma un anillo de n nodos, mide búsquedas y reparto de claves, y cuánto tarda en converger tras una ola de churn
+    simulator = Simulator(args.id_bits, args.update_interval, args.latency_ms / 1000, args.base_port, args.seed)
+    report = {'nodes': n}
+    with silenced():
+        #el anillo crece en olas que a lo sumo lo duplican, entrando por nodos de olas anteriores, y converge entre ola
+        #y ola, como al sumar máquinas a un anillo en marcha. Si muchos nodos entran a la vez por nodos que todavía no
+        #se estabilizaron, casi todos reciben el mismo sucesor y stabilize los ordena de a un salto por ronda (O(N))
+        started = time.perf_counter()
+        converged = True
+        simulator.join()
+        while len(simulator.control.nodes) < n:
+            ring = simulator.alive()
+            for _ in range(min(len(ring), n - len(ring))):
+                simulator.join(via=ring)
+            converged = simulator.converge(args.max_rounds) is not None and converged
+        report['build'] = {'rounds': simulator.rounds, 'converged': converged, 'seconds': time.perf_counter() - started}
+        messages = simulator.control.messages.total
+        for _ in range(args.settle):
+            simulator.run_round()  #rondas extra para que fix_fingers termine de armar las tablas
+        report['messages_per_node_round'] = (simulator.control.messages.total - messages) / (n * args.settle) if args.settle else 0
+
+        filenames = [f"key-{i}" for i in range(args.keys_per_node * n)]
+        simulator.store(filenames)
+        report['distribution'] = simulator.distribution()
+        report['lookups'] = simulator.lookups([hash_key(filename, simulator.m) for filename in simulator.random.sample(filenames, min(args.lookups, len(filenames)))])
+
+        #churn: una fracción de los nodos se cae sin avisar y la misma cantidad entra al anillo a la vez
+        churn = max(1, int(n * args.churn)) if n > 2 else 0
+        survivors = simulator.alive()
+        for node in simulator.random.sample(survivors, churn):
+            simulator.fail(node)
+        for _ in range(churn):
+            simulator.join(via=survivors)
+        started = time.perf_counter()
+        rounds = simulator.converge(args.max_rounds)
+        report['churn'] = {'nodes': churn, 'rounds': rounds, 'join_retries': simulator.join_retries, 'simulated_seconds': rounds * args.update_interval if rounds is not None else None,
+                           'seconds': time.perf_counter() - started}
+        for _ in range(args.settle):
+            simulator.run_round()
+        report['lookups_after_churn'] = simulator.lookups([simulator.random.getrandbits(simulator.m) for _ in range(args.lookups)])
+    simulator.close()
+    return report
+
+def print_report(report: dict, args) -> None:
+    n = report['nodes']
+    build, lookups, after, churn, keys = report['build'], report['lookups'], report['lookups_after_churn'], report['churn'], report['distribution']
+    converged = "" if build['converged'] else " (alguna ola no convergió)"
+    print(f"N = {n}: anillo armado en {build['rounds']} rondas{converged} ({build['seconds']:.1f} s reales), "
+          f"{report['messages_per_node_round']:.1f} mensajes de mantenimiento por nodo y ronda")
+    print(f"  búsquedas: {lookups['count']}, saltos promedio {lookups['hops_avg']:.2f} (p50 {lookups['hops_p50']}, p99 {lookups['hops_p99']}, "
+          f"log2 N = {math.log2(n):.1f}), latencia p50 {lookups['p50_ms']:.1f} ms, p99 {lookups['p99_ms']:.1f} ms, errores {lookups['errors']}")
+    print(f"  claves: {keys['keys']}, {keys['mean']:.1f} por nodo, máximo {keys['max_ratio']:.2f}x el promedio, "
+          f"desvío {keys['std_ratio']:.2f}x, {keys['empty']} nodos sin claves")
+    if churn['rounds'] is None:
+        print(f"  churn: {churn['nodes']} caídas y {churn['nodes']} altas, sin converger en {args.max_rounds} rondas")
+    else:
+        print(f"  churn: {churn['nodes']} caídas y {churn['nodes']} altas, convergencia en {churn['rounds']} rondas "
+              f"({churn['simulated_seconds']:.0f} s simulados, {churn['seconds']:.1f} s reales), {churn['join_retries']} reintentos de alta")
+    print(f"  búsquedas tras el churn: saltos promedio {after['hops_avg']:.2f}, p99 {after['hops_p99']}, "
+          f"latencia p99 {after['p99_ms']:.1f} ms, errores {after['errors']}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulador de un anillo Chord de N nodos dentro de un proceso")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[10, 100, 1000], help="tamaños de anillo a simular")
+    parser.add_argument("--id-bits", type=int, default=32)
+    parser.add_argument("--update-interval", type=float, default=1, help="segundos simulados por ronda de mantenimiento")
+    parser.add_argument("--latency-ms", type=float, default=20, help="rtt mediano simulado de cada mensaje")
+    parser.add_argument("--settle", type=int, default=2, help="rondas extra tras converger, para los fingers")
+    parser.add_argument("--max-rounds", type=int, default=200)
+    parser.add_argument("--keys-per-node", type=int, default=20)
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--churn", type=float, default=0.1, help="fracción de nodos que se caen (y de altas) en la ola de churn")
+    parser.add_argument("--processes", type=int, default=1, help="simula varios tamaños a la vez en procesos separados")
+    parser.add_argument("--base-port", type=int, default=20000)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.processes > 1:
+        with multiprocessing.Pool(args.processes) as pool:
+            reports = pool.starmap(simulate, [(n, args) for n in args.nodes])
+        for report in reports:
+            print_report(report, args)
+    else:
+        for n in args.nodes:
+            print_report(simulate(n, args), args)
+
+if __name__ == '__main__':
+    main()
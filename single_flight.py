@@ -0,0 +1,56 @@
+import threading
+
+class Flight:
+    """
+    Una operación en curso: quienes llegan mientras corre esperan done y se llevan su resultado o su excepción.
+    """
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Junta las llamadas concurrentes a la misma operación con la misma clave (p. ej. buscar el mismo id o descargar
+    el mismo archivo): la primera la ejecuta y las que llegan mientras tanto esperan y reciben el mismo resultado,
+    así muchos pedidos simultáneos de una clave popular generan un solo recorrido del anillo.
+    No guarda resultados: apenas termina la operación, la próxima llamada vuelve a ejecutarla.
+    """
+    def __init__(self) -> None:
+        self.flights = {}  #(operación, clave) -> Flight en curso
+        self.calls = {}  #operación -> llamadas
+        self.coalesced = {}  #operación -> llamadas que esperaron a otra en vez de ejecutar
+        self.lock = threading.Lock()
+
+    def do(self, operation: str, key, fn) -> tuple:
+        #devuelve (resultado de fn(), True si se compartió el de otra llamada en curso)
+        with self.lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+            flight = self.flights.get((operation, key))
+            leader = flight is None
+            if leader:
+                flight = self.flights[(operation, key)] = Flight()
+            else:
+                self.coalesced[operation] = self.coalesced.get(operation, 0) + 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.flights[(operation, key)]
+            flight.done.set()
+        return flight.result, False
+
+    def stats(self) -> dict:
+        #por operación: llamadas, cuántas se juntaron con otra en curso y la fracción
+        with self.lock:
+            return {operation: {'calls': calls, 'coalesced': self.coalesced.get(operation, 0),
+                                'coalesced_rate': self.coalesced.get(operation, 0) / calls}
+                    for operation, calls in self.calls.items()}
@@ -0,0 +1,417 @@
+import os
+import logging
+import mmap
+import struct
+import zlib
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+log = logging.getLogger("chord.storage")
+
+def iter_blocks(data: bytes, chunk_size: int):
+    #divide un contenido en bloques de chunk_size bytes sin copiarlo entero
+    view = memoryview(data)
+    for offset in range(0, len(view), chunk_size):
+        yield bytes(view[offset:offset + chunk_size])
+
+def version_tag(size: int, crc: int) -> str:
+    #versión (etag) de un contenido: su tamaño y su crc32, cambia con cualquier escritura que cambie los datos
+    return f"{size:x}-{crc:08x}"
+
+def content_tag(data: bytes) -> str:
+    return version_tag(len(data), zlib.crc32(data))
+
+class ReadWriteLock:
+    """
+    Lock de lectores y escritores: varias lecturas a la vez y las escrituras de a una, en exclusiva.
+    Los escritores en espera tienen prioridad para que un flujo continuo de lecturas no los deje sin turno.
+    No es reentrante: quien tiene el lock no debe volver a pedirlo.
+    """
+    def __init__(self) -> None:
+        self.condition = threading.Condition(threading.Lock())
+        self.readers = 0  #lectores dentro
+        self.writing = False  #hay un escritor dentro
+        self.waiting_writers = 0  #escritores esperando turno
+
+    @contextmanager
+    def read(self):
+        with self.condition:
+            while self.writing or self.waiting_writers:
+                self.condition.wait()
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.readers -= 1
+                if not self.readers:
+                    self.condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self.condition:
+            self.waiting_writers += 1
+            while self.writing or self.readers:
+                self.condition.wait()
+            self.waiting_writers -= 1
+            self.writing = True
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.writing = False
+                self.condition.notify_all()
+
+class MemoryStorage:
+    """
+    Backend en memoria: el diccionario de siempre, filename -> contenido.
+    Todo se pierde al reiniciar el nodo y la capacidad queda limitada por la RAM.
+    """
+    def __init__(self) -> None:
+        self.files = {}
+        self.checksums = {}  #filename -> crc32 del contenido
+        self.lock = ReadWriteLock()
+        self.on_change = None  #on_change(filename, crc32 o None si se borró), en el mismo orden que las escrituras
+        self.written_bytes = 0  #bytes escritos desde que se abrió, para las métricas
+
+    def put(self, filename: str, blocks) -> int:
+        data = b"".join(blocks)  #se junta fuera del lock, solo el reemplazo es exclusivo
+        crc = zlib.crc32(data)
+        with self.lock.write():
+            self.files[filename] = data
+            self.checksums[filename] = crc
+            self.written_bytes += len(data)
+            if self.on_change:
+                self.on_change(filename, crc)
+        return len(data)
+
+    def get(self, filename: str) -> bytes:
+        with self.lock.read():
+            return self.files[filename]
+
+    def iter_chunks(self, filename: str, chunk_size: int):
+        #los bytes son inmutables, así que se puede recorrer el contenido leído aunque luego se sobrescriba
+        return iter_blocks(self.get(filename), chunk_size)
+
+    def size(self, filename: str) -> int:
+        with self.lock.read():
+            return len(self.files[filename])
+
+    def checksum(self, filename: str) -> int:
+        with self.lock.read():
+            return self.checksums[filename]
+
+    def etag(self, filename: str) -> str:
+        with self.lock.read():
+            return version_tag(len(self.files[filename]), self.checksums[filename])
+
+    def delete(self, filename: str) -> None:
+        with self.lock.write():
+            if self.files.pop(filename, None) is not None:
+                del self.checksums[filename]
+                if self.on_change:
+                    self.on_change(filename, None)
+
+    def compact(self) -> int:
+        return 0  #no hay nada que compactar
+
+    def total_bytes(self) -> int:
+        with self.lock.read():
+            return sum(len(data) for data in self.files.values())
+
+    def close(self) -> None:
+        pass
+
+    def __contains__(self, filename: str) -> bool:
+        with self.lock.read():
+            return filename in self.files
+
+    def __iter__(self):
+        with self.lock.read():
+            return iter(list(self.files))
+
+    def __len__(self) -> int:
+        with self.lock.read():
+            return len(self.files)
+
+class SegmentStorage:
+    """
+    Backend en disco con segmentos de solo escritura al final (append-only).
+    Cada registro es: cabecera (tipo, largo del nombre, largo de los datos, crc32), nombre y datos.
+    En memoria solo se guarda el índice filename -> (segmento, offset, largo); los datos se leen
+    con mmap directamente del page cache. Las sobrescrituras y borrados dejan basura en segmentos
+    viejos, que compact() reescribe cuando la proporción de basura supera un umbral.
+    Las escrituras al segmento se serializan con write_lock; el índice se protege con un lock de lectores
+    y escritores que solo se toma en exclusiva para publicar cada registro, así las lecturas no esperan
+    a que termine de copiarse un archivo grande.
+    """
+    HEADER = struct.Struct('<BHQI')  #tipo, largo del nombre, largo de los datos, crc32 de los datos
+    PUT = 1
+    DELETE = 0
+
+    def __init__(self, directory: str, segment_max_bytes: int = 64 * 1024 * 1024,
+                 compact_min_garbage: float = 0.5, spool_bytes: int = 1024 * 1024) -> None:
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes  #al superar este tamaño se abre un segmento nuevo
+        self.compact_min_garbage = compact_min_garbage  #proporción de basura a partir de la cual se compacta un segmento
+        self.spool_bytes = spool_bytes  #escrituras más grandes que esto se acumulan en un temporal en disco
+        self.index = {}  #filename -> (segmento, offset de los datos, largo)
+        self.checksums = {}  #filename -> crc32 del contenido
+        self.on_change = None  #on_change(filename, crc32 o None si se borró), en el mismo orden que las escrituras
+        self.written_bytes = 0  #bytes escritos desde que se abrió, para las métricas
+        self.segment_bytes = {}  #segmento -> bytes totales escritos
+        self.live_bytes = {}  #segmento -> bytes de registros todavía vigentes
+        self.maps = {}  #segmento -> mmap de lectura
+        self.write_lock = threading.Lock()  #un solo escritor a la vez en los segmentos
+        self.index_lock = ReadWriteLock()  #protege index, checksums, segment_bytes y live_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.load()
+
+    def segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"segment-{segment:06d}.log")
+
+    def load(self) -> None:
+        #reconstruye el índice recorriendo los segmentos en orden
+        segments = sorted(int(name[8:14]) for name in os.listdir(self.directory)
+                          if name.startswith("segment-") and name.endswith(".log"))
+        for segment in segments:
+            self.segment_bytes[segment] = 0
+            self.live_bytes[segment] = 0
+            #solo el último segmento pudo quedar a medio escribir, así que solo ahí se verifica el crc
+            self.replay(segment, verify=segment == segments[-1])
+        self.active = segments[-1] if segments else 1
+        self.segment_bytes.setdefault(self.active, 0)
+        self.live_bytes.setdefault(self.active, 0)
+        self.writer = open(self.segment_path(self.active), 'ab')
+
+    def replay(self, segment: int, verify: bool) -> None:
+        path = self.segment_path(segment)
+        file_size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            offset = 0
+            while True:
+                header = f.read(self.HEADER.size)
+                if len(header) < self.HEADER.size:
+                    break
+                kind, name_len, data_len, crc = self.HEADER.unpack(header)
+                name = f.read(name_len)
+                data_offset = offset + self.HEADER.size + name_len
+                record_end = data_offset + data_len
+                if len(name) < name_len or record_end > file_size:
+                    break
+                if verify and kind == self.PUT and self.crc_of(f, data_len) != crc:
+                    break
+                f.seek(record_end)
+                self.apply(name.decode(), kind, segment, data_offset, data_len, record_end - offset, crc)
+                offset = record_end
+        if offset < os.path.getsize(path):
+            #registro incompleto al final (el nodo se cayó escribiendo): lo descartamos
+            log.warning("Segmento %s truncado en el byte %s", segment, offset)
+            with open(path, 'r+b') as f:
+                f.truncate(offset)
+
+    def apply(self, filename: str, kind: int, segment: int, data_offset: int, data_len: int, record_len: int, crc: int) -> None:
+        #actualiza el índice y la contabilidad de basura con un registro nuevo; se llama con index_lock en escritura
+        #(o durante la carga, antes de que haya otros hilos)
+        previous = self.index.pop(filename, None)
+        if previous:
+            self.live_bytes[previous[0]] -= self.record_len(filename, previous[2])
+        self.segment_bytes[segment] += record_len
+        if kind == self.PUT:
+            self.index[filename] = (segment, data_offset, data_len)
+            self.checksums[filename] = crc
+            self.live_bytes[segment] += record_len
+        else:
+            self.checksums.pop(filename, None)
+
+    def crc_of(self, f, length: int) -> int:
+        #calcula el crc32 de los siguientes length bytes del archivo leyendo por bloques
+        crc = 0
+        reader = LimitedReader(f, length)
+        while block := reader.read(1024 * 1024):
+            crc = zlib.crc32(block, crc)
+        return crc
+
+    def record_len(self, filename: str, data_len: int) -> int:
+        return self.HEADER.size + len(filename.encode()) + data_len
+
+    def append(self, filename: str, kind: int, source, data_len: int, crc: int) -> None:
+        #escribe un registro al final del segmento activo; se llama con write_lock tomado
+        #los datos se copian sin bloquear a los lectores, el índice se actualiza recién cuando el registro está completo
+        if self.segment_bytes[self.active] >= self.segment_max_bytes:
+            self.roll()
+        name = filename.encode()
+        offset = self.writer.tell()
+        self.writer.write(self.HEADER.pack(kind, len(name), data_len, crc))
+        self.writer.write(name)
+        if source is not None:
+            shutil.copyfileobj(source, self.writer)
+        self.writer.flush()
+        with self.index_lock.write():
+            self.apply(filename, kind, self.active, offset + self.HEADER.size + len(name), data_len, self.record_len(filename, data_len), crc)
+
+    def roll(self) -> None:
+        #cierra el segmento activo y empieza uno nuevo; se llama con write_lock tomado
+        self.writer.close()
+        self.active += 1
+        with self.index_lock.write():
+            self.segment_bytes[self.active] = 0
+            self.live_bytes[self.active] = 0
+        self.writer = open(self.segment_path(self.active), 'ab')
+
+    def put(self, filename: str, blocks) -> int:
+        #acumula los bloques fuera del lock (en memoria si son pocos, en un temporal si no) y luego los anexa al segmento
+        crc = 0
+        length = 0
+        with tempfile.SpooledTemporaryFile(max_size=self.spool_bytes, dir=self.directory) as spool:
+            for block in blocks:
+                spool.write(block)
+                crc = zlib.crc32(block, crc)
+                length += len(block)
+            spool.seek(0)
+            with self.write_lock:
+                self.append(filename, self.PUT, spool, length, crc)
+                self.written_bytes += length
+                if self.on_change:
+                    self.on_change(filename, crc)
+        return length
+
+    def view(self, filename: str) -> memoryview:
+        #devuelve una vista sobre el mmap del segmento, sin copiar los datos
+        with self.index_lock.read():
+            segment, offset, length = self.index[filename]
+            if length == 0:
+                return memoryview(b"")
+            segment_map = self.maps.get(segment)
+            if segment_map is None or len(segment_map) < offset + length:
+                #el segmento activo crece, así que se vuelve a mapear cuando el registro queda fuera del mapa anterior
+                #dos lectores pueden mapearlo a la vez; gana la última asignación y el otro mapa se libera al no usarse
+                with open(self.segment_path(segment), 'rb') as f:
+                    segment_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self.maps[segment] = segment_map
+        return memoryview(segment_map)[offset:offset + length]
+
+    def get(self, filename: str) -> bytes:
+        return bytes(self.view(filename))
+
+    def iter_chunks(self, filename: str, chunk_size: int):
+        return iter_blocks(self.view(filename), chunk_size)
+
+    def size(self, filename: str) -> int:
+        with self.index_lock.read():
+            return self.index[filename][2]
+
+    def checksum(self, filename: str) -> int:
+        with self.index_lock.read():
+            return self.checksums[filename]
+
+    def etag(self, filename: str) -> str:
+        with self.index_lock.read():
+            return version_tag(self.index[filename][2], self.checksums[filename])
+
+    def delete(self, filename: str) -> None:
+        with self.write_lock:
+            if filename in self.index:
+                self.append(filename, self.DELETE, None, 0, 0)
+                if self.on_change:
+                    self.on_change(filename, None)
+
+    def compact(self) -> int:
+        #reescribe los segmentos cerrados con mucha basura copiando solo sus registros vigentes; devuelve los bytes liberados
+        freed = 0
+        with self.index_lock.read():
+            candidates = [segment for segment in sorted(self.segment_bytes)
+                          if segment != self.active and self.segment_bytes[segment] > 0
+                          and 1 - self.live_bytes[segment] / self.segment_bytes[segment] >= self.compact_min_garbage]
+        for segment in candidates:
+            freed += self.compact_segment(segment)
+        return freed
+
+    def compact_segment(self, segment: int) -> int:
+        with self.index_lock.read():
+            oldest = segment == min(self.segment_bytes)
+            live = [(filename, offset, length) for filename, (seg, offset, length) in self.index.items() if seg == segment]
+        path = self.segment_path(segment)
+        with open(path, 'rb') as f:
+            for filename, offset, length in live:
+                #el crc se toma de la cabecera del registro original, sin volver a leer los datos
+                f.seek(offset - len(filename.encode()) - self.HEADER.size)
+                crc = self.HEADER.unpack(f.read(self.HEADER.size))[3]
+                f.seek(offset)
+                with self.write_lock:
+                    #el archivo pudo sobrescribirse o borrarse mientras compactábamos
+                    if self.index.get(filename) != (segment, offset, length):
+                        continue
+                    self.append(filename, self.PUT, LimitedReader(f, length), length, crc)
+            if not oldest:
+                #los borrados se conservan mientras exista un segmento más viejo con datos que podrían revivir
+                self.copy_tombstones(segment, f)
+        with self.index_lock.write():
+            freed = self.segment_bytes.pop(segment)
+            self.live_bytes.pop(segment)
+            self.maps.pop(segment, None)  #las lecturas en curso mantienen vivo su mmap hasta terminar
+        os.remove(path)
+        return freed
+
+    def copy_tombstones(self, segment: int, f) -> None:
+        f.seek(0)
+        while True:
+            header = f.read(self.HEADER.size)
+            if len(header) < self.HEADER.size:
+                break
+            kind, name_len, data_len, _ = self.HEADER.unpack(header)
+            filename = f.read(name_len).decode()
+            f.seek(data_len, os.SEEK_CUR)
+            with self.write_lock:
+                if kind == self.DELETE and filename not in self.index:
+                    self.append(filename, self.DELETE, None, 0, 0)
+
+    def total_bytes(self) -> int:
+        with self.index_lock.read():
+            return sum(self.segment_bytes.values())
+
+    def close(self) -> None:
+        with self.write_lock, self.index_lock.write():
+            self.writer.close()
+            self.maps.clear()
+
+    def __contains__(self, filename: str) -> bool:
+        with self.index_lock.read():
+            return filename in self.index
+
+    def __iter__(self):
+        with self.index_lock.read():
+            return iter(list(self.index))
+
+    def __len__(self) -> int:
+        with self.index_lock.read():
+            return len(self.index)
+
+class LimitedReader:
+    #lee como máximo limit bytes de un archivo, para copiar un solo registro con shutil.copyfileobj
+    def __init__(self, f, limit: int) -> None:
+        self.f = f
+        self.remaining = limit
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.f.read(size)
+        self.remaining -= len(data)
+        return data
+
+def open_storage(config: dict, node_id: int):
+    #crea el backend de almacenamiento elegido en bootstrap.json ("memory" o "segment")
+    backend = config.get("storage_backend", "memory")
+    if backend == "memory":
+        return MemoryStorage()
+    if backend == "segment":
+        directory = os.path.join(config.get("storage_dir", "data"), str(node_id))
+        return SegmentStorage(
+            directory,
+            segment_max_bytes=config.get("segment_max_bytes", 64 * 1024 * 1024),
+            compact_min_garbage=config.get("compact_min_garbage", 0.5),
+        )
+    raise ValueError(f"Backend de almacenamiento desconocido: {backend}")
@@ -0,0 +1,79 @@
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+TRACE_HEADER = "X-Chord-Trace"  #cabecera http con el id de traza en las rutas rest
+TRACE_METADATA = "chord-trace"  #clave de la metadata grpc con el id de traza
+
+#id de traza de la búsqueda en curso en este hilo o corrutina ("" = sin traza); el plano de control
+#lo agrega a cada mensaje que sale mientras está puesto, así viaja con todos los saltos de la búsqueda
+current_trace = ContextVar("chord_trace", default="")
+
+def new_trace_id() -> str:
+    return os.urandom(8).hex()
+
+@contextmanager
+def traced(trace_id: str):
+    #pone trace_id como traza en curso mientras dura el bloque
+    token = current_trace.set(trace_id)
+    try:
+        yield trace_id
+    finally:
+        current_trace.reset(token)
+
+class TraceStore:
+    """
+    Saltos de las búsquedas con traza que pasaron por este proceso, por id de traza: en cada uno el nodo que lo hizo,
+    a qué nodo reenvió o consultó, cuánto tardó y el error si el otro nodo no respondió.
+    Guarda las últimas size trazas durante ttl segundos; los nodos de la búsqueda se los piden a cada proceso
+    al armar el camino completo (Host.trace_path), no viajan en las respuestas de las búsquedas.
+    Solo se traza una fracción sample_rate de las búsquedas que empiezan en este proceso (0 = ninguna) y las que
+    ya llegan con traza, así en producción el costo de registrar saltos se paga en una muestra y no en cada búsqueda.
+    """
+    def __init__(self, size: int = 1000, ttl: float = 600, sample_rate: float = 0.01) -> None:
+        self.size = size
+        self.ttl = ttl
+        self.sample_rate = sample_rate
+        self.traces = OrderedDict()  #id de traza -> (momento del primer salto, [saltos]), de la más vieja a la más nueva
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "TraceStore":
+        return cls(config.get("trace_buffer_size", 1000), config.get("trace_ttl", 600), config.get("trace_sample_rate", 0.01))
+
+    def sample(self) -> str:
+        #id de traza nuevo para una búsqueda que empieza sin traza si le toca en la muestra, si no "" (sin traza)
+        return new_trace_id() if self.sample_rate and random.random() < self.sample_rate else ""
+
+    def record(self, trace_id: str, hop: dict) -> None:
+        now = time.monotonic()
+        with self.lock:
+            entry = self.traces.get(trace_id)
+            if entry is None:
+                entry = self.traces[trace_id] = (now, [])
+                #descarta las trazas más viejas si sobran o vencieron
+                while self.traces and (len(self.traces) > self.size or next(iter(self.traces.values()))[0] < now - self.ttl):
+                    self.traces.popitem(last=False)
+            entry[1].append(hop)
+
+    def hops(self, trace_id: str) -> list:
+        with self.lock:
+            entry = self.traces.get(trace_id)
+            if entry is None or entry[0] < time.monotonic() - self.ttl:
+                return []
+            return [dict(hop) for hop in entry[1]]
+
+def lookup_path(hops: list) -> list:
+    #ordena los saltos de una traza juntados de todos los procesos: primero la búsqueda completa (lookup) y después
+    #los saltos por profundidad. En la búsqueda recursiva ms incluye a los saltos siguientes, así que hop_ms le
+    #resta el ms del salto al que se reenvió: lo que tardó ese salto por sí solo (red, cola y trabajo del nodo)
+    path = sorted(hops, key=lambda hop: (hop['operation'] != "lookup", hop['hops'], hop['started']))
+    forwarded = {(hop['node'], hop['hops']): hop['ms'] for hop in path if hop['operation'] == "find_successor"}
+    for hop in path:
+        downstream = forwarded.get((hop['to'].get('id'), hop['hops'] + 1)) if hop['operation'] == "find_successor" and hop['to'] else None
+        hop['hop_ms'] = hop['ms'] - downstream if downstream is not None else hop['ms']
+    return path